@@ -0,0 +1,127 @@
+"""
+Throughput (MB/s) da divisao em chunks de um corpus grande: o
+RecursiveCharacterTextSplitter antigo (tamanho em caracteres), o
+Chunker no processo atual e o Chunker com o pool de processos. Tambem
+mostra a distribuicao de tokens por chunk e quantos passam do limite.
+
+    python -m benchmarks.chunking --megabytes 20 --processes 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from benchmarks.common import write_results
+from benchmarks.fakes import sample_text
+from src.infrastructure.config import settings
+from src.services.document_reader import Chunker
+from src.services.tokenizer import Tokenizer
+
+
+def corpus(megabytes: float, page_words: int) -> list:
+    pages = []
+    size = 0
+    while size < megabytes * 1e6:
+        number = len(pages)
+        page = f"{number + 1}. SECAO {number}\n\n" + sample_text(
+            page_words, number
+        )
+        pages.append(page)
+        size += len(page.encode("utf-8"))
+    return pages
+
+
+def report(name: str, texts: list, seconds: float, size: int,
+           max_tokens: int) -> dict:
+    tokens = [Tokenizer.count(text) for text in texts]
+    return {
+        "splitter": name,
+        "seconds": seconds,
+        "mb_per_second": size / seconds / 1e6,
+        "chunks": len(texts),
+        "tokens_mean": statistics.fmean(tokens),
+        "tokens_max": max(tokens),
+        "over_limit": sum(count > max_tokens for count in tokens)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--megabytes", type=float, default=10.0)
+    parser.add_argument("--page-words", type=int, default=600)
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--overlap-tokens", type=int, default=32)
+    parser.add_argument("--processes", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    pages = corpus(args.megabytes, args.page_words)
+    text = "\n\n".join(pages)
+    size = len(text.encode("utf-8"))
+    results = []
+
+    # the previous splitter, sized in characters (~4 per token)
+    legacy = RecursiveCharacterTextSplitter(
+        chunk_size=args.max_tokens * 4,
+        chunk_overlap=args.overlap_tokens * 4,
+        length_function=len,
+        is_separator_regex=False
+    )
+    start = time.perf_counter()
+    texts = legacy.split_text(text)
+    results.append(report(
+        "recursive_character", texts, time.perf_counter() - start, size,
+        args.max_tokens
+    ))
+
+    chunker = Chunker(
+        max_tokens=args.max_tokens,
+        overlap_tokens=args.overlap_tokens,
+        processes=args.processes or None
+    )
+    start = time.perf_counter()
+    chunks = chunker.split(pages)
+    results.append(report(
+        "chunker", [chunk["text"] for chunk in chunks],
+        time.perf_counter() - start, size, args.max_tokens
+    ))
+
+    async def parallel():
+        # the first call pays for starting the pool
+        _ = await chunker.asplit(pages[:chunker.processes])
+        start = time.perf_counter()
+        chunks = await chunker.asplit(pages)
+        seconds = time.perf_counter() - start
+        await Chunker.close()
+        return chunks, seconds
+
+    chunker.parallel_bytes = 0
+    chunks, seconds = asyncio.run(parallel())
+    results.append({
+        **report(
+            "chunker_parallel", [chunk["text"] for chunk in chunks],
+            seconds, size, args.max_tokens
+        ),
+        "processes": chunker.processes
+    })
+
+    output = write_results("chunking", {
+        "megabytes": size / 1e6,
+        "pages": len(pages),
+        "tokenizer": settings.TOKENIZER_ENCODING or "estimate",
+        "splitters": results,
+        "parameters": vars(args)
+    }, args.output)
+    for result in results:
+        print(
+            f"{result['splitter']:20} {result['mb_per_second']:8.2f} MB/s "
+            f"{result['chunks']:8} chunks, max {result['tokens_max']} "
+            f"tokens, {result['over_limit']} over the limit"
+        )
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
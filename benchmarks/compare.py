@@ -0,0 +1,58 @@
+"""
+Compara dois arquivos de resultado (ex: de commits diferentes),
+mostrando a razao novo/antigo de cada valor numerico.
+
+    python -m benchmarks.compare old.json new.json
+"""
+import argparse
+import json
+from typing import Dict
+
+
+def flatten(value, prefix: str = "") -> Dict[str, float]:
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = (
+            (
+                str(item.get("concurrency", item.get("messages", index)))
+                if isinstance(item, dict) else str(index),
+                item
+            )
+            for index, item in enumerate(value)
+        )
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    else:
+        return {}
+
+    flat = {}
+    for key, item in items:
+        flat.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args()
+
+    with open(args.old) as file:
+        old = json.load(file)
+    with open(args.new) as file:
+        new = json.load(file)
+
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    old_values = flatten(old["results"])
+    new_values = flatten(new["results"])
+    for key in sorted(old_values.keys() & new_values.keys()):
+        if key.startswith("parameters."):
+            continue
+        before, after = old_values[key], new_values[key]
+        ratio = after / before if before else float("nan")
+        print(f"{key:60} {before:12.6g} {after:12.6g} {ratio:8.3f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Servidor HTTP que imita a API do Ollama (/api/tags, /api/chat,
+/api/generate e /api/embed) com latencia e taxa de erro configuraveis,
+para testar e medir o cliente da API sem um modelo real.
+
+    python -m benchmarks.fake_ollama --port 11500 --latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import random
+from datetime import datetime, timezone
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from tests.conftest import fake_embedding
+
+
+def create_fake_ollama(
+    name: str = "fake",
+    latency: float = 0.0,
+    fail_rate: float = 0.0,
+    dimension: int = 64
+) -> FastAPI:
+    app = FastAPI()
+    app.requests = 0
+
+    async def simulate() -> None:
+        app.requests += 1
+        if latency:
+            await asyncio.sleep(latency)
+        if random.random() < fail_rate:
+            raise HTTPException(status_code=503, detail="fake failure")
+
+    def now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": name, "model": name}]}
+
+    @app.post("/api/chat")
+    async def chat(req: Request):
+        body = await req.json()
+        await simulate()
+        content = f"[{name}] " + body["messages"][-1].get("content", "")[:80]
+        done = {
+            "model": body["model"],
+            "created_at": now(),
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": 10,
+            "eval_count": len(content.split())
+        }
+        if not body.get("stream", True):
+            done["message"]["content"] = content
+            return done
+
+        async def stream():
+            chunk = {
+                "model": body["model"],
+                "created_at": now(),
+                "message": {"role": "assistant", "content": content},
+                "done": False
+            }
+            yield json.dumps(chunk) + "\n"
+            yield json.dumps(done) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.post("/api/generate")
+    async def generate(req: Request):
+        body = await req.json()
+        await simulate()
+        done = {
+            "model": body["model"],
+            "created_at": now(),
+            "response": "safe",
+            "done": True
+        }
+        if not body.get("stream", True):
+            return done
+
+        async def stream():
+            yield json.dumps(done) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.post("/api/embed")
+    async def embed(req: Request):
+        body = await req.json()
+        await simulate()
+        inputs = body["input"]
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        return {
+            "model": body["model"],
+            "embeddings": [fake_embedding(text, dimension) for text in inputs]
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--name", default="fake")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_fake_ollama(args.name, args.latency, args.fail_rate),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
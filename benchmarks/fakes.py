@@ -0,0 +1,65 @@
+"""
+Substitutos usados pelos benchmarks: os dos testes (tests/conftest.py)
+e um gerador de PDFs.
+"""
+from typing import List
+
+from tests.conftest import (
+    FakeChatModel,
+    FakeEmbeddings,
+    MemoryChromaDB,
+    MemoryMongoDB,
+    sample_text
+)
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """
+    Gera um PDF minimo (uma fonte padrao, uma linha de texto por linha da
+    pagina), sem depender de bibliotecas de escrita de PDF.
+    """
+    def escape(line: str) -> str:
+        return (
+            line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        )
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # pages, filled below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    kids = []
+    for page in pages:
+        lines = [
+            line for line in page.replace("\n", " ").split(". ") if line
+        ]
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(
+            f"({escape(line)}) '" for line in lines
+        ) + " ET"
+        stream = stream.encode("latin-1", "replace")
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        content = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % content
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(kids), len(kids)
+    )
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1)
+    output += b"startxref\n%d\n%%%%EOF\n" % xref
+    return bytes(output)
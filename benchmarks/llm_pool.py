@@ -0,0 +1,83 @@
+"""
+Exercita o LLMPool contra varios servidores Ollama falsos locais (um
+deles pode falhar sempre) e mede throughput, distribuicao das chamadas
+entre os endpoints e a ejecao do endpoint com falha.
+
+    python -m benchmarks.llm_pool --endpoints 3 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+
+import uvicorn
+
+from benchmarks.common import wait_ready
+from benchmarks.fake_ollama import create_fake_ollama
+from src.infrastructure.config import LLM
+
+
+def serve(port: int, latency: float, fail_rate: float) -> None:
+    uvicorn.run(
+        create_fake_ollama(f"fake-{port}", latency, fail_rate),
+        host="127.0.0.1",
+        port=port,
+        log_level="error"
+    )
+
+
+async def run(args, urls) -> dict:
+    pool = LLM.pool("ollama", "fake", 0.0, urls)
+    await pool.health_check()
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *[pool.ainvoke(f"message {i}") for i in range(args.requests)],
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": args.requests,
+        "errors": sum(isinstance(r, Exception) for r in results),
+        "seconds": elapsed,
+        "requests_per_second": args.requests / elapsed,
+        "endpoints": pool.stats()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--endpoints", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--failing", type=int, default=1,
+                        help="how many endpoints always fail")
+    parser.add_argument("--port", type=int, default=11500)
+    args = parser.parse_args()
+
+    ports = [args.port + i for i in range(args.endpoints)]
+    servers = [
+        multiprocessing.Process(
+            target=serve,
+            args=(port, args.latency, 1.0 if i < args.failing else 0.0),
+            daemon=True
+        )
+        for i, port in enumerate(ports)
+    ]
+    for server in servers:
+        server.start()
+
+    try:
+        urls = [f"http://127.0.0.1:{port}" for port in ports]
+        for url in urls:
+            wait_ready(f"{url}/api/tags")
+        print(json.dumps(asyncio.run(run(args, urls)), indent=2))
+    finally:
+        for server in servers:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    main()
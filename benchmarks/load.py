@@ -0,0 +1,275 @@
+"""
+Gerador de carga para a API. Dispara uma mistura de requisicoes
+(/crag/new_message, /files/upload, ...) com N clientes concorrentes e
+reporta latencia p50/p95/p99 por rota, throughput, taxa de erros e o
+atraso do event loop.
+
+Por padrao roda em processo: a app de create_app, com o LLM, os
+embeddings, o ChromaDB e o MongoDB falsos, e chamada via ASGI, e o
+atraso medido e o do proprio loop da app. Com --url a carga vai por
+HTTP para um servidor ja rodando; com --serve o servidor (com os mesmos
+falsos) e iniciado em um processo separado.
+
+    python -m benchmarks.load --concurrency 32 --duration 20
+    python -m benchmarks.load --serve --mix new_message=1 upload=1
+    python -m benchmarks.load --url http://localhost:9876
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.common import summarize, wait_ready, write_results
+from benchmarks.fakes import (
+    FakeChatModel,
+    FakeEmbeddings,
+    MemoryChromaDB,
+    MemoryMongoDB,
+    make_pdf,
+    sample_text
+)
+from src.infrastructure.config import settings, LLM
+from src.infrastructure.resources import Resources
+from src.main import create_app
+
+
+# default operation=weight mix, also used by benchmarks.workers
+MIX = ["new_message=8", "upload=1", "stats=1"]
+
+
+def create_fake_app():
+    """
+    App completa com as dependencias externas trocadas pelos falsos.
+    Configurada pelas variaveis LOAD_LLM_LATENCY e LOAD_DOCUMENTS, para
+    poder ser usada como factory do uvicorn.
+    """
+    latency = float(os.environ.get("LOAD_LLM_LATENCY", "0.05"))
+    documents = int(os.environ.get("LOAD_DOCUMENTS", "200"))
+
+    model = FakeChatModel(latency=latency)
+    vector_store = MemoryChromaDB(FakeEmbeddings()).install()
+    vector_store.collection = vector_store._create_collection()
+    texts = [sample_text(150, i) for i in range(documents)]
+    vector_store.collection.add(
+        documents=texts,
+        embeddings=vector_store.embedding_function.embed_documents(texts),
+        metadatas=[
+            {"file_name": f"seed-{i}.pdf", "created_at": str(i)}
+            for i in range(documents)
+        ],
+        ids=[f"seed-{i}" for i in range(documents)]
+    )
+
+    return create_app(Resources(
+        database=MemoryMongoDB(),
+        vector_store=vector_store,
+        llm=model,
+        models={node: model for node in LLM.NODES}
+    ))
+
+
+def workload(pdf: bytes) -> Dict[str, Callable[[int], Tuple]]:
+    """
+    Cada operacao recebe o numero da requisicao e retorna os argumentos
+    de client.request.
+    """
+    return {
+        "new_message": lambda i: (
+            "POST", "/crag/new_message",
+            {"json": {
+                "message": f"Qual o prazo de entrega do pedido {i}?",
+                "user_id": f"load-user-{i % 100}"
+            }}
+        ),
+        "upload": lambda i: (
+            "PUT", "/files/upload",
+            {"files": {"file": (f"load-{i}.pdf", pdf, "application/pdf")}}
+        ),
+        "list_files": lambda i: (
+            "GET", f"/files/list_files/{settings.INDEX_NAME}", {}
+        ),
+        "list_files_ndjson": lambda i: (
+            "GET", f"/files/list_files/{settings.INDEX_NAME}",
+            {"params": {"format": "ndjson"}}
+        ),
+        "stats": lambda i: ("GET", "/crag/stats", {}),
+        "health": lambda i: ("GET", "/health", {})
+    }
+
+
+async def monitor_lag(interval: float, lags: List[float], stop):
+    """
+    Atraso do loop: quanto um sleep(interval) demora alem do pedido.
+    """
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(time.perf_counter() - start - interval, 0.0))
+
+
+async def drive(client: httpx.AsyncClient, args) -> dict:
+    pdf = make_pdf([sample_text(400, page) for page in range(args.pages)])
+    operations = workload(pdf)
+    names, weights = zip(*args.mix)
+    rng = random.Random(args.seed)
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    lags: List[float] = []
+    stop = asyncio.Event()
+    counter = iter(range(sys.maxsize))
+    deadline = time.monotonic() + args.duration
+
+    async def user():
+        while time.monotonic() < deadline:
+            i = next(counter)
+            if args.requests and i >= args.requests:
+                return
+            name = rng.choices(names, weights)[0]
+            method, path, kwargs = operations[name](i)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                if response.status_code >= 400:
+                    errors[name][str(response.status_code)] += 1
+            except Exception as e:
+                errors[name][type(e).__name__] += 1
+            latencies[name].append(time.perf_counter() - start)
+
+    lag_task = asyncio.create_task(monitor_lag(args.lag_interval, lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*[user() for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await lag_task
+
+    total = sum(len(values) for values in latencies.values())
+    failed = sum(sum(codes.values()) for codes in errors.values())
+    return {
+        "mode": "http" if args.url or args.serve else "in-process",
+        "concurrency": args.concurrency,
+        "seconds": elapsed,
+        "requests": total,
+        "requests_per_second": total / elapsed if elapsed else 0.0,
+        "error_rate": failed / total if total else 0.0,
+        "routes": {
+            name: {
+                "requests": len(values),
+                "requests_per_second": len(values) / elapsed,
+                "errors": dict(errors[name]),
+                "latency_seconds": summarize(values)
+            }
+            for name, values in latencies.items()
+        },
+        # in http mode this is the load generator's loop, not the server's
+        "event_loop_lag_seconds": summarize(lags)
+    }
+
+
+async def run_in_process(args) -> dict:
+    os.environ["LOAD_LLM_LATENCY"] = str(args.llm_latency)
+    app = create_fake_app()
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport,
+            base_url="http://load",
+            timeout=args.timeout
+        ) as client:
+            results = await drive(client, args)
+
+    if monitor := app.resources.loop_monitor:
+        # LOOP_MONITOR_ENABLED=true: where the loop was blocked
+        results["blocking_sites"] = monitor.stats()["sites"]
+    return results
+
+
+async def run_http(args, url: str) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=url, limits=limits, timeout=args.timeout
+    ) as client:
+        return await drive(client, args)
+
+
+def serve(args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "LOAD_LLM_LATENCY": str(args.llm_latency),
+        "API_WORKERS": str(args.workers)
+    }
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn",
+            "benchmarks.load:create_fake_app", "--factory",
+            "--workers", str(args.workers),
+            "--port", str(args.port), "--log-level", "warning"
+        ],
+        env=env
+    )
+
+
+def parse_mix(values: List[str]) -> List[Tuple[str, float]]:
+    mix = []
+    for value in values:
+        name, _, weight = value.partition("=")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--url", default=None,
+                        help="target a running server over HTTP")
+    parser.add_argument("--serve", action="store_true",
+                        help="start a server with the fakes and use HTTP")
+    parser.add_argument("--workers", type=int, default=settings.API_WORKERS)
+    parser.add_argument("--port", type=int, default=18766)
+    parser.add_argument("--mix", nargs="+", type=str,
+                        default=MIX,
+                        help="operation=weight (new_message, upload, "
+                             "list_files, list_files_ndjson, stats, "
+                             "health)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--requests", type=int, default=0,
+                        help="stop after this many requests (0: no limit)")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--lag-interval", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    args.mix = parse_mix(args.mix)
+
+    if args.url:
+        results = asyncio.run(run_http(args, args.url))
+    elif args.serve:
+        server = serve(args)
+        url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_ready(f"{url}/health")
+            results = asyncio.run(run_http(args, url))
+        finally:
+            server.terminate()
+            server.wait()
+    else:
+        results = asyncio.run(run_in_process(args))
+
+    results["parameters"] = vars(args)
+    print(write_results("load", results, args.output))
+
+
+if __name__ == "__main__":
+    main()
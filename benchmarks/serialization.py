@@ -0,0 +1,143 @@
+"""
+Custo de serializar a listagem de uma colecao grande (/files/list_files)
+pelos caminhos da API: o anterior (APIResponse validado + jsonable_encoder
++ json.dumps, como o FastAPI fazia), orjson (api_response) e NDJSON em
+paginas. Mede tempo, tamanho, pico de memoria e o custo do gzip.
+
+    python -m benchmarks.serialization --documents 50000
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+import zlib
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.common import write_results
+from benchmarks.fakes import sample_text
+from src.api.models import APIResponse
+from src.api.responses import NDJSONResponse, api_response
+from src.infrastructure.config import settings
+
+
+def listing(documents: int, words: int) -> dict:
+    texts = [sample_text(words, seed) for seed in range(100)]
+    return {
+        "ids": [f"doc-{i}" for i in range(documents)],
+        "embeddings": None,
+        "documents": [texts[i % len(texts)] for i in range(documents)],
+        "uris": None,
+        "data": None,
+        "metadatas": [
+            {
+                "file_name": f"file-{i // 20}.pdf",
+                "created_at": "2025-01-01T00:00:00",
+                "page": i % 20 + 1,
+                "chunk_index": i % 20,
+                "tokens": 180
+            }
+            for i in range(documents)
+        ],
+        "included": ["documents", "metadatas"]
+    }
+
+
+def measure(name: str, chunks) -> dict:
+    """
+    chunks gera o corpo da resposta (um pedaco so ou varios, quando em
+    streaming); o gzip e feito pedaco a pedaco, como no GZipMiddleware,
+    e descontado do tempo de serializacao.
+    """
+    compressor = zlib.compressobj(
+        settings.RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 31
+    )
+    size = compressed = 0
+    gzip_seconds = 0.0
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for chunk in chunks():
+        size += len(chunk)
+        gzip_start = time.perf_counter()
+        compressed += len(compressor.compress(chunk))
+        gzip_seconds += time.perf_counter() - gzip_start
+    compressed += len(compressor.flush())
+    seconds = time.perf_counter() - start - gzip_seconds
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "path": name,
+        "seconds": seconds,
+        "megabytes": size / 1e6,
+        "peak_memory_mb": peak / 1e6,
+        "gzip_seconds": gzip_seconds,
+        "gzip_ratio": compressed / size if size else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--documents", type=int, default=50_000)
+    parser.add_argument("--words", type=int, default=150)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    files = listing(args.documents, args.words)
+
+    def legacy():
+        response = APIResponse(status_code=200, response={"files": files})
+        yield json.dumps(
+            jsonable_encoder(response), ensure_ascii=False
+        ).encode("utf-8")
+
+    def fast():
+        yield api_response(200, response={"files": files}).body
+
+    async def pages():
+        for offset in range(0, args.documents, args.page_size):
+            end = offset + args.page_size
+            yield [
+                {"id": id_, "document": document, "metadata": metadata}
+                for id_, document, metadata in zip(
+                    files["ids"][offset:end],
+                    files["documents"][offset:end],
+                    files["metadatas"][offset:end]
+                )
+            ]
+
+    def ndjson():
+        loop = asyncio.new_event_loop()
+        body = NDJSONResponse(pages()).body_iterator
+        try:
+            while True:
+                yield loop.run_until_complete(body.__anext__())
+        except StopAsyncIteration:
+            loop.close()
+
+    results = [
+        measure("jsonable_encoder", legacy),
+        measure("orjson", fast),
+        measure("ndjson", ndjson)
+    ]
+    for result in results:
+        print(
+            f"{result['path']:17} {result['seconds'] * 1000:9.1f} ms "
+            f"{result['megabytes']:8.1f} MB  peak "
+            f"{result['peak_memory_mb']:8.1f} MB"
+        )
+    print(write_results("serialization", {
+        "documents": args.documents,
+        "paths": results,
+        "parameters": vars(args)
+    }, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Tempo de restore de um snapshot de colecao (Snapshot) com N chunks,
+padrao 1M, em um ChromaDB persistente em um diretorio temporario. O
+snapshot e gerado direto em disco (registros e embeddings aleatorios),
+sem precisar de uma colecao com 1M chunks; o export e medido em uma
+colecao menor (--export-chunks), ida e volta.
+
+    python -m benchmarks.snapshot --chunks 1000000 --dtype float16
+    python -m benchmarks.snapshot --chunks 50000 --export-chunks 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import write_results
+from benchmarks.fakes import sample_text
+from src.infrastructure.config import settings
+from src.infrastructure.database import ChromaDB, Snapshot
+
+
+def generate(path: str, chunks: int, dimension: int, dtype: str) -> float:
+    """
+    Snapshot sintetico no formato do Snapshot.export.
+    """
+    start = time.perf_counter()
+    os.makedirs(path, exist_ok=True)
+    rng = np.random.default_rng(0)
+    embeddings = np.lib.format.open_memmap(
+        os.path.join(path, "embeddings.npy"), mode="w+", dtype=dtype,
+        shape=(chunks, dimension)
+    )
+    texts = [sample_text(120, seed) for seed in range(100)]
+    step = 50_000
+    with open(os.path.join(path, "records.jsonl"), "w") as file:
+        for offset in range(0, chunks, step):
+            end = min(offset + step, chunks)
+            embeddings[offset:end] = rng.standard_normal(
+                (end - offset, dimension), dtype=np.float32
+            )
+            file.writelines(
+                json.dumps({
+                    "id": f"chunk-{i}",
+                    "document": texts[i % len(texts)],
+                    "metadata": {
+                        "file_name": f"file-{i // 50}.pdf",
+                        "page": i % 50 + 1,
+                        "chunk_index": i % 50
+                    }
+                }) + "\n"
+                for i in range(offset, end)
+            )
+    embeddings.flush()
+    with open(os.path.join(path, "manifest.json"), "w") as file:
+        json.dump({
+            "format_version": 1,
+            "collection": "snapshot_bench",
+            "metadata": {"hnsw:space": "cosine", "dimension": dimension},
+            "count": chunks,
+            "dimension": dimension,
+            "dtype": dtype,
+            "records": "records.jsonl",
+            "created_at": time.time()
+        }, file)
+    return time.perf_counter() - start
+
+
+def size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+    )
+
+
+async def run(args, directory: str) -> dict:
+    settings.CHROMA_MODE = "persistent"
+    settings.CHROMA_PATH = os.path.join(directory, "chroma")
+    vector_store = ChromaDB()
+
+    path = os.path.join(directory, "snapshot")
+    generated = generate(path, args.chunks, args.dimension, args.dtype)
+    restore = await Snapshot(path).restore(
+        vector_store, batch_size=args.batch
+    )
+
+    results = {
+        "chunks": args.chunks,
+        "dimension": args.dimension,
+        "dtype": args.dtype,
+        "snapshot_bytes": size(path),
+        "generate_seconds": generated,
+        "restore_seconds": restore["seconds"],
+        "restore_chunks_per_second": restore["count"] / restore["seconds"]
+    }
+
+    if args.export_chunks:
+        # round trip of the first chunks: export then restore elsewhere
+        source = vector_store.client.get_collection("snapshot_bench")
+        small = vector_store.client.create_collection(
+            "snapshot_export", embedding_function=None
+        )
+        page = source.get(
+            limit=args.export_chunks,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        for offset in range(0, len(page["ids"]), args.batch):
+            end = offset + args.batch
+            small.add(
+                ids=page["ids"][offset:end],
+                embeddings=page["embeddings"][offset:end],
+                documents=page["documents"][offset:end],
+                metadatas=page["metadatas"][offset:end]
+            )
+        exported = await Snapshot(os.path.join(directory, "export")).export(
+            vector_store, "snapshot_export", dtype=args.dtype
+        )
+        results["export_chunks"] = exported["count"]
+        results["export_seconds"] = exported["seconds"]
+        results["export_chunks_per_second"] = (
+            exported["count"] / exported["seconds"]
+        )
+
+    await vector_store.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--chunks", type=int, default=1_000_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--dtype", choices=Snapshot.DTYPES,
+                        default="float32")
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--export-chunks", type=int, default=10_000)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="snapshot-bench-")
+    try:
+        results = asyncio.run(run(args, directory))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(
+        f"restore {results['chunks']} chunks in "
+        f"{results['restore_seconds']:.1f}s "
+        f"({results['restore_chunks_per_second']:.0f} chunks/s)"
+    )
+    results["parameters"] = vars(args)
+    print(write_results("snapshot", results, args.output))
+
+
+if __name__ == "__main__":
+    main()
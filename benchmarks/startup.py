@@ -0,0 +1,66 @@
+"""
+Mede o tempo de cold start da API: import dos modulos, create_app e o
+startup do lifespan (probes das dependencias). Cada execucao roda em um
+processo novo.
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+RUN = """
+import asyncio, json, time
+start = time.perf_counter()
+from src.main import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+
+async def startup():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+print(json.dumps({
+    "import_seconds": imported - start,
+    "create_app_seconds": created - imported,
+    "lifespan_seconds": ready - created,
+    "total_seconds": ready - start,
+    "readiness": app.readiness
+}))
+"""
+
+
+def run_once() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", RUN],
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    result = {
+        key: {
+            "median": statistics.median(run[key] for run in runs),
+            "max": max(run[key] for run in runs)
+        }
+        for key in runs[0] if key.endswith("_seconds")
+    }
+    result["readiness"] = runs[-1]["readiness"]
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Benchmarks offline e reprodutiveis do pipeline: latencia e throughput do
+CRAG.invoke com concorrencia, ingestao (chunks/s), parse de PDF e custo
+de leitura/escrita do historico conforme ele cresce. Usa o LLM, os
+embeddings, o ChromaDB e o MongoDB falsos de benchmarks.fakes.
+
+    python -m benchmarks.suite --llm-latency 0.05 --concurrency 1 8 32
+    python -m benchmarks.compare results/suite-old.json results/suite-new.json
+"""
+import argparse
+import asyncio
+import time
+from io import BytesIO
+
+from starlette.datastructures import UploadFile
+
+from benchmarks.common import summarize, write_results
+from benchmarks.fakes import (
+    FakeChatModel,
+    FakeEmbeddings,
+    MemoryChromaDB,
+    MemoryMongoDB,
+    make_pdf,
+    sample_text
+)
+from src.infrastructure.config import settings
+from src.infrastructure.database import (
+    add_message_to_history,
+    get_conversation
+)
+from src.services.crag import CRAG
+from src.services.document_reader import BulkIngestion, DocumentReader
+
+
+async def bench_chat(args, vector_store: MemoryChromaDB) -> list:
+    crag = CRAG()
+    model = FakeChatModel(latency=args.llm_latency)
+    messages = [{"role": "user", "content": "Qual o prazo de entrega?"}]
+    _ = await crag.invoke(messages, model)  # warm up
+
+    results = []
+    for concurrency in args.concurrency:
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def request():
+            async with semaphore:
+                start = time.perf_counter()
+                _ = await crag.invoke(messages, model)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[request() for _ in range(args.requests)])
+        elapsed = time.perf_counter() - start
+        results.append({
+            "concurrency": concurrency,
+            "requests_per_second": args.requests / elapsed,
+            "latency_seconds": summarize(latencies)
+        })
+    if crag.speculative:
+        # SPECULATIVE_RETRIEVAL=true
+        results.append({"speculative": crag.speculative.stats()})
+    results.append({"corrective": crag.corrective.stats()})
+    return results
+
+
+async def bench_ingestion(args, vector_store: MemoryChromaDB) -> dict:
+    pdf = make_pdf([sample_text(400, page) for page in range(args.pages)])
+
+    start = time.perf_counter()
+    for _ in range(args.files):
+        _ = DocumentReader._read_pdf(pdf)
+    parse = time.perf_counter() - start
+
+    chunks = 0
+    start = time.perf_counter()
+    for i in range(args.files):
+        file = UploadFile(file=BytesIO(pdf), filename=f"bench-{i}.pdf")
+        content = await DocumentReader.read_file(file)
+        await vector_store.add_documents(
+            documents=content["content"],
+            collection_name=settings.INDEX_NAME,
+            metadatas=[
+                {"file_name": content["name"], "created_at": str(i)}
+                for _ in content["content"]
+            ]
+        )
+        chunks += len(content["content"])
+    ingestion = time.perf_counter() - start
+
+    # the same files in one bulk request: parallel parsing and shared
+    # embedding batches
+    bulk = await BulkIngestion(vector_store).ingest(
+        [
+            UploadFile(file=BytesIO(pdf), filename=f"bulk-{i}.pdf")
+            for i in range(args.files)
+        ],
+        defaults={"created_at": "0"}
+    )
+
+    return {
+        "pdf": {
+            "pages": args.pages,
+            "bytes": len(pdf),
+            "pages_per_second": args.pages * args.files / parse,
+            "mb_per_second": len(pdf) * args.files / parse / 1e6
+        },
+        "ingestion": {
+            "files": args.files,
+            "chunks": chunks,
+            "chunks_per_second": chunks / ingestion
+        },
+        "bulk_ingestion": bulk["summary"]
+    }
+
+
+async def bench_history(args) -> list:
+    results = []
+    for size in args.history_sizes:
+        database = MemoryMongoDB()
+        user_id = f"user-{size}"
+        _ = await add_message_to_history(
+            [
+                {"role": "user", "content": sample_text(30, i)}
+                for i in range(size)
+            ],
+            user_id,
+            database
+        )
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            _ = await get_conversation(user_id, database)
+        read = (time.perf_counter() - start) / args.repeat
+
+        start = time.perf_counter()
+        for i in range(args.repeat):
+            _ = await add_message_to_history(
+                [{"role": "user", "content": sample_text(30, i)}],
+                user_id,
+                database
+            )
+        write = (time.perf_counter() - start) / args.repeat
+
+        results.append({
+            "messages": size,
+            "read_seconds": read,
+            "write_seconds": write
+        })
+    return results
+
+
+async def run(args) -> dict:
+    vector_store = MemoryChromaDB(
+        FakeEmbeddings(args.dimension, args.embedding_latency)
+    ).install()
+    await vector_store.add_documents(
+        documents=[sample_text(150, i) for i in range(args.documents)],
+        collection_name=settings.INDEX_NAME,
+        metadatas=[
+            {"file_name": f"seed-{i}.pdf", "created_at": str(i)}
+            for i in range(args.documents)
+        ]
+    )
+
+    results = {}
+    if "chat" in args.only:
+        results["chat"] = await bench_chat(args, vector_store)
+    if "ingestion" in args.only:
+        results.update(await bench_ingestion(args, vector_store))
+    if "history" in args.only:
+        results["history"] = await bench_history(args)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--only", nargs="+",
+                        default=["chat", "ingestion", "history"])
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--embedding-latency", type=float, default=0.0)
+    parser.add_argument("--dimension", type=int, default=64)
+    parser.add_argument("--documents", type=int, default=200,
+                        help="chunks indexed before the chat benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="+",
+                        default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--files", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--history-sizes", type=int, nargs="+",
+                        default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    results["parameters"] = vars(args)
+    print(write_results("suite", results, args.output))
+
+
+if __name__ == "__main__":
+    main()
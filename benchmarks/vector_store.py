@@ -0,0 +1,142 @@
+"""
+Latencia de insercao e de consulta do ChromaDB nos modos http (cliente
+HTTP para um servidor `chroma run`) e persistent (embutido no processo,
+gravando em disco), com os mesmos documentos e embeddings falsos, para
+medir so o custo do vector store.
+
+Sem --url o servidor do modo http e iniciado em um processo separado
+com um diretorio temporario.
+
+    python -m benchmarks.vector_store --documents 5000 --queries 500
+    python -m benchmarks.vector_store --modes persistent
+    python -m benchmarks.vector_store --url http://localhost:8000
+"""
+import argparse
+import asyncio
+import shutil
+import subprocess
+import tempfile
+import time
+from urllib.parse import urlparse
+
+from benchmarks.common import summarize, wait_ready, write_results
+from benchmarks.fakes import FakeEmbeddings, sample_text
+from src.infrastructure.config import settings
+from src.infrastructure.database import ChromaDB
+
+
+def start_server(path: str, port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            shutil.which("chroma") or "chroma", "run",
+            "--path", path, "--port", str(port)
+        ],
+        # chroma.log is written to the working directory
+        cwd=path,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+
+async def measure(mode: str, args, path: str) -> dict:
+    settings.CHROMA_MODE = mode
+    settings.CHROMA_PATH = path
+    vector_store = ChromaDB()
+    vector_store.embedding_function = FakeEmbeddings(args.dimension)
+    collection = f"bench_{mode}"
+    try:
+        vector_store.client.delete_collection(collection)
+    except Exception:
+        pass
+
+    texts = [sample_text(args.words, i) for i in range(args.documents)]
+    inserts = []
+    start = time.perf_counter()
+    for offset in range(0, len(texts), args.batch):
+        batch = texts[offset:offset + args.batch]
+        batch_start = time.perf_counter()
+        await vector_store.add_documents(
+            batch,
+            collection,
+            [{"file_name": f"doc-{offset + i}.pdf"}
+             for i in range(len(batch))]
+        )
+        inserts.append(time.perf_counter() - batch_start)
+    insert_seconds = time.perf_counter() - start
+
+    queries = []
+    for i in range(args.queries):
+        query_start = time.perf_counter()
+        await vector_store.query_documents(
+            sample_text(12, args.documents + i), collection, args.k
+        )
+        queries.append(time.perf_counter() - query_start)
+
+    start = time.perf_counter()
+    await vector_store.list_documents(collection)
+    list_seconds = time.perf_counter() - start
+
+    vector_store.client.delete_collection(collection)
+    await vector_store.close()
+    return {
+        "mode": mode,
+        "documents_per_second": len(texts) / insert_seconds,
+        "insert_batch_seconds": summarize(inserts),
+        "query_seconds": summarize(queries),
+        "list_seconds": list_seconds
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--modes", nargs="+", default=list(ChromaDB.MODES),
+                        choices=ChromaDB.MODES)
+    parser.add_argument("--url", default=None,
+                        help="use a running chroma server in http mode")
+    parser.add_argument("--port", type=int, default=18800)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--words", type=int, default=150)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        directory = tempfile.mkdtemp(prefix=f"chroma-{mode}-")
+        server = None
+        try:
+            if mode == "http":
+                url = args.url or f"http://127.0.0.1:{args.port}"
+                if not args.url:
+                    server = start_server(directory, args.port)
+                wait_ready(f"{url}/api/v1/heartbeat")
+                parsed = urlparse(url)
+                settings.CHROMA_HOST = parsed.hostname
+                settings.CHROMA_PORT = parsed.port or 8000
+            results.append(asyncio.run(measure(mode, args, directory)))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+            shutil.rmtree(directory, ignore_errors=True)
+
+    for result in results:
+        print(
+            f"{result['mode']:11} insert {result['documents_per_second']:9.1f}"
+            f" docs/s  query p50 {result['query_seconds']['p50'] * 1000:7.2f}"
+            f" ms  p99 {result['query_seconds']['p99'] * 1000:7.2f} ms"
+        )
+    print(write_results("vector_store", {
+        "modes": results,
+        "parameters": vars(args)
+    }, args.output))
+
+
+if __name__ == "__main__":
+    main()
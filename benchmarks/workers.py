@@ -0,0 +1,133 @@
+"""
+Mede o throughput da API com 1..N workers do uvicorn (factory mode),
+com a mistura de requisicoes do benchmarks.load (por padrao a mesma,
+quase toda /crag/new_message) sobre a app com o LLM, os embeddings e
+os bancos falsos. Para cada quantidade de workers sobe o servidor em um
+processo separado e dispara requisicoes a partir de varios processos
+clientes, para que o cliente nao seja o gargalo.
+
+    python -m benchmarks.workers --workers 1 2 4 --duration 10
+    python -m benchmarks.workers --mix new_message=1 --llm-latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict
+
+import httpx
+
+from benchmarks.common import wait_ready
+from benchmarks.fakes import make_pdf, sample_text
+from benchmarks.load import MIX, parse_mix, workload
+
+
+async def _client(url: str, args, seed: int) -> Dict[str, int]:
+    pdf = make_pdf([sample_text(400, page) for page in range(args.pages)])
+    operations = workload(pdf)
+    names, weights = zip(*args.mix)
+    rng = random.Random(seed)
+    # request numbers (and so user ids) differ between client processes
+    requests = iter(range(seed * 1_000_000, sys.maxsize))
+    counts = {"requests": 0, "errors": 0}
+    deadline = time.monotonic() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=url, limits=limits, timeout=args.timeout
+    ) as client:
+        async def worker():
+            while time.monotonic() < deadline:
+                name = rng.choices(names, weights)[0]
+                method, path, kwargs = operations[name](next(requests))
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                counts["errors" if failed else "requests"] += 1
+
+        await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    return counts
+
+
+def client_process(url: str, args, seed: int, queue):
+    queue.put(asyncio.run(_client(url, args, seed)))
+
+
+def measure(workers: int, args) -> dict:
+    env = {
+        **os.environ,
+        "API_WORKERS": str(workers),
+        "LOAD_LLM_LATENCY": str(args.llm_latency)
+    }
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", args.app,
+            "--factory", "--workers", str(workers),
+            "--port", str(args.port), "--log-level", "warning"
+        ],
+        env=env
+    )
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_ready(f"{url}/health")
+        queue = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(
+                target=client_process,
+                args=(url, args, seed, queue)
+            )
+            for seed in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        counts = [queue.get() for _ in clients]
+        for client in clients:
+            client.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    total = sum(count["requests"] for count in counts)
+    return {
+        "workers": workers,
+        "requests": total,
+        "errors": sum(count["errors"] for count in counts),
+        "requests_per_second": total / args.duration
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=18765)
+    parser.add_argument("--app", default="benchmarks.load:create_fake_app",
+                        help="app factory served by uvicorn")
+    parser.add_argument("--mix", nargs="+", type=str, default=MIX,
+                        help="operation=weight, as in benchmarks.load")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    args.mix = parse_mix(args.mix)
+
+    results = [measure(workers, args) for workers in args.workers]
+    base = results[0]["requests_per_second"] or 1
+    for result in results:
+        result["speedup"] = result["requests_per_second"] / base
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,22 @@
 import uvicorn
-import os
 
-from src.main import create_app
+from src.infrastructure.config import settings
+from src.infrastructure.database import ChromaDB
 
 
 if __name__ == "__main__":
-    app = create_app()
-    PORT = os.getenv("API_PORT", 9876)
-
-    uvicorn.run(app, host="0.0.0.0", port=int(PORT))
+    # fails here, before starting workers that would all fail the same way
+    ChromaDB.check_mode()
+    # factory mode: each worker process builds its own app (and its own
+    # connections) after it starts, nothing is shared between workers
+    uvicorn.run(
+        "src.main:create_app",
+        factory=True,
+        host="0.0.0.0",
+        port=settings.API_PORT,
+        workers=settings.API_WORKERS,
+        limit_concurrency=settings.API_LIMIT_CONCURRENCY or None,
+        backlog=settings.API_BACKLOG,
+        timeout_keep_alive=settings.API_KEEP_ALIVE,
+        timeout_graceful_shutdown=int(settings.SHUTDOWN_TIMEOUT)
+    )
@@ -0,0 +1,63 @@
+"""
+Exporta e restaura colecoes do ChromaDB (ver Snapshot), sem reler os
+arquivos originais nem refazer os embeddings.
+
+    python snapshot.py export teste_jose backups/teste_jose --dtype float16
+    python snapshot.py restore backups/teste_jose --collection teste_copia
+
+Com CHROMA_MODE=persistent a API precisa estar parada: ela mantem
+CHROMA_PATH travado enquanto roda, e o comando falha nesse caso.
+"""
+import argparse
+import asyncio
+import json
+
+from src.infrastructure.database import ChromaDB, Snapshot
+
+
+async def main(args) -> dict:
+    vector_store = ChromaDB()
+    snapshot = Snapshot(args.path)
+    try:
+        if args.command == "export":
+            return await snapshot.export(
+                vector_store,
+                args.collection,
+                dtype=args.dtype,
+                records_format=args.format,
+                page_size=args.page_size
+            )
+        return await snapshot.restore(
+            vector_store,
+            collection_name=args.collection,
+            batch_size=args.page_size
+        )
+    finally:
+        await vector_store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export")
+    export.add_argument("collection")
+    export.add_argument("path")
+    export.add_argument("--dtype", choices=Snapshot.DTYPES,
+                        default="float32")
+    export.add_argument("--format", choices=Snapshot.FORMATS,
+                        default="jsonl")
+
+    restore = commands.add_parser("restore")
+    restore.add_argument("path")
+    restore.add_argument("--collection", default=None,
+                         help="defaults to the exported collection name")
+
+    for command in (export, restore):
+        command.add_argument("--page-size", type=int, default=None)
+
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args)), indent=2))
@@ -1,17 +1,28 @@
 from .guardrails import Guardrail
 from .files import (
     controller_upload_file,
+    controller_upload_files,
     controller_list_files,
+    controller_stream_files,
     controller_list_collections,
-    controller_delete_file
+    controller_delete_file,
+    controller_reindex,
+    controller_reindex_status
 )
 from .crag import contr_new_message
+from .health import controller_readiness, controller_startup
 
 __all__ = [
     "Guardrail",
     "controller_upload_file",
+    "controller_upload_files",
     "controller_list_files",
+    "controller_stream_files",
     "controller_list_collections",
     "controller_delete_file",
-    "contr_new_message"
+    "controller_reindex",
+    "controller_reindex_status",
+    "contr_new_message",
+    "controller_readiness",
+    "controller_startup"
 ]
@@ -1,45 +1,108 @@
+import asyncio
 from datetime import datetime
+from fastapi import BackgroundTasks
 from langchain_ollama import OllamaLLM
 from langchain_openai import ChatOpenAI
 
-from src.services.crag import CRAG
-from src.infrastructure.database import MongoDB
+from src.services.crag import CRAG, HistorySummarizer
+from src.infrastructure.config import current_user
+from src.services.llama_guard import LlamaGuard
+from src.infrastructure.database import (
+    MongoDB,
+    HistoryWriter,
+    HistoryCache,
+    BlockedUsers
+)
+from .guardrails import Guardrail
 from src.infrastructure.database import (
     add_message_to_history,
-    get_messages_history
+    get_conversation
 )
 
 
+async def guarded(agent_step, guardrail_check):
+    """
+    Executa a checagem do LlamaGuard em paralelo com o agente. Se a
+    mensagem for insegura, o agente e cancelado e o erro do guardrail e
+    propagado; caso contrario, retorna a resposta do agente.
+    """
+    agent_task = asyncio.ensure_future(agent_step)
+    guard_task = asyncio.ensure_future(guardrail_check)
+    try:
+        _ = await guard_task
+    except BaseException:
+        agent_task.cancel()
+        raise
+    return await agent_task
+
+
 async def contr_new_message(
     message: str,
     user_id: str,
     crag: CRAG,
     llm: ChatOpenAI | OllamaLLM,
-    database: MongoDB
+    database: MongoDB,
+    summarizer: HistorySummarizer = None,
+    background_tasks: BackgroundTasks = None,
+    writer: HistoryWriter = None,
+    cache: HistoryCache = None,
+    llama_guard: LlamaGuard = None,
+    blocked_users: BlockedUsers = None,
+    models: dict = None,
+    background_llm: ChatOpenAI | OllamaLLM = None
 ) -> str:
+    # LLM calls of this request (graph nodes, summarizer) are queued
+    # fairly per user by the scheduler
+    current_user.set(user_id)
 
-    history = await get_messages_history(user_id, database)
-    history.append({
+    conversation = await get_conversation(user_id, database, writer, cache)
+    new_messages = [{
         "role": "user",
         "content": message,
         "timestamp": datetime.now().isoformat()
-    })
+    }]
+    unsummarized = max(
+        conversation["summarized_until"] - conversation["offset"], 0
+    )
 
-    response = await crag.invoke(
-        messages=history,
-        model=llm
+    agent_step = crag.invoke(
+        messages=conversation["history"][unsummarized:] + new_messages,
+        model=llm,
+        summary=conversation["summary"],
+        models=models
     )
+    if llama_guard:
+        response = await guarded(
+            agent_step,
+            Guardrail().llama_guard_layer(
+                message, llama_guard, user_id, database, blocked_users
+            )
+        )
+    else:
+        response = await agent_step
 
-    history.append({
+    new_messages.append({
         "role": "assistant",
         "content": response["messages"],
         "timestamp": datetime.now().isoformat()
     })
 
     _ = await add_message_to_history(
-        messages=history,
+        messages=new_messages,
         user_id=user_id,
-        database=database
+        database=database,
+        writer=writer,
+        cache=cache
     )
 
+    if summarizer and background_tasks:
+        background_tasks.add_task(
+            summarizer.refresh,
+            user_id,
+            database,
+            background_llm or llm,
+            writer,
+            cache
+        )
+
     return response["messages"]
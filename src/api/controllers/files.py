@@ -1,9 +1,13 @@
-from src.services.document_reader import DocumentReader
-from src.infrastructure.database import ChromaDB
+import asyncio
+
+from src.services.document_reader import BulkIngestion, DocumentReader
+from src.infrastructure.database import ChromaDB, ReindexJob
 from src.infrastructure.config import settings
-from src.api.models import FileMetadata
+from src.api.models import FileMetadata, ReindexRequest
 
 from fastapi import UploadFile
+from pydantic import ValidationError
+from typing import Any, Dict, List, Optional
 
 
 async def controller_upload_file(
@@ -20,13 +24,90 @@ async def controller_upload_file(
         await vector_store.add_documents(
             documents=content["content"],
             collection_name=settings.INDEX_NAME,
-            metadatas=[metadata for _ in content["content"]],
+            metadatas=[
+                {
+                    **metadata,
+                    **{k: v for k, v in chunk.items() if v is not None}
+                }
+                for chunk in content["chunks"]
+            ],
         )
         return True
     except Exception as e:
         raise ValueError(f"Error uploading file: {e}")
 
 
+async def controller_upload_files(
+    files: List[UploadFile],
+    metadata: FileMetadata,
+    vector_store: ChromaDB,
+    files_metadata: Optional[Dict[str, Dict[str, Any]]] = None
+):
+    """
+    Ingestao em lote: varios arquivos e/ou pacotes zip/tar, com
+    metadados por arquivo. Retorna o resultado de cada arquivo; os
+    arquivos com metadados invalidos falham sem serem indexados.
+    """
+    valid, invalid = {}, {}
+    for name, file_metadata in (files_metadata or {}).items():
+        try:
+            # null is accepted by FileMetadata, it means no metadata
+            valid[name] = FileMetadata(metadata=file_metadata).metadata or {}
+        except ValidationError as e:
+            invalid[name] = "Invalid metadata: " + "; ".join(
+                error["msg"] for error in e.errors()
+            )
+
+    return await BulkIngestion(vector_store).ingest(
+        files,
+        defaults=metadata.model_dump()["metadata"],
+        metadata=valid,
+        invalid=invalid
+    )
+
+
+async def controller_reindex(
+    request: ReindexRequest,
+    vector_store: ChromaDB,
+    jobs: Dict[str, ReindexJob]
+) -> Optional[dict]:
+    """
+    Inicia (ou continua) o re-index da colecao em background. Retorna
+    None se ja houver um job rodando para ela, neste ou em outro worker
+    (lease no catalogo).
+    """
+    running = jobs.get(request.collection_name)
+    if running and running.running:
+        return None
+
+    job = ReindexJob(
+        vector_store,
+        request.embedding_model,
+        alias=request.collection_name,
+        dimension=request.dimension
+    )
+    if not await job.claim():
+        return None
+    jobs[request.collection_name] = job
+    job.start()
+    return {
+        "collection_name": request.collection_name,
+        "embedding_model": request.embedding_model
+    }
+
+
+async def controller_reindex_status(
+    collection_name: str,
+    vector_store: ChromaDB,
+    jobs: Dict[str, ReindexJob]
+) -> Optional[dict]:
+    if job := jobs.get(collection_name):
+        return job.progress()
+    return await asyncio.to_thread(
+        ReindexJob.saved, vector_store, collection_name
+    )
+
+
 async def controller_list_collections(
     vector_store: ChromaDB
 ):
@@ -40,6 +121,13 @@ async def controller_list_files(
     return await vector_store.list_documents(collection_name)
 
 
+async def controller_stream_files(
+    collection_name: str,
+    vector_store: ChromaDB
+):
+    return await vector_store.iter_documents(collection_name)
+
+
 async def controller_delete_file(
     collection_name: str,
     file_id: str,
@@ -4,32 +4,28 @@ from src.api.models import APIRequest
 from src.services.llama_guard import LlamaGuard
 from src.infrastructure.database import (
     MongoDB,
-    get_user_details,
+    BlockedUsers,
     block_user
 )
 
 
 class Guardrail:
-    def __call__(self, api_request: APIRequest, req: Request) -> None:
-        if req.app.llama_guard:
-            self.llama_guard_layer(
-                api_request.message,
-                req.app.llama_guard,
-                api_request.user_id,
-                req.app.database
-            )
-        self.check_user(api_request.user_id, req.app.database)
+    async def __call__(self, api_request: APIRequest, req: Request) -> None:
+        self.check_user(api_request.user_id, req.app.blocked_users)
 
-    def llama_guard_layer(
+    async def llama_guard_layer(
         self,
         message: str,
         llama_guard: LlamaGuard,
         user_id: str,
-        db: MongoDB
+        db: MongoDB,
+        blocked_users: BlockedUsers = None
     ) -> None:
-        response = llama_guard(message)
-        if not response:
-            _ = block_user(user_id, db)
+        response = await llama_guard.classify(message)
+        if not response.safe:
+            _ = await block_user(user_id, db)
+            if blocked_users is not None:
+                blocked_users.add(user_id)
 
             raise HTTPException(
                 status_code=400,
@@ -37,13 +33,12 @@ class Guardrail:
                     O conteúdo fornecido viola as políticas da plataforma.
                     O seu usuário foi bloqueado.
 
-                    Retorno do LLAMA GUARD: {response}
+                    Retorno do LLAMA GUARD: {response.raw}
                 """
             )
 
-    def check_user(self, user_id: str, db: MongoDB):
-        user_details = get_user_details(user_id, db)
-        if user_details and user_details.get("blocked"):
+    def check_user(self, user_id: str, blocked_users: BlockedUsers):
+        if blocked_users is not None and user_id in blocked_users:
             raise HTTPException(
                 status_code=400,
                 detail="""
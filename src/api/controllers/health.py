@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict
+
+from fastapi import FastAPI
+
+from src.infrastructure.config import settings, LLM
+
+
+logger = logging.getLogger(__name__)
+
+
+def dependency_probes(app: FastAPI) -> Dict[str, Callable[[], Awaitable]]:
+    return {
+        "mongodb": app.database.ping,
+        "chromadb": app.vector_store.heartbeat,
+        "llm": lambda: LLM.health_check(app.llm)
+    }
+
+
+async def _probe(probe: Callable[[], Awaitable], timeout: float) -> str:
+    try:
+        await asyncio.wait_for(probe(), timeout)
+        return "ok"
+    except asyncio.TimeoutError:
+        return "timeout"
+    except Exception as e:
+        return f"error: {e}"
+
+
+async def controller_readiness(
+    app: FastAPI,
+    timeout: float = None
+) -> Dict[str, str]:
+    """
+    Testa todas as dependencias em paralelo. Cada uma retorna "ok" ou o
+    motivo da falha, sem interromper as demais.
+    """
+    probes = dependency_probes(app)
+    results = await asyncio.gather(*[
+        _probe(probe, timeout or settings.HEALTH_CHECK_TIMEOUT)
+        for probe in probes.values()
+    ])
+    readiness = dict(zip(probes, results))
+    app.readiness = readiness
+    return readiness
+
+
+async def controller_startup(app: FastAPI) -> Dict[str, str]:
+    readiness = await controller_readiness(app, settings.STARTUP_TIMEOUT)
+    for name, status in readiness.items():
+        if status != "ok":
+            logger.warning(
+                "Dependency %s not ready at startup: %s", name, status
+            )
+    return readiness
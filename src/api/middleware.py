@@ -0,0 +1,102 @@
+import json
+import logging
+import time
+
+from src.infrastructure.metrics import registry, start_trace
+from src.infrastructure.resources import Resources
+
+
+logger = logging.getLogger("src.api.requests")
+
+HTTP_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "path", "status")
+)
+
+
+class InFlightMiddleware:
+    """
+    Conta as requisicoes HTTP em andamento (incluindo as background
+    tasks executadas apos a resposta), para que o shutdown possa
+    esperar por elas.
+    """
+
+    def __init__(self, app, resources: Resources):
+        self.app = app
+        self.resources = resources
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        self.resources.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.resources.request_finished()
+
+
+class RequestContextMiddleware:
+    """
+    Da um id para cada requisicao (X-Request-ID, recebido ou gerado),
+    coleta os spans medidos durante ela e registra a latencia por rota.
+    Opcionalmente escreve uma linha de log em JSON por requisicao.
+    """
+
+    HEADER = b"x-request-id"
+
+    def __init__(self, app, log_json: bool = False):
+        self.app = app
+        self.log_json = log_json
+        if log_json and not logger.handlers:
+            # one bare JSON object per line, independent of the app logging
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = dict(scope["headers"]).get(self.HEADER)
+        request_id = incoming.decode("latin-1") if incoming else None
+        status_code = 500
+
+        with start_trace(request_id) as trace:
+            header = (self.HEADER, trace.request_id.encode("latin-1"))
+
+            async def send_with_id(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    message["headers"] = [
+                        *message.get("headers", []), header
+                    ]
+                await send(message)
+
+            start = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                seconds = time.perf_counter() - start
+                # the route template keeps the label cardinality bounded
+                route = scope.get("route")
+                path = getattr(route, "path", None) or "unmatched"
+                HTTP_SECONDS.observe(
+                    seconds,
+                    method=scope["method"],
+                    path=path,
+                    status=status_code
+                )
+                if self.log_json:
+                    logger.info(json.dumps({
+                        "request_id": trace.request_id,
+                        "method": scope["method"],
+                        "path": path,
+                        "status": status_code,
+                        "seconds": round(seconds, 6),
+                        **trace.summary()
+                    }))
@@ -1,4 +1,4 @@
 from .api import APIResponse, APIRequest
-from .files import FileMetadata
+from .files import FileMetadata, ReindexRequest
 
-__all__ = ["APIResponse", "APIRequest", "FileMetadata"]
+__all__ = ["APIResponse", "APIRequest", "FileMetadata", "ReindexRequest"]
@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, Dict, Any
 
 from src.infrastructure.config import settings
@@ -10,3 +10,22 @@ class FileMetadata(BaseModel):
         "created_at": datetime.now().isoformat(),
         "collection_name": settings.INDEX_NAME
     })
+
+    @field_validator("metadata")
+    @classmethod
+    def scalar_values(cls, metadata):
+        # the only metadata types the vector store accepts
+        for key, value in (metadata or {}).items():
+            if value is not None and not isinstance(
+                value, (str, int, float, bool)
+            ):
+                raise ValueError(
+                    f"metadata '{key}' must be a string, number or boolean"
+                )
+        return metadata
+
+
+class ReindexRequest(BaseModel):
+    embedding_model: str
+    dimension: Optional[int] = None
+    collection_name: str = settings.INDEX_NAME
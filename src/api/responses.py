@@ -0,0 +1,77 @@
+from typing import Any, AsyncIterator, Iterable, Optional
+
+import orjson
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    """
+    Tipos que o orjson nao conhece: modelos pydantic, colecoes do
+    ChromaDB (versoes que retornam objetos em list_collections) e
+    conjuntos. Qualquer outro tipo e um erro (TypeError, como o orjson
+    espera), em vez de virar texto na resposta.
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if hasattr(value, "name") and hasattr(value, "metadata"):
+        return {"name": value.name, "metadata": value.metadata}
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(
+        f"Object of type {type(value).__name__} is not JSON serializable"
+    )
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse serializada com orjson. Retornada diretamente pelas
+    rotas, tambem evita a validacao e o jsonable_encoder do FastAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def api_response(
+    status_code: int,
+    status_message: Optional[str] = None,
+    response: Any = None
+) -> FastJSONResponse:
+    """
+    Mesmo corpo do APIResponse, sem validar nem copiar o conteudo, para
+    respostas grandes (listagens).
+    """
+    return FastJSONResponse(
+        status_code=status_code,
+        content={
+            "status_code": status_code,
+            "status_message": status_message,
+            "response": response
+        }
+    )
+
+
+class NDJSONResponse(StreamingResponse):
+    """
+    Um objeto JSON por linha, enviado conforme os itens sao gerados,
+    sem montar a resposta inteira em memoria.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, items: AsyncIterator[Iterable[Any]], **kwargs):
+        super().__init__(self._lines(items), **kwargs)
+
+    @staticmethod
+    async def _lines(items: AsyncIterator[Iterable[Any]]):
+        # items comes in pages, one chunk of the body per page
+        async for page in items:
+            yield b"".join(dumps(item) + b"\n" for item in page)
@@ -1,5 +1,14 @@
 from .files import router as files_router
 from .crag import router as crag_router
+from .health import router as health_router
+from .metrics import router as metrics_router
+from .debug import router as debug_router
 
 
-__all__ = ["files_router", "crag_router"]
+__all__ = [
+    "files_router",
+    "crag_router",
+    "health_router",
+    "metrics_router",
+    "debug_router"
+]
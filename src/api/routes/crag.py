@@ -1,28 +1,49 @@
-from fastapi import APIRouter, HTTPException, status, Request
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Request,
+    status
+)
 
 from src.api.models import APIResponse, APIRequest
-# from src.api.controllers import Guardrail
+from src.infrastructure.config import AdmissionRejected
+from src.api.controllers import Guardrail
 from src.api.controllers.crag import contr_new_message
 
 
 router = APIRouter(
     prefix="/crag",
-    tags=["CRAG"],
-    dependencies=[
-        # Depends(Guardrail())
-    ]
+    tags=["CRAG"]
 )
 
 
-@router.post("/new_message", status_code=status.HTTP_200_OK)
-async def new_message(api_request: APIRequest, req: Request) -> APIResponse:
+@router.post(
+    "/new_message",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(Guardrail())]
+)
+async def new_message(
+    api_request: APIRequest,
+    req: Request,
+    background_tasks: BackgroundTasks
+) -> APIResponse:
     try:
         response = await contr_new_message(
             api_request.message,
             api_request.user_id,
             req.app.crag,
             req.app.llm,
-            req.app.database
+            req.app.database,
+            summarizer=req.app.summarizer,
+            background_tasks=background_tasks,
+            writer=req.app.history_writer,
+            cache=req.app.history_cache,
+            llama_guard=req.app.llama_guard,
+            blocked_users=req.app.blocked_users,
+            models=req.app.models,
+            background_llm=req.app.background_llm
         )
 
         return APIResponse(
@@ -31,8 +52,50 @@ async def new_message(api_request: APIRequest, req: Request) -> APIResponse:
             response=response
         )
 
+    except HTTPException:
+        raise
+
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+
+
+@router.get("/stats", status_code=status.HTTP_200_OK)
+async def stats(req: Request) -> APIResponse:
+    return APIResponse(
+        status_code=status.HTTP_200_OK,
+        response={
+            "history_writer": (
+                req.app.history_writer.stats()
+                if req.app.history_writer else None
+            ),
+            "history_cache": (
+                req.app.history_cache.stats()
+                if req.app.history_cache else None
+            ),
+            "llama_guard": (
+                req.app.llama_guard.stats()
+                if req.app.llama_guard else None
+            ),
+            "nodes": req.app.crag.latency.stats(),
+            "corrective": req.app.crag.corrective.stats(),
+            "llm_scheduler": (
+                req.app.llm_scheduler.stats()
+                if req.app.llm_scheduler else None
+            ),
+            "speculative": (
+                req.app.crag.speculative.stats()
+                if req.app.crag.speculative else None
+            ),
+            "mongo_indexes": req.app.resources.mongo_indexes
+        }
+    )
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException, Request, status
+
+from src.api.models import APIResponse
+
+
+router = APIRouter(tags=["debug"], prefix="/debug")
+
+
+@router.get("/event_loop", status_code=status.HTTP_200_OK)
+async def event_loop(req: Request) -> APIResponse:
+    monitor = req.app.resources.loop_monitor
+    if monitor is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event loop monitor disabled (LOOP_MONITOR_ENABLED)"
+        )
+
+    return APIResponse(
+        status_code=status.HTTP_200_OK,
+        response=monitor.stats()
+    )
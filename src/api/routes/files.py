@@ -1,7 +1,12 @@
+import json
+from typing import List, Optional
+
 from fastapi import (
     APIRouter,
     File,
+    Form,
     HTTPException,
+    Query,
     Request,
     UploadFile,
     status
@@ -9,12 +14,17 @@ from fastapi import (
 
 from src.api.controllers import (
     controller_upload_file,
+    controller_upload_files,
     controller_list_files,
+    controller_stream_files,
     controller_list_collections,
-    controller_delete_file
+    controller_delete_file,
+    controller_reindex,
+    controller_reindex_status
 )
 
-from src.api.models import FileMetadata, APIResponse
+from src.api.models import FileMetadata, APIResponse, ReindexRequest
+from src.api.responses import NDJSONResponse, api_response
 
 
 router = APIRouter(tags=["files"], prefix="/files")
@@ -39,7 +49,7 @@ async def list_collections(
         collections = await controller_list_collections(
             vector_store=req.app.vector_store
         )
-        return APIResponse(
+        return api_response(
             status_code=status.HTTP_200_OK,
             status_message="Collections listed successfully",
             response={
@@ -56,15 +66,26 @@ async def list_collections(
 )
 async def list_files(
     collection_name: str,
-    req: Request
+    req: Request,
+    format: str = Query(
+        "json",
+        pattern="^(json|ndjson)$",
+        description="ndjson streams one document per line, in pages"
+    )
 ):
     try:
+        if format == "ndjson":
+            return NDJSONResponse(await controller_stream_files(
+                collection_name=collection_name,
+                vector_store=req.app.vector_store
+            ))
+
         files = await controller_list_files(
             collection_name=collection_name,
             vector_store=req.app.vector_store
         )
 
-        return APIResponse(
+        return api_response(
             status_code=status.HTTP_200_OK,
             response={
                 "files": files
@@ -94,6 +115,44 @@ async def upload_files(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.put("/upload_bulk", status_code=status.HTTP_201_CREATED)
+async def upload_bulk(
+    req: Request,
+    files: List[UploadFile] = File(...),
+    metadata: Optional[str] = Form(
+        None,
+        description="JSON object mapping each file name (or path inside "
+                    "an archive) to its metadata"
+    )
+) -> APIResponse:
+    try:
+        files_metadata = json.loads(metadata) if metadata else {}
+        if not isinstance(files_metadata, dict):
+            raise ValueError("metadata must be a JSON object")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        result = await controller_upload_files(
+            files=files,
+            metadata=FileMetadata(),
+            vector_store=req.app.vector_store,
+            files_metadata=files_metadata
+        )
+
+        summary = result["summary"]
+        return APIResponse(
+            status_code=status.HTTP_201_CREATED,
+            status_message=(
+                f"{summary['ok']} of {summary['files']} files "
+                f"uploaded successfully"
+            ),
+            response=result
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete(
     "/delete_file/{collection_name}/{file_id}",
     status_code=status.HTTP_204_NO_CONTENT
@@ -115,3 +174,54 @@ async def delete_file(
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/reindex", status_code=status.HTTP_202_ACCEPTED)
+async def reindex(
+    request: ReindexRequest,
+    req: Request
+) -> APIResponse:
+    try:
+        started = await controller_reindex(
+            request=request,
+            vector_store=req.app.vector_store,
+            jobs=req.app.resources.reindex_jobs
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if started is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Re-index of {request.collection_name} already running"
+        )
+    return APIResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        status_message="Re-index started",
+        response=started
+    )
+
+
+@router.get(
+    "/reindex/{collection_name}",
+    status_code=status.HTTP_200_OK
+)
+async def reindex_status(
+    collection_name: str,
+    req: Request
+) -> APIResponse:
+    try:
+        progress = await controller_reindex_status(
+            collection_name=collection_name,
+            vector_store=req.app.vector_store,
+            jobs=req.app.resources.reindex_jobs
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No re-index for {collection_name}"
+        )
+    return APIResponse(status_code=status.HTTP_200_OK, response=progress)
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse
+
+from src.api.models import APIResponse
+from src.api.controllers.health import controller_readiness
+
+
+router = APIRouter(tags=["health"], prefix="/health")
+
+
+@router.get("", status_code=status.HTTP_200_OK)
+async def liveness() -> APIResponse:
+    return APIResponse(
+        status_code=status.HTTP_200_OK,
+        status_message="alive"
+    )
+
+
+@router.get("/ready", status_code=status.HTTP_200_OK)
+async def readiness(req: Request):
+    dependencies = await controller_readiness(req.app)
+    ready = all(result == "ok" for result in dependencies.values())
+    status_code = (
+        status.HTTP_200_OK if ready
+        else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+    return JSONResponse(
+        status_code=status_code,
+        content=APIResponse(
+            status_code=status_code,
+            status_message="ready" if ready else "not ready",
+            response=dependencies
+        ).model_dump()
+    )
@@ -1,4 +1,19 @@
 from .settings import settings
 from .llm import LLM
+from .llm_pool import LLMPool
+from .llm_scheduler import (
+    AdmissionRejected,
+    LLMScheduler,
+    ScheduledModel,
+    current_user
+)
 
-__all__ = ["settings", "LLM"]
+__all__ = [
+    "settings",
+    "LLM",
+    "LLMPool",
+    "AdmissionRejected",
+    "LLMScheduler",
+    "ScheduledModel",
+    "current_user"
+]
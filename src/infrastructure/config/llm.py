@@ -1,38 +1,197 @@
+import httpx
+from typing import Dict, Tuple
+
 from .settings import settings
+from .llm_pool import Endpoint, LLMPool
+from src.infrastructure.metrics import LLMMetrics
 
 from langchain_ollama import ChatOllama
 from langchain_openai import ChatOpenAI
 
 
 class LLM:
+    NODES = ("agent", "grader", "generator")
+    PROVIDERS = ("ollama", "openai")
+    _clients: Dict[
+        Tuple[str, str, float, Tuple[str, ...]], ChatOllama | ChatOpenAI
+    ] = {}
+
     def __new__(cls):
-        model_name = settings.MODEL
+        return cls.get(
+            settings.MODEL,
+            settings.MODEL_NAME,
+            settings.MODEL_TEMPERATURE
+        )
+
+    @classmethod
+    def get(
+        cls,
+        provider: str,
+        model_name: str,
+        temperature: float,
+        urls: str = ""
+    ) -> ChatOllama | ChatOpenAI | LLMPool:
+        """
+        Cliente para o modelo, reutilizado entre chamadas com a mesma
+        configuracao. urls (separadas por virgula) vazio usa MODEL_URLS,
+        que so vale para o provider de MODEL; os outros usam a url
+        padrao deles. Com mais de uma url, retorna um pool.
+        """
+        if not urls and provider == settings.MODEL:
+            urls = settings.MODEL_URLS
+        urls = tuple(url.strip() for url in urls.split(",") if url.strip())
+        key = (provider, model_name, temperature, urls)
+        if key in cls._clients:
+            return cls._clients[key]
+
+        if len(urls) > 1:
+            model = cls.pool(provider, model_name, temperature, urls)
+        else:
+            model = cls.build(
+                provider, model_name, temperature, urls[0] if urls else None
+            )
+
+        # a single handler on the outer client, so pooled calls are not
+        # counted once per endpoint
+        model.callbacks = [LLMMetrics(model_name)]
+        cls._clients[key] = model
+        return model
+
+    @classmethod
+    def for_nodes(cls) -> Dict[str, ChatOllama | ChatOpenAI | LLMPool]:
+        """
+        Modelo de cada no do grafo, configurado em <NO>_MODEL
+        ("provider:model_name"), <NO>_MODEL_TEMPERATURE e
+        <NO>_MODEL_URLS. Nos sem configuracao usam o modelo padrao
+        (MODEL/MODEL_NAME). O prefixo do provider e opcional, ex:
+        "ollama:llama3.2:1b" ou "gpt-4o-mini".
+        """
+        models = {}
+        for node in cls.NODES:
+            spec = getattr(settings, f"{node.upper()}_MODEL")
+            temperature = getattr(
+                settings, f"{node.upper()}_MODEL_TEMPERATURE"
+            )
+            provider, _, model_name = spec.partition(":")
+            if provider not in cls.PROVIDERS:
+                # no provider prefix, e.g. "llama3.2:1b"
+                provider, model_name = settings.MODEL, spec
+            models[node] = cls.get(
+                provider,
+                model_name or settings.MODEL_NAME,
+                (
+                    temperature if temperature is not None
+                    else settings.MODEL_TEMPERATURE
+                ),
+                getattr(settings, f"{node.upper()}_MODEL_URLS")
+            )
+        return models
 
-        if model_name == "ollama":
+    @staticmethod
+    def build(
+        provider: str,
+        model_name: str,
+        temperature: float,
+        base_url: str = None
+    ) -> ChatOllama | ChatOpenAI:
+        if provider == "ollama":
             model = ChatOllama(
-                model=settings.MODEL_NAME,
-                base_url=settings.MODEL_URL,
-                temperature=settings.MODEL_TEMPERATURE
+                model=model_name,
+                base_url=base_url or settings.MODEL_URL,
+                temperature=temperature
             )
 
-        elif model_name == "openai":
+        elif provider == "openai":
             model = ChatOpenAI(
-                model=settings.MODEL_NAME,
-                temperature=settings.MODEL_TEMPERATURE,
-                api_key=settings.MODEL_API_KEY
+                model=model_name,
+                temperature=temperature,
+                api_key=settings.MODEL_API_KEY,
+                base_url=base_url
             )
         # More models can be added here
         else:
-            raise ValueError(f"Model {model_name} not supported")
+            raise ValueError(f"Model {provider} not supported")
 
-        _ = cls.ping_model(model)
         return model
 
+    @classmethod
+    def pool(
+        cls,
+        provider: str,
+        model_name: str,
+        temperature: float,
+        urls: Tuple[str, ...]
+    ) -> LLMPool:
+        return LLMPool(
+            endpoints=[
+                Endpoint(
+                    cls.build(provider, model_name, temperature, url),
+                    settings.LLM_POOL_MAX_CONCURRENCY
+                )
+                for url in urls
+            ],
+            probe=cls.health_check
+        )
+
     @staticmethod
-    def ping_model(model: ChatOllama | ChatOpenAI) -> None:
+    async def health_check(model: ChatOllama | ChatOpenAI) -> None:
+        """
+        Verifica se o provedor esta acessivel listando os modelos
+        disponiveis, sem gerar texto (nem carregar os pesos do modelo).
+        Modelos de outros tipos (ex: os falsos dos benchmarks) nao sao
+        verificados.
+        """
+        if isinstance(model, LLMPool):
+            return await model.health_check()
+
+        wrapped = getattr(model, "model", None)
+        if wrapped is not None and not isinstance(wrapped, str):
+            # ScheduledModel
+            return await LLM.health_check(wrapped)
+
+        if isinstance(model, ChatOllama):
+            base_url = model.base_url or settings.MODEL_URL
+            url = base_url.rstrip("/") + "/api/tags"
+            headers = {}
+        elif isinstance(model, ChatOpenAI):
+            base_url = model.openai_api_base or "https://api.openai.com/v1"
+            url = base_url.rstrip("/") + "/models"
+            headers = {"Authorization": f"Bearer {settings.MODEL_API_KEY}"}
+        else:
+            return None
+
         try:
-            model.invoke("Hello, world!")
+            async with httpx.AsyncClient(
+                timeout=settings.HEALTH_CHECK_TIMEOUT
+            ) as client:
+                response = await client.get(url, headers=headers)
+                response.raise_for_status()
         except Exception as e:
             raise ValueError(
                 f"Problem pinging the model: {e}"
             )
+
+    @staticmethod
+    async def close(model) -> None:
+        """
+        Fecha as sessoes HTTP abertas pelos clientes do modelo.
+        """
+        if isinstance(model, LLMPool):
+            await model.stop()
+            for endpoint in model.endpoints:
+                await LLM.close(endpoint.model)
+            return
+
+        for name in ("_client", "root_client"):
+            client = getattr(model, name, None)
+            client = getattr(client, "_client", client)
+            if client is not None and hasattr(client, "close"):
+                client.close()
+
+        for name in ("_async_client", "root_async_client"):
+            client = getattr(model, name, None)
+            client = getattr(client, "_client", client)
+            if client is not None and hasattr(client, "aclose"):
+                await client.aclose()
+            elif client is not None and hasattr(client, "close"):
+                await client.close()
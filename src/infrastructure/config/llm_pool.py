@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+from .settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class Endpoint:
+    """
+    Um servidor do pool, com o seu cliente e o seu estado de saude.
+    """
+
+    def __init__(self, model: BaseChatModel, max_concurrency: int):
+        self.model = model
+        self.url = (
+            getattr(model, "base_url", None)
+            or getattr(model, "openai_api_base", None)
+            or ""
+        )
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.failures = 0
+        self.healthy = True
+        self.ejected_at = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors
+        }
+
+
+class LLMPool(BaseChatModel):
+    """
+    Chat model que distribui as chamadas entre varios endpoints do mesmo
+    provedor, escolhendo o endpoint saudavel com menos chamadas em
+    andamento. Cada endpoint tem um limite de chamadas simultaneas;
+    endpoints que falham LLM_POOL_MAX_FAILURES vezes seguidas sao
+    removidos e voltam apos um health check bem sucedido (ou, sem health
+    checks ativos, apos LLM_POOL_EJECT_SECONDS como tentativa).
+
+    Pode ser usado no lugar de um ChatOllama/ChatOpenAI (invoke,
+    bind_tools, with_structured_output, ...).
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    endpoints: List[Endpoint]
+    probe: Optional[Callable[[BaseChatModel], Awaitable]] = None
+    max_failures: int = settings.LLM_POOL_MAX_FAILURES
+    eject_seconds: float = settings.LLM_POOL_EJECT_SECONDS
+    acquire_timeout: float = settings.LLM_POOL_ACQUIRE_TIMEOUT
+
+    _condition: threading.Condition = PrivateAttr(
+        default_factory=threading.Condition
+    )
+    # async callers wait on futures of their loop, woken by _release
+    _waiters: Deque[asyncio.Future] = PrivateAttr(default_factory=deque)
+    _health_task: Optional[asyncio.Task] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm-pool"
+
+    def _pick(self) -> Optional[Endpoint]:
+        now = time.monotonic()
+        candidates = [
+            endpoint for endpoint in self.endpoints
+            if endpoint.in_flight < endpoint.max_concurrency and (
+                endpoint.healthy
+                or now - endpoint.ejected_at >= self.eject_seconds
+            )
+        ]
+        if not candidates:
+            return None
+
+        endpoint = min(candidates, key=lambda e: e.in_flight)
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        if not endpoint.healthy:
+            # half-open: lets a single request test the endpoint again
+            endpoint.ejected_at = now
+        return endpoint
+
+    def _acquire(self) -> Endpoint:
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._condition:
+            while (endpoint := self._pick()) is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("No LLM endpoint available")
+                self._condition.wait(remaining)
+        return endpoint
+
+    async def _aacquire(self) -> Endpoint:
+        """
+        Como _acquire, mas esperando no event loop: uma chamada
+        cancelada enquanto espera nao fica com nenhum endpoint.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.acquire_timeout
+        while True:
+            with self._condition:
+                if (endpoint := self._pick()) is not None:
+                    return endpoint
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise TimeoutError("No LLM endpoint available")
+                waiter = loop.create_future()
+                self._waiters.append(waiter)
+
+            timer = loop.call_later(remaining, self._expire, waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # woken just before the cancellation: pass it on
+                    with self._condition:
+                        self._notify_waiter()
+                raise
+            finally:
+                timer.cancel()
+                with self._condition:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+
+    @staticmethod
+    def _expire(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(False)
+
+    def _wake(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            # timed out or cancelled since it was chosen
+            with self._condition:
+                self._notify_waiter()
+        else:
+            waiter.set_result(True)
+
+    def _notify_waiter(self) -> None:
+        """
+        Acorda o proximo chamador async (com o lock), no loop dele.
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+                return
+
+    def _notify(self, every: bool = False) -> None:
+        if every:
+            self._condition.notify_all()
+            while self._waiters:
+                self._notify_waiter()
+        else:
+            self._condition.notify()
+            self._notify_waiter()
+
+    def _release(self, endpoint: Endpoint, error: bool = False) -> None:
+        with self._condition:
+            endpoint.in_flight -= 1
+            if error:
+                endpoint.errors += 1
+                endpoint.failures += 1
+                if endpoint.failures >= self.max_failures and endpoint.healthy:
+                    logger.warning("Ejecting LLM endpoint %s", endpoint.url)
+                    endpoint.healthy = False
+                    endpoint.ejected_at = time.monotonic()
+            else:
+                endpoint.failures = 0
+                endpoint.healthy = True
+            self._notify()
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        for attempt in range(len(self.endpoints)):
+            endpoint = self._acquire()
+            error = False
+            try:
+                return endpoint.model._generate(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                )
+            except Exception:
+                error = True
+                if attempt == len(self.endpoints) - 1:
+                    raise
+            finally:
+                self._release(endpoint, error=error)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        for attempt in range(len(self.endpoints)):
+            endpoint = await self._aacquire()
+            error = False
+            try:
+                return await endpoint.model._agenerate(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                )
+            except Exception:
+                error = True
+                if attempt == len(self.endpoints) - 1:
+                    raise
+            finally:
+                # also on cancellation, which is not an endpoint error
+                self._release(endpoint, error=error)
+
+    def bind_tools(self, tools, **kwargs):
+        # all endpoints share the provider, so the first one knows how to
+        # format the tools for it
+        template = self.endpoints[0].model.bind_tools(tools, **kwargs)
+        return self.bind(**template.kwargs)
+
+    async def health_check(self) -> None:
+        """
+        Testa todos os endpoints em paralelo, atualizando quais estao
+        saudaveis. Falha apenas se nenhum estiver disponivel.
+        """
+        if self.probe is None:
+            return
+
+        results = await asyncio.gather(
+            *[self.probe(endpoint.model) for endpoint in self.endpoints],
+            return_exceptions=True
+        )
+        with self._condition:
+            for endpoint, result in zip(self.endpoints, results):
+                if isinstance(result, Exception):
+                    if endpoint.healthy:
+                        logger.warning(
+                            "LLM endpoint %s failed health check: %s",
+                            endpoint.url, result
+                        )
+                    endpoint.healthy = False
+                    endpoint.ejected_at = time.monotonic()
+                else:
+                    endpoint.healthy = True
+                    endpoint.failures = 0
+            self._notify(every=True)
+
+        if not any(endpoint.healthy for endpoint in self.endpoints):
+            raise ValueError("No healthy LLM endpoint")
+
+    async def _health_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.health_check()
+            except Exception as e:
+                logger.warning("LLM pool health check: %s", e)
+
+    def start(self, interval: Optional[float] = None) -> None:
+        if self._health_task is None and self.probe is not None:
+            self._health_task = asyncio.create_task(
+                self._health_loop(
+                    interval or settings.LLM_POOL_HEALTH_INTERVAL
+                )
+            )
+
+    async def stop(self) -> None:
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [endpoint.stats() for endpoint in self.endpoints]
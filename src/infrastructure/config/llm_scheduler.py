@@ -0,0 +1,269 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from pydantic import ConfigDict
+
+from .settings import settings
+from src.infrastructure.metrics import registry
+
+
+QUEUE_WAIT = registry.histogram(
+    "llm_queue_wait_seconds",
+    "Time LLM calls waited for a scheduler slot",
+    ("priority",)
+)
+REJECTED = registry.counter(
+    "llm_rejected_total",
+    "LLM calls shed by the scheduler",
+    ("priority", "reason")
+)
+
+# user of the current request, set by the controller; the graph nodes
+# run in threads with a copy of the context, so they see it too
+current_user: ContextVar[str] = ContextVar("llm_user", default="")
+
+
+class AdmissionRejected(Exception):
+    """
+    Chamada recusada pelo scheduler: fila cheia (429) ou tempo maximo na
+    fila excedido (503).
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    """
+    Controle de admissao para as chamadas ao LLM.
+
+    Limita as chamadas simultaneas (LLM_MAX_CONCURRENCY). As que excedem
+    o limite esperam em filas por prioridade (chat > grading >
+    background) e, dentro de cada prioridade, uma fila por usuario
+    atendida em round-robin, para que um usuario com muitas chamadas nao
+    atrase os demais. Chamadas que passam do tempo maximo de espera da
+    sua prioridade, ou que encontram a fila cheia, sao recusadas.
+    """
+
+    CHAT = 0
+    GRADING = 1
+    BACKGROUND = 2
+    NAMES = {CHAT: "chat", GRADING: "grading", BACKGROUND: "background"}
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_queue_per_user: Optional[int] = None,
+        timeouts: Optional[Dict[int, float]] = None
+    ):
+        self.max_concurrency = (
+            max_concurrency or settings.LLM_MAX_CONCURRENCY
+        )
+        self.max_queue = max_queue or settings.LLM_MAX_QUEUE
+        self.max_queue_per_user = (
+            max_queue_per_user or settings.LLM_MAX_QUEUE_PER_USER
+        )
+        self.timeouts = timeouts or {
+            self.CHAT: settings.LLM_QUEUE_TIMEOUT_CHAT,
+            self.GRADING: settings.LLM_QUEUE_TIMEOUT_GRADING,
+            self.BACKGROUND: settings.LLM_QUEUE_TIMEOUT_BACKGROUND
+        }
+
+        self.active = 0
+        self.queued = 0
+        self._queues: Dict[int, OrderedDict] = {
+            priority: OrderedDict() for priority in self.NAMES
+        }
+        self._lock = threading.Lock()
+
+        self.admitted = {name: 0 for name in self.NAMES.values()}
+        self.rejected = {name: 0 for name in self.NAMES.values()}
+
+    def wrap(self, model: BaseChatModel, priority: int) -> "ScheduledModel":
+        return ScheduledModel(
+            model=model,
+            scheduler=self,
+            priority=priority,
+            callbacks=model.callbacks
+        )
+
+    def _reject(self, priority: int, reason: str, status_code: int):
+        name = self.NAMES[priority]
+        self.rejected[name] += 1
+        REJECTED.inc(priority=name, reason=reason)
+        return AdmissionRejected(
+            f"LLM {reason} for {name} calls",
+            status_code,
+            max(int(self.timeouts[priority] / 2), 1)
+        )
+
+    def _enqueue(self, priority: int, user: str) -> Future:
+        waiter = Future()
+        with self._lock:
+            if self.active < self.max_concurrency and self.queued == 0:
+                self.active += 1
+                waiter.set_result(True)
+                return waiter
+
+            users = self._queues[priority]
+            if self.queued >= self.max_queue:
+                raise self._reject(priority, "queue full", 429)
+            if len(users.get(user, ())) >= self.max_queue_per_user:
+                raise self._reject(priority, "user queue full", 429)
+
+            users.setdefault(user, deque()).append(waiter)
+            self.queued += 1
+        return waiter
+
+    def _next(self) -> Optional[Future]:
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            if users:
+                user, waiters = next(iter(users.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                self.queued -= 1
+                return waiter
+        return None
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+            while self.active < self.max_concurrency:
+                waiter = self._next()
+                if waiter is None:
+                    break
+                self.active += 1
+                waiter.set_result(True)
+
+    def _abandon(self, waiter: Future, priority: int, user: str) -> bool:
+        """
+        Desiste da espera. Retorna True se o slot ja tinha sido concedido
+        (e agora pertence a quem chamou).
+        """
+        with self._lock:
+            if waiter.done():
+                return True
+            waiters = self._queues[priority].get(user)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                self.queued -= 1
+                if not waiters:
+                    del self._queues[priority][user]
+            waiter.cancel()
+            return False
+
+    def _admitted(self, priority: int, start: float) -> None:
+        name = self.NAMES[priority]
+        self.admitted[name] += 1
+        QUEUE_WAIT.observe(time.perf_counter() - start, priority=name)
+
+    def acquire(self, priority: int) -> None:
+        start = time.perf_counter()
+        user = current_user.get()
+        waiter = self._enqueue(priority, user)
+        try:
+            waiter.result(timeout=self.timeouts[priority])
+        except FutureTimeout:
+            if not self._abandon(waiter, priority, user):
+                raise self._reject(priority, "queue timeout", 503)
+        self._admitted(priority, start)
+
+    async def aacquire(self, priority: int) -> None:
+        start = time.perf_counter()
+        user = current_user.get()
+        waiter = self._enqueue(priority, user)
+        try:
+            done, _ = await asyncio.wait(
+                {asyncio.wrap_future(waiter)},
+                timeout=self.timeouts[priority]
+            )
+        except asyncio.CancelledError:
+            if self._abandon(waiter, priority, user):
+                self.release()
+            raise
+        if not done and not self._abandon(waiter, priority, user):
+            raise self._reject(priority, "queue timeout", 503)
+        self._admitted(priority, start)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self.active,
+                "queued": {
+                    self.NAMES[priority]: sum(len(w) for w in users.values())
+                    for priority, users in self._queues.items()
+                },
+                "admitted": dict(self.admitted),
+                "rejected": dict(self.rejected)
+            }
+
+
+class ScheduledModel(BaseChatModel):
+    """
+    Chat model que pede um slot ao LLMScheduler antes de cada chamada ao
+    modelo original, com a prioridade do seu papel.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model: BaseChatModel
+    scheduler: LLMScheduler
+    priority: int = LLMScheduler.CHAT
+
+    @property
+    def _llm_type(self) -> str:
+        return "scheduled"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        self.scheduler.acquire(self.priority)
+        try:
+            return self.model._generate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            )
+        finally:
+            self.scheduler.release()
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        await self.scheduler.aacquire(self.priority)
+        try:
+            return await self.model._agenerate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            )
+        finally:
+            self.scheduler.release()
+
+    def bind_tools(self, tools, **kwargs):
+        template = self.model.bind_tools(tools, **kwargs)
+        return self.bind(**template.kwargs)
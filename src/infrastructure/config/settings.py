@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
@@ -7,19 +8,72 @@ class Settings(BaseSettings):
     MONGO_HOST: str = "localhost"
     MONGO_PORT: str = "27017"
     MONGO_DB: str
+    MONGO_TIMEOUT_MS: int = 5000
+    # creates the indexes of the hot queries at startup and checks that
+    # they are used; 0 days keeps the history forever
+    MONGO_CREATE_INDEXES: bool = True
+    HISTORY_TTL_DAYS: float = 0
 
     # ChromaDB
-    CHROMA_HOST: str
+    CHROMA_HOST: str = "localhost"
     CHROMA_PORT: int = 8000
     CHROMA_DB: str
+    # "http" (chroma server) or "persistent" (embedded, stored in
+    # CHROMA_PATH; one process only, so API_WORKERS must be 1)
+    CHROMA_MODE: str = "http"
+    CHROMA_PATH: str = "data/chroma"
+    # how long a worker caches the collection an alias points to
+    CHROMA_ALIAS_TTL: float = 5.0
+    # re-index (embedding model change): documents per page read from
+    # the source, per embedding call and embedding calls in parallel
+    REINDEX_PAGE_SIZE: int = 1000
+    REINDEX_BATCH_SIZE: int = 100
+    REINDEX_CONCURRENCY: int = 4
+    # a running re-index whose state was not saved for this long is
+    # considered dead and can be taken over by another worker
+    REINDEX_LEASE_SECONDS: float = 60.0
+    # records per page when exporting and per insert when restoring
+    SNAPSHOT_PAGE_SIZE: int = 5000
     INDEX_NAME: str
     VECTOR_DIMENSION: int
     CHUNK_SIZE: int
     CHUNK_OVERLAP: int
+    # token based sizes; 0 derives them from CHUNK_SIZE/CHUNK_OVERLAP
+    CHUNK_TOKENS: int = 0
+    CHUNK_OVERLAP_TOKENS: int = 0
+    CHUNK_PROCESSES: int = 0
+    CHUNK_PARALLEL_BYTES: int = 1_000_000
+    CHUNK_SEGMENT_BYTES: int = 200_000
+    # bulk ingestion: chunks per embedding call and size limit per file
+    BULK_EMBED_BATCH: int = 256
+    BULK_MAX_FILE_BYTES: int = 100_000_000
+
+    # History persistence
+    HISTORY_WRITE_BEHIND: bool = True
+    HISTORY_FLUSH_INTERVAL: float = 0.05
+    HISTORY_BATCH_SIZE: int = 500
+    HISTORY_SHUTDOWN_TIMEOUT: float = 10.0
+    HISTORY_CACHE_ENABLED: bool = True
+    HISTORY_CACHE_SIZE: int = 10000
+    HISTORY_CACHE_TTL: float = 300.0
+    HISTORY_CACHE_MESSAGES: int = 50
+    HISTORY_CACHE_INVALIDATION: bool = False
 
     # General Settings
     TIMEZONE: str = "America/Sao_Paulo"
     API_PORT: int
+    API_WORKERS: int = 1
+    API_LIMIT_CONCURRENCY: int = 0
+    API_BACKLOG: int = 2048
+    API_KEEP_ALIVE: int = 5
+    # responses larger than this are gzip compressed (0 disables)
+    RESPONSE_GZIP_MIN_BYTES: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 5
+    # documents per page in the NDJSON listing of /files/list_files
+    LIST_PAGE_SIZE: int = 1000
+    STARTUP_TIMEOUT: float = 10.0
+    HEALTH_CHECK_TIMEOUT: float = 2.0
+    SHUTDOWN_TIMEOUT: float = 30.0
 
     # LLM
     MODEL: str = "ollama"
@@ -27,10 +81,83 @@ class Settings(BaseSettings):
     MODEL_URL: str = "http://localhost:11434"
     MODEL_TEMPERATURE: float = 0.2
     MODEL_API_KEY: str = ''
+    MODEL_URLS: str = ""
+    LLM_POOL_MAX_CONCURRENCY: int = 4
+    LLM_POOL_MAX_FAILURES: int = 3
+    LLM_POOL_EJECT_SECONDS: float = 30.0
+    LLM_POOL_ACQUIRE_TIMEOUT: float = 60.0
+    LLM_POOL_HEALTH_INTERVAL: float = 10.0
     EMBEDDING_MODEL: str = "llama3"
 
+    # LLM admission control
+    LLM_SCHEDULER_ENABLED: bool = True
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_MAX_QUEUE: int = 256
+    LLM_MAX_QUEUE_PER_USER: int = 16
+    LLM_QUEUE_TIMEOUT_CHAT: float = 30.0
+    LLM_QUEUE_TIMEOUT_GRADING: float = 30.0
+    LLM_QUEUE_TIMEOUT_BACKGROUND: float = 120.0
+    # Threads running the graph nodes, which block waiting for the
+    # scheduler; 0 sizes the pool so every queued call gets a thread
+    # (LLM_MAX_CONCURRENCY * 2 + LLM_MAX_QUEUE)
+    CRAG_NODE_WORKERS: int = 0
+
+    # Per-node models, as "provider:model_name" (empty uses MODEL), and
+    # their urls, comma separated (empty uses MODEL_URLS when the node
+    # has MODEL's provider, the provider's default url otherwise)
+    AGENT_MODEL: str = ""
+    AGENT_MODEL_TEMPERATURE: Optional[float] = None
+    AGENT_MODEL_URLS: str = ""
+    GRADER_MODEL: str = ""
+    GRADER_MODEL_TEMPERATURE: Optional[float] = None
+    GRADER_MODEL_URLS: str = ""
+    GENERATOR_MODEL: str = ""
+    GENERATOR_MODEL_TEMPERATURE: Optional[float] = None
+    GENERATOR_MODEL_URLS: str = ""
+
+    # Speculative retrieval, started with the user message in parallel
+    # with the agent node
+    SPECULATIVE_RETRIEVAL: bool = False
+    SPECULATIVE_SIMILARITY: float = 0.85
+    SPECULATIVE_WORKERS: int = 4
+    # How long the tools node waits for the speculative search before
+    # searching again with the agent query
+    SPECULATIVE_TIMEOUT: float = 2.0
+
+    # Corrective loop: grading stops after CRAG_RELEVANT_K relevant
+    # documents (0 grades all); with fewer than CRAG_MIN_RELEVANT, the
+    # query is rewritten and retrieved again, at most CRAG_MAX_ITERATIONS
+    # times and while within CRAG_LATENCY_BUDGET seconds of the request
+    CRAG_RELEVANT_K: int = 3
+    CRAG_MIN_RELEVANT: int = 1
+    CRAG_MAX_ITERATIONS: int = 2
+    CRAG_LATENCY_BUDGET: float = 20.0
+
+    # Prompt budget
+    TOKENIZER_ENCODING: str = ""
+    CONTEXT_MAX_TOKENS: int = 3000
+    HISTORY_MAX_TOKENS: int = 1000
+    CONTEXT_METADATA_KEYS: str = "file_name,page"
+
+    # History summarization
+    SUMMARY_ENABLED: bool = True
+    SUMMARY_TRIGGER_TOKENS: int = 2000
+    SUMMARY_KEEP_MESSAGES: int = 4
+
+    # Observability
+    METRICS_ENABLED: bool = True
+    REQUEST_LOG_JSON: bool = False
+    LOOP_MONITOR_ENABLED: bool = False
+    LOOP_MONITOR_INTERVAL: float = 0.05
+    LOOP_MONITOR_THRESHOLD: float = 0.1
+    LOOP_MONITOR_MAX_EVENTS: int = 50
+
     # LlamaGuard
     LLAMA_GUARD_MODEL: str = "llama-guard3"
+    LLAMA_GUARD_ENABLED: bool = False
+    BLOCKED_USERS_REFRESH: float = 30.0
+    LLAMA_GUARD_CACHE_SIZE: int = 10000
+    LLAMA_GUARD_CACHE_TTL: float = 3600.0
     BASE_URL: str
 
     class Config:
@@ -1,18 +1,34 @@
 from .chromadb.connector import ChromaDB
+from .chromadb.reindex import ReindexJob
+from .chromadb.snapshot import Snapshot
 from .mongodb.connector import MongoDB
+from .mongodb.writer import HistoryWriter
+from .mongodb.history_cache import HistoryCache
+from .mongodb.blocked_users import BlockedUsers
+from .mongodb.indexes import ensure_indexes
 from .mongodb.utils import (
     get_user_details,
     block_user,
     add_message_to_history,
-    get_messages_history
+    get_messages_history,
+    get_conversation,
+    save_history_summary
 )
 
 
 __all__ = [
     "MongoDB",
     "ChromaDB",
+    "ReindexJob",
+    "Snapshot",
+    "HistoryWriter",
+    "HistoryCache",
+    "BlockedUsers",
+    "ensure_indexes",
     "get_user_details",
     "block_user",
     "add_message_to_history",
-    "get_messages_history"
+    "get_messages_history",
+    "get_conversation",
+    "save_history_summary"
 ]
@@ -1,17 +1,35 @@
+import os
 import uuid
+import time
+import asyncio
+import threading
 import chromadb
 from langchain_chroma import Chroma
 from langchain_ollama import OllamaEmbeddings
 from langchain.tools import tool
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from src.infrastructure.config import settings
+from src.infrastructure.metrics import span, traced
+
+try:
+    import fcntl
+except ImportError:  # windows: CHROMA_PATH is not locked
+    fcntl = None
 
 
 class ChromaDB:
+    MODES = ("http", "persistent")
+    # aliases and re-index jobs, one record each (no real embeddings)
+    CATALOG = "crag-catalog"
+
+    _shared: Optional["ChromaDB"] = None
+
     def __init__(self):
+        self.mode = self.check_mode()
         self.host = settings.CHROMA_HOST
         self.port = settings.CHROMA_PORT
+        self.path = settings.CHROMA_PATH
         self.collection_name = settings.INDEX_NAME
         self.collection = None
         self.expected_dimension = settings.VECTOR_DIMENSION
@@ -19,16 +37,184 @@ class ChromaDB:
             model=settings.EMBEDDING_MODEL,
             base_url=settings.MODEL_URL
         )
+        self.embedding_functions: Dict[str, object] = {}
+        self._client = None
+        self._retriever = None
+        self._retriever_collection = None
+        self._aliases: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self._path_lock = None
+
+    @classmethod
+    def check_mode(cls) -> str:
+        """
+        Valida CHROMA_MODE. O modo persistent abre os arquivos do banco no
+        proprio processo, entao nao pode ser usado com mais de um worker.
+        """
+        mode = settings.CHROMA_MODE.lower()
+        if mode not in cls.MODES:
+            raise ValueError(
+                f"Invalid CHROMA_MODE '{settings.CHROMA_MODE}', "
+                f"expected one of {', '.join(cls.MODES)}"
+            )
+        if mode == "persistent" and settings.API_WORKERS > 1:
+            raise ValueError(
+                "CHROMA_MODE 'persistent' supports a single process, "
+                f"got API_WORKERS={settings.API_WORKERS}; use "
+                "CHROMA_MODE 'http' with more than one worker"
+            )
+        return mode
+
+    @classmethod
+    def shared(cls) -> "ChromaDB":
+        """
+        Instancia compartilhada pela API e pelas tools do agente, para nao
+        abrir uma nova conexao a cada chamada.
+        """
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @property
+    def client(self):
+        """
+        Cliente criado na primeira utilizacao, e nao na inicializacao.
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    try:
+                        self._client = self._connect()
+                    except Exception as e:
+                        raise ConnectionError(
+                            f"Failed to connect to ChromaDB: {e}"
+                        )
+        return self._client
+
+    @property
+    def retriever(self):
+        """
+        Retriever da colecao para a qual INDEX_NAME aponta; recriado
+        quando o alias e trocado.
+        """
+        name = self.resolve(self.collection_name)
+        if self._retriever is None or self._retriever_collection != name:
+            self._retriever = self._as_retriever(name)
+            self._retriever_collection = name
+        return self._retriever
+
+    def _catalog(self):
+        return self.client.get_or_create_collection(
+            self.CATALOG, embedding_function=None
+        )
+
+    def get_record(self, key: str) -> Optional[dict]:
+        records = self._catalog().get(ids=[key], include=["metadatas"])
+        return records["metadatas"][0] if records["ids"] else None
+
+    def put_record(self, key: str, record: dict) -> None:
+        self._catalog().upsert(
+            ids=[key],
+            embeddings=[[0.0]],
+            metadatas=[record],
+            documents=[key]
+        )
+
+    def resolve(self, name: str) -> str:
+        """
+        Colecao fisica de um nome: o alvo do alias (criado pelo re-index
+        blue/green) ou o proprio nome. Cacheado por CHROMA_ALIAS_TTL
+        para que os outros workers vejam a troca; se o catalogo falhar,
+        continua com o ultimo alvo conhecido.
+        """
+        cached = self._aliases.get(name)
+        if cached and time.monotonic() - cached[1] < settings.CHROMA_ALIAS_TTL:
+            return cached[0]
         try:
-            self.client = self._connect()
-            self.retriever = self._as_retriever()
-        except Exception as e:
-            raise ConnectionError(f"Failed to connect to ChromaDB: {e}")
+            record = self.get_record(f"alias:{name}")
+        except Exception:
+            # not cached, so the catalog is tried again on the next call
+            return cached[0] if cached else name
+        target = record["target"] if record else name
+        self._aliases[name] = (target, time.monotonic())
+        return target
+
+    async def aresolve(self, name: str) -> str:
+        """
+        resolve para o event loop: a consulta ao catalogo roda em uma
+        thread quando o alias nao esta no cache.
+        """
+        cached = self._aliases.get(name)
+        if cached and time.monotonic() - cached[1] < settings.CHROMA_ALIAS_TTL:
+            return cached[0]
+        return await asyncio.to_thread(self.resolve, name)
+
+    def set_alias(self, alias: str, target: str) -> None:
+        """
+        Troca atomica do alias: um unico upsert no catalogo.
+        """
+        self.put_record(
+            f"alias:{alias}",
+            {"target": target, "updated_at": time.time()}
+        )
+        self._aliases[alias] = (target, time.monotonic())
+
+    def embeddings_for(self, collection) -> object:
+        """
+        Modelo de embeddings com que a colecao foi indexada (gravado nos
+        metadados dela pelo re-index); o das settings por padrao.
+        """
+        metadata = getattr(collection, "metadata", None) or {}
+        model = metadata.get("embedding_model")
+        if not model or model == settings.EMBEDDING_MODEL:
+            return self.embedding_function
+        if model not in self.embedding_functions:
+            self.embedding_functions[model] = OllamaEmbeddings(
+                model=model,
+                base_url=settings.MODEL_URL
+            )
+        return self.embedding_functions[model]
+
+    async def heartbeat(self) -> None:
+        await asyncio.to_thread(lambda: self.client.heartbeat())
 
     def _connect(self):
+        """
+        Cliente HTTP para o servidor do ChromaDB ou, no modo persistent,
+        o ChromaDB embutido no processo, gravando em disco em CHROMA_PATH
+        (sem o custo de rede e de serializar os vetores em JSON).
+        """
+        if self.mode == "persistent":
+            self._lock_path()
+            return chromadb.PersistentClient(
+                path=self.path,
+                settings=chromadb.config.Settings(
+                    anonymized_telemetry=False
+                )
+            )
         client = chromadb.HttpClient(host=self.host, port=self.port)
         return client
 
+    def _lock_path(self) -> None:
+        """
+        Trava CHROMA_PATH para este processo enquanto o cliente estiver
+        aberto: outro processo (outro worker da API, o snapshot.py) falha
+        aqui em vez de abrir os mesmos arquivos.
+        """
+        if fcntl is None or self._path_lock is not None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        lock = open(os.path.join(self.path, ".lock"), "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            raise RuntimeError(
+                f"CHROMA_PATH '{self.path}' is in use by another process "
+                "(stop the API before using it from another process)"
+            )
+        self._path_lock = lock
+
     def _create_collection(self, collection_name: str = None):
         """
         Cria uma nova coleção com a dimensão configurada no .env
@@ -56,47 +242,106 @@ class ChromaDB:
         """
         Cria um retriever adaptado à dimensão da coleção
         """
+        collection_name = collection_name or self.collection_name
         vector_store = Chroma(
             client=self.client,
-            collection_name=collection_name or self.collection_name,
-            embedding_function=self.embedding_function
+            collection_name=collection_name,
+            embedding_function=self.embeddings_for(
+                self._get_collection_info(collection_name)
+            )
         )
         retriever = vector_store.as_retriever()
 
         return retriever
 
+    @traced("chroma")
     async def add_documents(
         self,
         documents: List[str],
         collection_name: str,
         metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None
     ):
         """
         Adiciona documentos à coleção com dimensão configurada no .env
+        (com ids aleatorios quando nao informados)
         """
+        collection_name = await self.aresolve(collection_name)
         if not self.collection or self.collection.name != collection_name:
             self.collection = self._create_collection(collection_name)
 
-        embeddings = self.embedding_function.embed_documents(documents)
+        # embedding and insertion block, so they run off the event loop
+        embeddings = await asyncio.to_thread(
+            self.embeddings_for(self.collection).embed_documents, documents
+        )
 
-        return self.collection.add(
+        return await asyncio.to_thread(
+            self.collection.add,
             documents=documents,
             embeddings=embeddings,
             metadatas=metadatas,
-            ids=[str(uuid.uuid4()) for _ in enumerate(documents)],
+            ids=ids or [str(uuid.uuid4()) for _ in enumerate(documents)],
         )
 
     async def list_collections(self):
-        return self.client.list_collections()
+        # names since chromadb 0.6, Collection objects before
+        return [
+            collection for collection in self.client.list_collections()
+            if (
+                collection if isinstance(collection, str)
+                else collection.name
+            ) != self.CATALOG
+        ]
 
+    @traced("chroma")
     async def list_documents(
         self,
         collection_name: str
     ):
-        if collection := self.client.get_collection(collection_name):
+        if collection := self.client.get_collection(
+            await self.aresolve(collection_name)
+        ):
             return collection.get()
         return []
 
+    async def iter_documents(
+        self,
+        collection_name: str,
+        page_size: Optional[int] = None
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Documentos da colecao em paginas de {"id", "document",
+        "metadata"}, para listar colecoes grandes sem carregar tudo. A
+        colecao e buscada aqui, antes da primeira pagina, para que o
+        erro de colecao inexistente aconteca antes da resposta comecar.
+        """
+        collection = self.client.get_collection(
+            await self.aresolve(collection_name)
+        )
+        return self._pages(collection, page_size or settings.LIST_PAGE_SIZE)
+
+    @staticmethod
+    async def _pages(collection, page_size: int):
+        offset = 0
+        while True:
+            with span("chroma", "list_documents_page"):
+                page = await asyncio.to_thread(
+                    collection.get,
+                    limit=page_size,
+                    offset=offset,
+                    include=["documents", "metadatas"]
+                )
+            if not page["ids"]:
+                return
+            yield [
+                {"id": id_, "document": document, "metadata": metadata}
+                for id_, document, metadata in zip(
+                    page["ids"], page["documents"], page["metadatas"]
+                )
+            ]
+            offset += len(page["ids"])
+
+    @traced("chroma")
     async def query_documents(
         self,
         query_text: str,
@@ -107,10 +352,13 @@ class ChromaDB:
         """
         Consulta documentos adaptando à dimensão da coleção
         """
+        collection_name = await self.aresolve(collection_name)
         if not self.collection or self.collection.name != collection_name:
             self.collection = self.client.get_collection(collection_name)
 
-        query_embedding = self.embedding_function.embed_query(query_text)
+        query_embedding = self.embeddings_for(
+            self.collection
+        ).embed_query(query_text)
 
         try:
             return self.collection.query(
@@ -128,18 +376,35 @@ class ChromaDB:
                 )
             raise e
 
+    @traced("chroma")
     async def delete_documents(
         self,
         ids: List[str],
         collection_name: str
     ):
+        collection_name = await self.aresolve(collection_name)
         if not self.collection or self.collection.name != collection_name:
             self.collection = self.client.get_collection(collection_name)
         return self.collection.delete(ids=ids)
 
     async def close(self):
-        if self.client:
-            self.client.reset()
+        """
+        Fecha a sessao HTTP com o servidor (no modo persistent os dados
+        ja estao em disco). Nao chama client.reset(), que apagaria todos
+        os dados do ChromaDB.
+        """
+        if self._client is not None:
+            server = getattr(self._client, "_server", None)
+            if session := getattr(server, "_session", None):
+                session.close()
+            self._client = None
+            self._retriever = None
+            self._retriever_collection = None
+            self.collection = None
+        if self._path_lock is not None:
+            # closing the file releases the lock
+            self._path_lock.close()
+            self._path_lock = None
 
     @staticmethod
     @tool("retriever")
@@ -155,9 +420,8 @@ class ChromaDB:
             List[Document]: Uma lista de documentos recuperados
         """
         try:
-            db = ChromaDB()
-            retriever = db._as_retriever(settings.INDEX_NAME)
-            return retriever.invoke(query)
+            with span("chroma", "retrieve"):
+                return ChromaDB.shared().retriever.invoke(query)
         except Exception as e:
             raise e
 
@@ -175,9 +439,12 @@ class ChromaDB:
             List[dict]: Uma lista de dicionários contendo os arquivos.
         """
         try:
-            db = ChromaDB()
-            collection = db.client.get_collection(settings.INDEX_NAME)
-            results = collection.get() or []
+            db = ChromaDB.shared()
+            with span("chroma", "most_recent_files"):
+                collection = db.client.get_collection(
+                    db.resolve(settings.INDEX_NAME)
+                )
+                results = collection.get() or []
 
             created_at = [
                 (index, x["created_at"])
@@ -0,0 +1,329 @@
+import asyncio
+import logging
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from src.infrastructure.config import settings
+from .connector import ChromaDB
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReindexJob:
+    """
+    Re-index blue/green de uma colecao para um novo modelo de embeddings.
+
+    Le a colecao atual (a que o alias aponta) em paginas, refaz os
+    embeddings em lotes com concorrencia limitada e grava com os mesmos
+    ids em uma colecao sombra. No fim copia o que mudou durante o job e
+    troca o alias para a colecao nova, de uma vez; a antiga fica
+    intacta para rollback.
+
+    O progresso fica no catalogo do ChromaDB a cada pagina: se o
+    processo cair, um novo job para o mesmo alias e modelo continua da
+    ultima pagina gravada (os upserts sao idempotentes). O registro
+    tambem e o lease do job: o dono (owner) o regrava pelo menos a cada
+    REINDEX_LEASE_SECONDS / 3, e nenhum outro worker inicia um job para
+    o alias enquanto o lease nao expirar.
+    """
+
+    # the catalog has no compare-and-set: a claim is only kept if the
+    # record still has this job as owner after this many seconds
+    CLAIM_DELAY = 0.5
+
+    def __init__(
+        self,
+        vector_store: ChromaDB,
+        embedding_model: str,
+        alias: Optional[str] = None,
+        dimension: Optional[int] = None,
+        embeddings=None,
+        page_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ):
+        self.vector_store = vector_store
+        self.embedding_model = embedding_model
+        self.alias = alias or settings.INDEX_NAME
+        self.dimension = dimension or settings.VECTOR_DIMENSION
+        if embeddings is not None:
+            # used by this process when reading the new collection
+            vector_store.embedding_functions[embedding_model] = embeddings
+        self.page_size = page_size or settings.REINDEX_PAGE_SIZE
+        self.batch_size = batch_size or settings.REINDEX_BATCH_SIZE
+        self.concurrency = concurrency or settings.REINDEX_CONCURRENCY
+        self.state: Dict[str, Any] = {}
+        self.task: Optional[asyncio.Task] = None
+        self.owner = uuid.uuid4().hex
+        self._save_lock = asyncio.Lock()
+
+    @property
+    def key(self) -> str:
+        return f"reindex:{self.alias}"
+
+    @staticmethod
+    def saved(vector_store: ChromaDB, alias: str) -> Optional[dict]:
+        """
+        Estado gravado do ultimo job do alias (de qualquer worker).
+        """
+        return vector_store.get_record(f"reindex:{alias}")
+
+    def _target_name(self) -> str:
+        model = re.sub(r"[^a-zA-Z0-9_-]+", "-", self.embedding_model)
+        name = f"{self.alias}-{model}-{int(time.time())}"
+        return name[-63:].strip("-_") or name
+
+    def _leased(self, state: Optional[dict]) -> bool:
+        """
+        Se o job gravado esta rodando em outro worker, com o lease valido.
+        """
+        return bool(
+            state
+            and state["status"] == "running"
+            and state.get("owner")
+            and state["owner"] != self.owner
+            and time.time() - state.get("updated_at", 0)
+            < settings.REINDEX_LEASE_SECONDS
+        )
+
+    def _put(self, state: dict) -> None:
+        if self._leased(self.saved(self.vector_store, self.alias)):
+            raise RuntimeError(
+                f"Re-index of {self.alias} was taken over by another worker"
+            )
+        self.vector_store.put_record(self.key, state)
+
+    async def _save(self, **changes) -> None:
+        async with self._save_lock:
+            self.state.update(changes, updated_at=time.time())
+            await asyncio.to_thread(self._put, dict(self.state))
+
+    async def claim(self) -> bool:
+        """
+        Pega o lease do alias. Retorna False se outro worker esta
+        rodando um re-index dele.
+        """
+        state = await asyncio.to_thread(
+            self.saved, self.vector_store, self.alias
+        )
+        if self._leased(state):
+            return False
+        await asyncio.to_thread(self._load, state)
+        try:
+            await self._save(owner=self.owner)
+        except RuntimeError:
+            return False
+
+        # two workers claiming at once both write; the overwritten gives up
+        await asyncio.sleep(self.CLAIM_DELAY)
+        state = await asyncio.to_thread(
+            self.saved, self.vector_store, self.alias
+        )
+        return bool(state) and state.get("owner") == self.owner
+
+    def _load(self, state: Optional[dict]) -> None:
+        """
+        Continua um job interrompido do mesmo modelo ou inicia um novo.
+        """
+        if (
+            state
+            and state["status"] in ("running", "failed")
+            and state["embedding_model"] == self.embedding_model
+        ):
+            logger.info(
+                "Resuming re-index of %s at offset %s",
+                self.alias, state["offset"]
+            )
+            self.state = dict(state, status="running", error="")
+            return
+
+        self.state = {
+            "status": "running",
+            "alias": self.alias,
+            "source": self.vector_store.resolve(self.alias),
+            "target": self._target_name(),
+            "embedding_model": self.embedding_model,
+            "dimension": self.dimension,
+            "offset": 0,
+            "copied": 0,
+            "total": 0,
+            "started_at": time.time(),
+            "finished_at": 0.0,
+            "error": ""
+        }
+
+    def progress(self) -> Dict[str, Any]:
+        state = dict(
+            self.state or self.saved(self.vector_store, self.alias) or {}
+        )
+        if state.get("total"):
+            state["percent"] = round(
+                100 * min(state["copied"] / state["total"], 1.0), 2
+            )
+        return state
+
+    async def _copy(self, target, page: Dict[str, List]) -> int:
+        """
+        Grava uma pagina (ids, documentos e metadados) na colecao sombra,
+        com embeddings novos.
+        """
+        embeddings = self.vector_store.embeddings_for(target)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def batch(start: int) -> None:
+            end = start + self.batch_size
+            async with semaphore:
+                vectors = await asyncio.to_thread(
+                    embeddings.embed_documents, page["documents"][start:end]
+                )
+                await asyncio.to_thread(
+                    target.upsert,
+                    ids=page["ids"][start:end],
+                    embeddings=vectors,
+                    documents=page["documents"][start:end],
+                    metadatas=page["metadatas"][start:end]
+                )
+
+        await asyncio.gather(*[
+            batch(start) for start in range(0, len(page["ids"]),
+                                            self.batch_size)
+        ])
+        return len(page["ids"])
+
+    async def _ids(self, collection) -> set:
+        ids = set()
+        offset = 0
+        while True:
+            page = await asyncio.to_thread(
+                collection.get,
+                limit=self.page_size * 10,
+                offset=offset,
+                include=[]
+            )
+            if not page["ids"]:
+                return ids
+            ids.update(page["ids"])
+            offset += len(page["ids"])
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self) -> asyncio.Task:
+        """
+        Roda o job em background; o erro fica no estado (progress).
+        """
+        self.task = asyncio.create_task(self.run())
+        self.task.add_done_callback(
+            lambda task: task.cancelled() or task.exception()
+        )
+        return self.task
+
+    async def stop(self) -> None:
+        """
+        Interrompe o job (no shutdown); o estado continua "running", sem
+        dono, e um novo job para o mesmo alias e modelo continua de onde
+        parou.
+        """
+        if self.running:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            try:
+                await self._save(owner="")
+            except Exception:
+                # the lease expires by itself
+                logger.warning("Could not release re-index of %s", self.alias)
+
+    async def _heartbeat(self) -> None:
+        # renews the lease while a page takes long to copy
+        while True:
+            await asyncio.sleep(settings.REINDEX_LEASE_SECONDS / 3)
+            await self._save()
+
+    async def run(self) -> Dict[str, Any]:
+        if self.state.get("owner") != self.owner and not await self.claim():
+            raise RuntimeError(
+                f"Re-index of {self.alias} is running in another worker"
+            )
+        heartbeat = asyncio.create_task(self._heartbeat())
+        heartbeat.add_done_callback(
+            lambda task: task.cancelled() or task.exception()
+        )
+        try:
+            client = await asyncio.to_thread(
+                lambda: self.vector_store.client
+            )
+            source = await asyncio.to_thread(
+                client.get_collection, self.state["source"]
+            )
+            target = await asyncio.to_thread(
+                client.get_or_create_collection,
+                name=self.state["target"],
+                metadata={
+                    "hnsw:space": "cosine",
+                    "dimension": self.dimension,
+                    "embedding_model": self.embedding_model
+                },
+                embedding_function=None
+            )
+            await self._save(total=await asyncio.to_thread(source.count))
+
+            while True:
+                page = await asyncio.to_thread(
+                    source.get,
+                    limit=self.page_size,
+                    offset=self.state["offset"],
+                    include=["documents", "metadatas"]
+                )
+                if not page["ids"]:
+                    break
+                copied = await self._copy(target, page)
+                await self._save(
+                    offset=self.state["offset"] + copied,
+                    copied=self.state["copied"] + copied
+                )
+
+            # writes to the source while the job ran
+            source_ids = await self._ids(source)
+            target_ids = await self._ids(target)
+            missing = list(source_ids - target_ids)
+            for start in range(0, len(missing), self.page_size):
+                page = await asyncio.to_thread(
+                    source.get,
+                    ids=missing[start:start + self.page_size],
+                    include=["documents", "metadatas"]
+                )
+                await self._copy(target, page)
+            if removed := list(target_ids - source_ids):
+                await asyncio.to_thread(target.delete, ids=removed)
+
+            await asyncio.to_thread(
+                self.vector_store.set_alias, self.alias, self.state["target"]
+            )
+            await self._save(
+                status="done",
+                total=len(source_ids),
+                copied=len(source_ids),
+                finished_at=time.time()
+            )
+            logger.info(
+                "Re-index done: %s -> %s (%s documents)",
+                self.alias, self.state["target"], len(source_ids)
+            )
+        except Exception as e:
+            logger.exception("Re-index of %s failed", self.alias)
+            try:
+                await self._save(status="failed", error=str(e))
+            except RuntimeError:
+                # taken over: the state is the other worker's now
+                pass
+            raise
+        finally:
+            heartbeat.cancel()
+        return self.progress()
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.infrastructure.config import settings
+from .connector import ChromaDB
+
+
+FORMAT_VERSION = 1
+
+
+class Snapshot:
+    """
+    Snapshot de uma colecao do ChromaDB em um diretorio:
+
+    - manifest.json: nome, metadados da colecao, quantidade, dimensao e
+      tipo dos embeddings;
+    - records.jsonl (ou records.parquet, se o pyarrow estiver
+      instalado): id, documento e metadados, um registro por linha;
+    - embeddings.npy: matriz float32 ou float16, na mesma ordem.
+
+    O restore le os embeddings com memory mapping e insere em lotes, sem
+    refazer embeddings nem ler os arquivos originais.
+    """
+
+    FORMATS = ("jsonl", "parquet")
+    DTYPES = ("float32", "float16")
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def manifest(self) -> Dict[str, Any]:
+        with open(self._file("manifest.json")) as file:
+            return json.load(file)
+
+    async def export(
+        self,
+        vector_store: ChromaDB,
+        collection_name: str,
+        dtype: str = "float32",
+        records_format: str = "jsonl",
+        page_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        return await asyncio.to_thread(
+            self._export, vector_store, collection_name, dtype,
+            records_format, page_size or settings.SNAPSHOT_PAGE_SIZE
+        )
+
+    async def restore(
+        self,
+        vector_store: ChromaDB,
+        collection_name: Optional[str] = None,
+        batch_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        return await asyncio.to_thread(
+            self._restore, vector_store, collection_name,
+            batch_size or settings.SNAPSHOT_PAGE_SIZE
+        )
+
+    def _export(
+        self,
+        vector_store: ChromaDB,
+        collection_name: str,
+        dtype: str,
+        records_format: str,
+        page_size: int
+    ) -> Dict[str, Any]:
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Invalid dtype '{dtype}'")
+        if records_format not in self.FORMATS:
+            raise ValueError(f"Invalid format '{records_format}'")
+
+        start = time.perf_counter()
+        collection = vector_store.client.get_collection(
+            vector_store.resolve(collection_name)
+        )
+        count = collection.count()
+        os.makedirs(self.path, exist_ok=True)
+        writer = _records_writer(
+            self._file(f"records.{records_format}"), records_format
+        )
+
+        embeddings = None
+        written = 0
+        try:
+            while written < count:
+                page = collection.get(
+                    limit=min(page_size, count - written),
+                    offset=written,
+                    include=["documents", "metadatas", "embeddings"]
+                )
+                if not page["ids"]:
+                    # documents deleted during the export
+                    break
+                vectors = np.asarray(page["embeddings"], dtype=dtype)
+                if embeddings is None:
+                    embeddings = np.lib.format.open_memmap(
+                        self._file("embeddings.npy"),
+                        mode="w+",
+                        dtype=dtype,
+                        shape=(count, vectors.shape[1])
+                    )
+                embeddings[written:written + len(vectors)] = vectors
+                writer.write(
+                    page["ids"], page["documents"], page["metadatas"]
+                )
+                written += len(page["ids"])
+        finally:
+            writer.close()
+
+        if embeddings is None:
+            embeddings = np.lib.format.open_memmap(
+                self._file("embeddings.npy"), mode="w+", dtype=dtype,
+                shape=(0, 0)
+            )
+        embeddings.flush()
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "collection": collection.name,
+            "metadata": collection.metadata or {},
+            "count": written,
+            "dimension": int(embeddings.shape[1]),
+            "dtype": dtype,
+            "records": f"records.{records_format}",
+            "created_at": time.time()
+        }
+        with open(self._file("manifest.json"), "w") as file:
+            json.dump(manifest, file, indent=2)
+        return {**manifest, "seconds": time.perf_counter() - start}
+
+    def _restore(
+        self,
+        vector_store: ChromaDB,
+        collection_name: Optional[str],
+        batch_size: int
+    ) -> Dict[str, Any]:
+        start = time.perf_counter()
+        manifest = self.manifest()
+        if manifest["format_version"] > FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot version {manifest['format_version']}"
+            )
+
+        client = vector_store.client
+        # an alias is restored into the collection it points to, the one
+        # reads are served from
+        collection = client.get_or_create_collection(
+            name=vector_store.resolve(
+                collection_name or manifest["collection"]
+            ),
+            metadata=manifest["metadata"] or None,
+            embedding_function=None
+        )
+        if collection.count():
+            raise ValueError(
+                f"Collection '{collection.name}' is not empty"
+            )
+
+        embeddings = np.load(self._file("embeddings.npy"), mmap_mode="r")
+        batch_size = min(batch_size, client.get_max_batch_size())
+        restored = 0
+        for ids, documents, metadatas in _read_records(
+            self._file(manifest["records"]), batch_size
+        ):
+            ids = ids[:manifest["count"] - restored]
+            if not ids:
+                break
+            end = restored + len(ids)
+            collection.add(
+                ids=ids,
+                embeddings=np.asarray(
+                    embeddings[restored:end], dtype=np.float32
+                ),
+                documents=documents[:len(ids)],
+                # chroma rejects empty metadata dicts
+                metadatas=[m or None for m in metadatas[:len(ids)]]
+            )
+            restored = end
+
+        return {
+            "collection": collection.name,
+            "count": restored,
+            "seconds": time.perf_counter() - start
+        }
+
+
+class _JSONLWriter:
+
+    def __init__(self, path: str):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, ids, documents, metadatas) -> None:
+        self.file.writelines(
+            json.dumps(
+                {"id": id_, "document": document, "metadata": metadata},
+                ensure_ascii=False
+            ) + "\n"
+            for id_, document, metadata in zip(ids, documents, metadatas)
+        )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _ParquetWriter:
+
+    def __init__(self, path: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("id", pa.string()),
+            ("document", pa.string()),
+            # metadata values are mixed types, kept as json
+            ("metadata", pa.string())
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, ids, documents, metadatas) -> None:
+        self.writer.write_table(self.pa.table({
+            "id": ids,
+            "document": documents,
+            "metadata": [
+                json.dumps(m, ensure_ascii=False) for m in metadatas
+            ]
+        }, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def _records_writer(path: str, records_format: str):
+    if records_format == "jsonl":
+        return _JSONLWriter(path)
+    try:
+        return _ParquetWriter(path)
+    except ImportError:
+        raise ValueError("Parquet snapshots require pyarrow")
+
+
+Batch = Tuple[List[str], List[Optional[str]], List[Optional[dict]]]
+
+
+def _read_records(path: str, batch_size: int) -> Iterator[Batch]:
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet snapshots require pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size):
+            columns = batch.to_pydict()
+            yield (
+                columns["id"],
+                columns["document"],
+                [json.loads(m) for m in columns["metadata"]]
+            )
+        return
+
+    ids, documents, metadatas = [], [], []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            record = json.loads(line)
+            ids.append(record["id"])
+            documents.append(record["document"])
+            metadatas.append(record["metadata"])
+            if len(ids) == batch_size:
+                yield ids, documents, metadatas
+                ids, documents, metadatas = [], [], []
+    if ids:
+        yield ids, documents, metadatas
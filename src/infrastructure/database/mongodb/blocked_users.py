@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import List, Optional, Set
+
+from src.infrastructure.config import settings
+from .connector import MongoDB
+
+
+logger = logging.getLogger(__name__)
+
+
+class BlockedUsers:
+    """
+    Conjunto em memoria dos usuarios bloqueados, atualizado em background
+    a partir da collection "users". Permite checar o bloqueio sem uma
+    consulta ao MongoDB por requisicao.
+    """
+
+    def __init__(
+        self,
+        database: MongoDB,
+        refresh_interval: Optional[float] = None
+    ):
+        self.database = database
+        self.refresh_interval = (
+            refresh_interval or settings.BLOCKED_USERS_REFRESH
+        )
+        self._ids: Set[str] = set()
+        self._added: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, user_id: str) -> None:
+        self._ids.add(user_id)
+        self._added.append(user_id)
+
+    def _load(self) -> Set[str]:
+        collection = self.database.get_collection("users")
+        return {
+            document["id"]
+            for document in collection.find(
+                {"blocked": True}, {"id": 1, "_id": 0}
+            )
+            if document.get("id")
+        }
+
+    async def refresh(self) -> None:
+        self._added = []
+        ids = await asyncio.to_thread(self._load)
+        # keeps users blocked locally while the query was running
+        self._ids = ids.union(self._added)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("Error refreshing blocked users: %s", e)
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
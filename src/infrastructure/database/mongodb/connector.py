@@ -1,14 +1,19 @@
-from typing import List
+import asyncio
+from typing import Any, List, Optional
 from pymongo import MongoClient
 from pymongo.collection import Collection
 
 from src.infrastructure.config import settings
+from src.infrastructure.metrics import traced
 
 
 class MongoDB:
-    def __init__(self, db_name: str = None):
+    def __init__(self, db_name: str = None, lazy: bool = False):
         """Initialize MongoDB connector with default configuration.
 
+        With lazy=True no command is sent to the server here: pymongo
+        connects in the background and `ping` can be awaited later.
+
         Attributes:
             client (MongoClient): MongoDB client instance
             db (Database): Selected database instance
@@ -18,9 +23,18 @@ class MongoDB:
         self.db_name = db_name or settings.MONGO_DB
         self.uri = f"mongodb://{settings.MONGO_HOST}:{settings.MONGO_PORT}"
 
-        if self.check_connection():
+        if lazy:
+            self.client = self._client()
+            self.db = self.client[self.db_name]
+        elif self.check_connection():
             self.connect()
 
+    def _client(self) -> MongoClient:
+        return MongoClient(
+            self.uri,
+            serverSelectionTimeoutMS=settings.MONGO_TIMEOUT_MS
+        )
+
     def check_connection(self) -> bool:
         """Check MongoDB connection by sending a ping command.
 
@@ -28,7 +42,7 @@ class MongoDB:
             Exception: If connection fails or ping command fails
         """
         try:
-            self.client = MongoClient(self.uri)
+            self.client = self._client()
             self.client.admin.command('ping')
             return True
         except Exception as error:
@@ -46,6 +60,17 @@ class MongoDB:
         except Exception as error:
             raise ConnectionError(f"Failed to connect to database: {error}")
 
+    async def ping(self) -> None:
+        """Send a ping to the selected database without blocking the loop.
+
+        Raises:
+            ConnectionError: If the server does not answer the ping
+        """
+        try:
+            await asyncio.to_thread(self.db.command, 'ping')
+        except Exception as error:
+            raise ConnectionError(f"Failed to ping MongoDB: {error}")
+
     async def close(self) -> None:
         """Close MongoDB connection and reset client/db attributes.
 
@@ -68,6 +93,20 @@ class MongoDB:
         """
         return self.db[collection_name]
 
+    def explain(self, collection_name: str, filter_query: dict) -> dict:
+        """Return the plan MongoDB would use to run a find.
+
+        Args:
+            collection_name (str): Name of the collection
+            filter_query (dict): Query filter to explain
+
+        Returns:
+            dict: Output of the explain command (queryPlanner...)
+        """
+        collection = self.get_collection(collection_name)
+        return collection.find(filter_query).explain()
+
+    @traced("mongo")
     async def insert_one(self, collection_name: str, document: dict) -> None:
         """Insert a single document into a collection.
 
@@ -84,16 +123,19 @@ class MongoDB:
         except Exception as error:
             raise error
 
+    @traced("mongo")
     async def find(
         self,
         collection_name: str,
-        filter_query: dict
+        filter_query: dict,
+        projection: Optional[dict] = None
     ) -> List[dict]:
         """Find documents in a collection matching a filter query.
 
         Args:
             collection_name (str): Name of the collection to search
             filter_query (dict): Query filter to apply
+            projection (dict, optional): Fields to return
 
         Returns:
             List[dict]: List of matching documents
@@ -103,15 +145,17 @@ class MongoDB:
         """
         try:
             collection = self.get_collection(collection_name)
-            return list(collection.find(filter_query))
+            return list(collection.find(filter_query, projection))
         except Exception as error:
             raise error
 
+    @traced("mongo")
     async def update_one(
         self,
         collection_name: str,
         filter_query: dict,
-        update: dict
+        update: dict,
+        upsert: bool = False
     ) -> None:
         """Update a single document in a collection.
 
@@ -119,16 +163,44 @@ class MongoDB:
             collection_name (str): Name of the collection
             filter_query (dict): Query to find document to update
             update (dict): Update operations to apply
+            upsert (bool): Insert the document if none matches the filter
 
         Raises:
             Exception: If update fails or collection does not exist
         """
         try:
             collection = self.get_collection(collection_name)
-            collection.update_one(filter_query, update)
+            collection.update_one(filter_query, update, upsert=upsert)
+        except Exception as error:
+            raise error
+
+    @traced("mongo")
+    async def bulk_write(
+        self,
+        collection_name: str,
+        operations: List[Any]
+    ) -> None:
+        """Run several write operations in a single round trip.
+
+        The operations are sent unordered and the blocking driver call
+        runs in a worker thread, so the event loop is not stalled.
+
+        Args:
+            collection_name (str): Name of the collection
+            operations (List[Any]): pymongo write operations (UpdateOne...)
+
+        Raises:
+            Exception: If the bulk write fails
+        """
+        try:
+            collection = self.get_collection(collection_name)
+            await asyncio.to_thread(
+                collection.bulk_write, operations, ordered=False
+            )
         except Exception as error:
             raise error
 
+    @traced("mongo")
     async def delete_one(self, collection_name: str, filter_query: dict):
         """Delete a single document from a collection.
 
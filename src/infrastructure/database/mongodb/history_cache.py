@@ -0,0 +1,127 @@
+import copy
+import logging
+import threading
+import uuid
+from typing import Dict, List, Optional
+
+from src.infrastructure.cache import LRUCache
+from src.infrastructure.config import settings
+from .connector import MongoDB
+
+
+logger = logging.getLogger(__name__)
+
+# Identifies the writes made by this process, so the change stream
+# watcher only evicts entries updated by other workers.
+WORKER_ID = uuid.uuid4().hex
+
+
+class HistoryCache:
+    """
+    Cache write-through das ultimas mensagens de cada usuario.
+
+    Cada entrada guarda as ultimas HISTORY_CACHE_MESSAGES mensagens
+    ("history"), o indice absoluto da primeira delas ("offset") e o
+    resumo da conversa, no mesmo formato retornado por get_conversation.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        max_messages: Optional[int] = None
+    ):
+        self.max_messages = max_messages or settings.HISTORY_CACHE_MESSAGES
+        self.entries = LRUCache(
+            max_size=max_size or settings.HISTORY_CACHE_SIZE,
+            ttl=ttl or settings.HISTORY_CACHE_TTL
+        )
+        self._stream = None
+        self._watcher: Optional[threading.Thread] = None
+        self._closing = False
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        conversation = self.entries.get(user_id)
+        return copy.deepcopy(conversation) if conversation else None
+
+    def set(self, user_id: str, conversation: Dict) -> None:
+        conversation = copy.deepcopy(conversation)
+        overflow = len(conversation["history"]) - self.max_messages
+        if overflow > 0:
+            conversation["history"] = conversation["history"][overflow:]
+            conversation["offset"] += overflow
+        self.entries.set(user_id, conversation)
+
+    def append(self, user_id: str, messages: List[Dict]) -> None:
+        conversation = self.entries.peek(user_id)
+        if conversation is None:
+            return
+        conversation = copy.deepcopy(conversation)
+        conversation["history"].extend(messages)
+        self.set(user_id, conversation)
+
+    def update_summary(
+        self,
+        user_id: str,
+        summary: str,
+        summarized_until: int
+    ) -> None:
+        conversation = self.entries.peek(user_id)
+        if conversation is None:
+            return
+        conversation = copy.deepcopy(conversation)
+        conversation["summary"] = summary
+        conversation["summarized_until"] = summarized_until
+        self.set(user_id, conversation)
+
+    def invalidate(self, user_id: str) -> None:
+        self.entries.delete(user_id)
+
+    def stats(self) -> Dict[str, float]:
+        return self.entries.stats()
+
+    def watch(
+        self,
+        database: MongoDB,
+        collection_name: str = "chat_history"
+    ) -> None:
+        """
+        Invalida as entradas alteradas por outros workers usando um
+        change stream do MongoDB (requer replica set).
+        """
+        if self._watcher:
+            return
+
+        pipeline = [
+            {"$match": {"fullDocument.writer_id": {"$ne": WORKER_ID}}},
+            {"$project": {"fullDocument.user_id": 1}}
+        ]
+
+        def run():
+            try:
+                collection = database.get_collection(collection_name)
+                with collection.watch(
+                    pipeline, full_document="updateLookup"
+                ) as stream:
+                    self._stream = stream
+                    for change in stream:
+                        document = change.get("fullDocument") or {}
+                        if user_id := document.get("user_id"):
+                            self.invalidate(user_id)
+            except Exception as e:
+                if not self._closing:
+                    logger.warning("History cache watcher stopped: %s", e)
+            finally:
+                self._stream = None
+
+        self._watcher = threading.Thread(
+            target=run, name="history-cache-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def close(self) -> None:
+        self._closing = True
+        if self._stream is not None:
+            stream, self._stream = self._stream, None
+            stream.close()
+        self._watcher = None
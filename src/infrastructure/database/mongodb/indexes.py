@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from src.infrastructure.config import settings
+from .connector import MongoDB
+
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TTL_INDEX = "history_ttl"
+
+# queries on the request path, checked with explain() at startup
+HOT_QUERIES = [
+    ("users", {"id": "user"}),
+    ("users", {"blocked": True}),
+    ("chat_history", {"user_id": "user"})
+]
+
+
+def indexes() -> Dict[str, List[IndexModel]]:
+    """
+    Indices das consultas da API: usuario por id (unico, o block_user
+    faz upsert nele), usuarios bloqueados (coberto, sem ler os
+    documentos) e historico por usuario (um documento por usuario). Com
+    HISTORY_TTL_DAYS, o historico sem mensagens novas ha mais dias que
+    isso e removido pelo MongoDB.
+    """
+    history = [IndexModel([("user_id", ASCENDING)], unique=True)]
+    if settings.HISTORY_TTL_DAYS > 0:
+        history.append(IndexModel(
+            [("updated_at", ASCENDING)],
+            name=HISTORY_TTL_INDEX,
+            expireAfterSeconds=int(settings.HISTORY_TTL_DAYS * 86400)
+        ))
+    return {
+        "users": [
+            IndexModel([("id", ASCENDING)], unique=True),
+            IndexModel([("blocked", ASCENDING), ("id", ASCENDING)])
+        ],
+        "chat_history": history
+    }
+
+
+def _update_ttl(database: MongoDB, error: OperationFailure) -> bool:
+    """
+    Indice TTL ja existente com outro prazo: altera com collMod.
+    """
+    if (
+        HISTORY_TTL_INDEX not in str(error)
+        or settings.HISTORY_TTL_DAYS <= 0
+    ):
+        return False
+    database.db.command(
+        "collMod",
+        "chat_history",
+        index={
+            "name": HISTORY_TTL_INDEX,
+            "expireAfterSeconds": int(settings.HISTORY_TTL_DAYS * 86400)
+        }
+    )
+    return True
+
+
+def _ensure_indexes(database: MongoDB) -> Dict[str, List[str]]:
+    created: Dict[str, List[str]] = {}
+    for collection_name, models in indexes().items():
+        collection = database.get_collection(collection_name)
+        names = []
+        for model in models:
+            # one at a time, so an index that fails (duplicated ids in
+            # old data) does not block the others
+            try:
+                names.extend(collection.create_indexes([model]))
+            except OperationFailure as error:
+                if _update_ttl(database, error):
+                    names.append(HISTORY_TTL_INDEX)
+                    continue
+                logger.error(
+                    "Could not create index %s on %s: %s",
+                    model.document["name"], collection_name, error
+                )
+        if (
+            collection_name == "chat_history"
+            and settings.HISTORY_TTL_DAYS <= 0
+            and HISTORY_TTL_INDEX in collection.index_information()
+        ):
+            collection.drop_index(HISTORY_TTL_INDEX)
+        created[collection_name] = names
+    return created
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    stages = [plan.get("stage", "")]
+    for child in plan.get("inputStages", []) + [plan.get("inputStage", {})]:
+        if child:
+            stages.extend(_plan_stages(child))
+    return stages
+
+
+def _check_indexes(database: MongoDB) -> Dict[str, List[str]]:
+    report = {"missing": [], "collection_scans": []}
+    for collection_name, models in indexes().items():
+        collection = database.get_collection(collection_name)
+        existing = collection.index_information()
+        report["missing"].extend(
+            f"{collection_name}.{model.document['name']}"
+            for model in models
+            if model.document["name"] not in existing
+        )
+    for collection_name, filter_query in HOT_QUERIES:
+        plan = database.explain(collection_name, filter_query)
+        winning = plan["queryPlanner"]["winningPlan"]
+        # slot based engine (MongoDB 5+) nests the plan in "queryPlan"
+        if "COLLSCAN" in _plan_stages(winning.get("queryPlan", winning)):
+            report["collection_scans"].append(
+                f"{collection_name} {sorted(filter_query)}"
+            )
+    return report
+
+
+async def ensure_indexes(database: MongoDB) -> Dict[str, List[str]]:
+    """
+    Cria os indices (idempotente: os que ja existem sao mantidos) e
+    verifica se as consultas da API usam algum deles. Indices
+    ausentes e consultas que varrem a colecao sao logados.
+    """
+    created = await asyncio.to_thread(_ensure_indexes, database)
+    report = await asyncio.to_thread(_check_indexes, database)
+    if report["missing"]:
+        logger.warning("Missing MongoDB indexes: %s", report["missing"])
+    if report["collection_scans"]:
+        logger.warning(
+            "MongoDB queries scanning whole collections: %s",
+            report["collection_scans"]
+        )
+    return {"created": created, **report}
@@ -1,6 +1,9 @@
+from src.infrastructure.config import settings
 from src.infrastructure.database import MongoDB
+from .history_cache import HistoryCache, WORKER_ID
+from .writer import HistoryWriter, history_update
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 
 def get_user_details(user_id: str, database: MongoDB) -> dict | None:
@@ -13,55 +16,157 @@ def get_user_details(user_id: str, database: MongoDB) -> dict | None:
 
 async def block_user(user_id: str, database: MongoDB) -> None:
     if user_id:
-        collection = database.get_collection("users")
-        collection.insert_one(
-            {
-                "id": user_id,
-                "blocked": True,
-                "user": user_id
-            }
+        # upsert: one document per user (unique index on "id")
+        await database.update_one(
+            collection_name="users",
+            filter_query={"id": user_id},
+            update={"$set": {"blocked": True, "user": user_id}},
+            upsert=True
+        )
+
+
+async def _read_conversation(user_id: str, database: MongoDB) -> Dict:
+    window = settings.HISTORY_CACHE_MESSAGES
+    response = await database.find(
+        filter_query={"user_id": user_id},
+        collection_name="chat_history",
+        projection={"history": {"$slice": -window}, "_id": 0}
+    )
+    document = response[0] if response else {}
+
+    history = document.get("history", [])
+    if "length" not in document and len(history) >= window:
+        # documents written before "length" was tracked
+        response = await database.find(
+            filter_query={"user_id": user_id},
+            collection_name="chat_history",
+            projection={"_id": 0}
         )
+        document = response[0]
+        history = document.get("history", [])
+
+    length = document.get("length", len(history))
+    return {
+        "history": history,
+        "offset": length - len(history),
+        "summary": document.get("summary", ""),
+        "summarized_until": document.get("summarized_until", 0)
+    }
+
+
+def _unwritten(
+    history: List[Dict],
+    before: List[Dict],
+    after: List[Dict]
+) -> List[Dict]:
+    """
+    Mensagens do writer (lidas antes e depois da consulta ao banco) que
+    nao estao no historico lido. O writer grava um prefixo das pendentes
+    por vez, entao as ja gravadas sao as ultimas posicoes do historico.
+    """
+    known = {id(message) for message in before}
+    pending = before + [m for m in after if id(m) not in known]
+    for size in range(min(len(history), len(pending)), 0, -1):
+        if history[-size:] == pending[:size]:
+            return pending[size:]
+    return pending
+
+
+async def get_conversation(
+    user_id: str,
+    database: MongoDB,
+    writer: Optional[HistoryWriter] = None,
+    cache: Optional[HistoryCache] = None
+) -> Dict:
+    """
+    Retorna as ultimas mensagens do usuario ("history") junto com o
+    resumo das mensagens antigas. "offset" e o indice absoluto de
+    history[0] e "summarized_until" o indice absoluto da primeira
+    mensagem que ainda nao esta no resumo. O MongoDB so e consultado
+    quando o usuario nao esta no cache; escritas ainda pendentes no
+    writer sao incluidas no resultado.
+    """
+    try:
+        if cache and (conversation := cache.get(user_id)):
+            return conversation
+
+        # a flush may land before, during or after the read
+        before = writer.get(user_id) if writer else []
+        conversation = await _read_conversation(user_id, database)
+        if writer:
+            conversation["history"].extend(_unwritten(
+                conversation["history"], before, writer.get(user_id)
+            ))
+
+        if cache:
+            cache.set(user_id, conversation)
+        return conversation
+    except Exception as e:
+        raise ValueError(f"Error getting history: {e}")
 
 
 async def get_messages_history(
     user_id: str,
     database: MongoDB
 ) -> List[Dict[str, str]]:
+    conversation = await get_conversation(user_id, database)
+    return conversation["history"]
+
+
+async def save_history_summary(
+    user_id: str,
+    summary: str,
+    summarized_until: int,
+    database: MongoDB,
+    cache: Optional[HistoryCache] = None
+) -> None:
     try:
-        response = await database.find(
+        _ = await database.update_one(
+            collection_name="chat_history",
             filter_query={"user_id": user_id},
-            collection_name="chat_history"
+            update={
+                "$set": {
+                    "summary": summary,
+                    "summarized_until": summarized_until,
+                    "writer_id": WORKER_ID
+                }
+            },
+            # the writer may not have flushed the first messages yet
+            upsert=True
         )
-        return response[0]["history"] if response else []
+        if cache:
+            cache.update_summary(user_id, summary, summarized_until)
     except Exception as e:
-        raise ValueError(f"Error getting history: {e}")
+        raise ValueError(f"Error saving history summary: {e}")
 
 
 async def add_message_to_history(
-    messages: List[Dict[str, str]], user_id: str, database: MongoDB
+    messages: List[Dict[str, str]],
+    user_id: str,
+    database: MongoDB,
+    writer: Optional[HistoryWriter] = None,
+    cache: Optional[HistoryCache] = None
 ) -> None:
+    """
+    Adiciona as novas mensagens ao fim do historico do usuario e ao
+    cache. Com um writer, a escrita e enfileirada e enviada ao banco em
+    background.
+    """
     try:
         if messages and user_id:
-            history = await database.find(
+            if cache:
+                cache.append(user_id, messages)
+
+            if writer:
+                writer.put(user_id, messages)
+                return
+
+            _ = await database.update_one(
+                collection_name="chat_history",
                 filter_query={"user_id": user_id},
-                collection_name="chat_history"
+                update=history_update(messages),
+                upsert=True
             )
 
-            if history:
-                _ = await database.update_one(
-                    collection_name="chat_history",
-                    filter_query={"user_id": user_id},
-                    update={"$set": {"history": messages}}
-                )
-
-            else:
-                _ = await database.insert_one(
-                    collection_name="chat_history",
-                    document={
-                        "user_id": user_id,
-                        "history": messages
-                    }
-                )
-
     except Exception as e:
         raise ValueError(f"Error adding message to history: {e}")
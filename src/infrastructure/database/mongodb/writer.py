@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+
+from src.infrastructure.config import settings
+from .connector import MongoDB
+from .history_cache import WORKER_ID
+
+
+logger = logging.getLogger(__name__)
+
+
+def history_update(messages: List[Dict[str, str]]) -> List[Dict]:
+    """
+    Update (pipeline) que adiciona as mensagens ao fim do historico.
+    Em documentos gravados antes de "length" existir, a contagem comeca
+    do tamanho do historico. updated_at e o campo do indice TTL
+    (HISTORY_TTL_DAYS).
+    """
+    history = {"$ifNull": ["$history", []]}
+    return [{
+        "$set": {
+            # $literal: message contents starting with "$" are not paths
+            "history": {
+                "$concatArrays": [history, {"$literal": messages}]
+            },
+            "length": {
+                "$add": [
+                    {"$ifNull": ["$length", {"$size": history}]},
+                    len(messages)
+                ]
+            },
+            "writer_id": WORKER_ID,
+            "updated_at": datetime.now(timezone.utc)
+        }
+    }]
+
+
+class HistoryWriter:
+    """
+    Fila write-behind para o historico de conversas.
+
+    As mensagens ficam em memoria e sao enviadas ao MongoDB em lotes
+    (bulk_write) por uma unica task, fora do caminho da requisicao.
+    Mensagens pendentes do mesmo usuario sao agrupadas, na ordem de
+    chegada, em uma unica operacao, o que garante a ordem por usuario.
+    """
+
+    def __init__(
+        self,
+        database: MongoDB,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        collection_name: str = "chat_history"
+    ):
+        self.database = database
+        self.flush_interval = flush_interval or settings.HISTORY_FLUSH_INTERVAL
+        self.batch_size = batch_size or settings.HISTORY_BATCH_SIZE
+        self.collection_name = collection_name
+
+        self._pending: Dict[str, List[Dict]] = {}
+        self._inflight: Dict[str, List[Dict]] = {}
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.flushes = 0
+        self.written = 0
+        self.errors = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def put(self, user_id: str, messages: List[Dict]) -> None:
+        self._pending.setdefault(user_id, []).extend(messages)
+        self._wakeup.set()
+
+    def get(self, user_id: str) -> List[Dict]:
+        """
+        Mensagens do usuario ainda nao persistidas, em ordem.
+        """
+        return (
+            self._inflight.get(user_id, []) + self._pending.get(user_id, [])
+        )
+
+    @property
+    def depth(self) -> int:
+        return sum(map(len, self._pending.values())) + sum(
+            map(len, self._inflight.values())
+        )
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queue_depth": self.depth,
+            "flushes": self.flushes,
+            "written": self.written,
+            "errors": self.errors,
+            "last_flush_seconds": self.last_flush_seconds,
+            "max_flush_seconds": self.max_flush_seconds
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            # small window so writes from several users share a batch
+            await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("History flush failed, retrying: %s", e)
+                await asyncio.sleep(self.flush_interval)
+                self._wakeup.set()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            while self._pending:
+                users = list(self._pending)[:self.batch_size]
+                self._inflight = {
+                    user_id: self._pending.pop(user_id) for user_id in users
+                }
+                start = time.perf_counter()
+                try:
+                    await self.database.bulk_write(
+                        self.collection_name,
+                        [
+                            UpdateOne(
+                                {"user_id": user_id},
+                                history_update(messages),
+                                upsert=True
+                            )
+                            for user_id, messages in self._inflight.items()
+                        ]
+                    )
+                except BaseException:
+                    self.errors += 1
+                    for user_id, messages in self._inflight.items():
+                        self._pending[user_id] = messages + self._pending.get(
+                            user_id, []
+                        )
+                    raise
+                finally:
+                    self._inflight = {}
+
+                elapsed = time.perf_counter() - start
+                self.flushes += 1
+                self.written += len(users)
+                self.last_flush_seconds = elapsed
+                self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Para a task de escrita e envia o que estiver pendente.
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        try:
+            await asyncio.wait_for(
+                self.flush(),
+                timeout or settings.HISTORY_SHUTDOWN_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(
+                "History writer stopped with %s pending writes: %s",
+                self.depth, e
+            )
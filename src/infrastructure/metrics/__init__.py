@@ -0,0 +1,28 @@
+from .loop_monitor import LoopMonitor
+from .registry import Counter, Histogram, Registry, registry
+from .tracing import (
+    LLMMetrics,
+    Trace,
+    current_trace,
+    record,
+    request_id,
+    span,
+    start_trace,
+    traced
+)
+
+__all__ = [
+    "LoopMonitor",
+    "Counter",
+    "Histogram",
+    "Registry",
+    "registry",
+    "LLMMetrics",
+    "Trace",
+    "current_trace",
+    "record",
+    "request_id",
+    "span",
+    "start_trace",
+    "traced"
+]
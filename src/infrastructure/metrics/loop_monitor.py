@@ -0,0 +1,174 @@
+import asyncio
+import os
+import selectors
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+from .registry import registry
+
+
+LOOP_LAG = registry.histogram(
+    "event_loop_lag_seconds",
+    "Delay of the event loop heartbeat beyond its interval",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+LOOP_BLOCKED = registry.counter(
+    "event_loop_blocked_total",
+    "Times the event loop was blocked longer than the threshold",
+    ("site",)
+)
+
+PACKAGE_ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_ROOT = os.path.dirname(os.path.dirname(PACKAGE_ROOT))
+# the loop's own code: waiting in select or draining its wakeup pipe
+LOOP_INTERNALS = (
+    os.path.dirname(os.path.abspath(asyncio.__file__)) + os.sep,
+    os.path.abspath(selectors.__file__)
+)
+IDLE_SITE = "<idle/gil>"
+
+
+class LoopMonitor:
+    """
+    Mede o atraso do event loop e detecta chamadas bloqueantes.
+
+    Uma task no loop marca um heartbeat a cada `interval`; o atraso de
+    cada heartbeat vai para o histograma. Uma thread watchdog verifica o
+    heartbeat e, se ele ficar parado mais que `threshold`, captura a
+    stack da thread do loop, mostrando qual codigo esta bloqueando.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.05,
+        threshold: float = 0.1,
+        max_events: int = 50
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.events: deque = deque(maxlen=max_events)
+        self.sites: Counter = Counter()
+
+        self.samples = 0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+
+        self._beat = time.monotonic()
+        self._blocking: Optional[Dict[str, Any]] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def site(stack: List[traceback.FrameSummary]) -> str:
+        """
+        Frame mais interno do codigo da aplicacao, fora da propria
+        instrumentacao (ou o mais interno de todos), usado para agrupar
+        os bloqueios. Sem codigo da aplicacao e parado no proprio loop
+        (select, _read_from_self), o loop nao esta bloqueado por uma
+        chamada e sim esperando o GIL, ocupado por outras threads:
+        IDLE_SITE.
+        """
+        for frame in reversed(stack):
+            if (
+                frame.filename.startswith(SOURCE_ROOT)
+                and not frame.filename.startswith(PACKAGE_ROOT)
+            ):
+                path = os.path.relpath(
+                    frame.filename, os.path.dirname(SOURCE_ROOT)
+                )
+                return f"{path}:{frame.lineno} {frame.name}"
+        frame = stack[-1]
+        if os.path.abspath(frame.filename).startswith(LOOP_INTERNALS):
+            return IDLE_SITE
+        return f"{frame.filename}:{frame.lineno} {frame.name}"
+
+    async def _heartbeat(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - start - self.interval, 0.0)
+            LOOP_LAG.observe(lag)
+            with self._lock:
+                self._beat = now
+                self.samples += 1
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+                if self._blocking is not None:
+                    self._blocking["seconds"] = round(lag, 6)
+                    self._blocking = None
+
+    def _capture(self, blocked_for: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        site = self.site(stack)
+        self.sites[site] += 1
+        LOOP_BLOCKED.inc(site=site)
+        if site == IDLE_SITE:
+            # counted once per stall, but not kept with the stalls of
+            # real blocking code
+            self._blocking = {"site": site}
+            return
+        event = {
+            "site": site,
+            "detected_at": time.time(),
+            # updated with the full stall when the loop comes back
+            "seconds": round(blocked_for, 6),
+            "stack": traceback.format_list(stack[-20:])
+        }
+        self._blocking = event
+        self.events.append(event)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.threshold / 2):
+            with self._lock:
+                blocked_for = time.monotonic() - self._beat - self.interval
+                if blocked_for > self.threshold and self._blocking is None:
+                    self._capture(blocked_for)
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-monitor", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "threshold": self.threshold,
+                "samples": self.samples,
+                "last_lag_seconds": self.last_lag,
+                "max_lag_seconds": self.max_lag,
+                "blocked": sum(self.sites.values()),
+                "sites": dict(self.sites.most_common()),
+                "events": list(self.events)
+            }
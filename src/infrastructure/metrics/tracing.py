@@ -0,0 +1,175 @@
+import asyncio
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from .registry import registry
+
+
+SPAN_SECONDS = registry.histogram(
+    "crag_span_seconds",
+    "Duration of each instrumented step (graph node, database, llm)",
+    ("kind", "name")
+)
+LLM_TOKENS = registry.counter(
+    "crag_llm_tokens_total",
+    "Tokens sent to and generated by the LLMs",
+    ("model", "type")
+)
+LLM_ERRORS = registry.counter(
+    "crag_llm_errors_total",
+    "Failed LLM calls",
+    ("model",)
+)
+
+
+class Trace:
+    """
+    Spans de uma requisicao. Os nos do grafo e as chamadas ao banco
+    rodam em threads com uma copia do contexto, mas todas compartilham
+    este mesmo objeto.
+    """
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.spans: List[Tuple[str, str, float]] = []
+        self.tokens: Dict[str, int] = {"input": 0, "output": 0}
+
+    def add(self, kind: str, name: str, seconds: float) -> None:
+        self.spans.append((kind, name, seconds))
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Tempo total e quantidade de chamadas por span.
+        """
+        spans: Dict[str, Dict[str, float]] = {}
+        for kind, name, seconds in list(self.spans):
+            item = spans.setdefault(
+                f"{kind}.{name}", {"count": 0, "seconds": 0.0}
+            )
+            item["count"] += 1
+            item["seconds"] += seconds
+        return {"spans": spans, "tokens": dict(self.tokens)}
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+def request_id() -> Optional[str]:
+    trace = _trace.get()
+    return trace.request_id if trace else None
+
+
+@contextmanager
+def start_trace(request_id: Optional[str] = None):
+    trace = Trace(request_id or uuid.uuid4().hex)
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+def record(kind: str, name: str, seconds: float) -> None:
+    SPAN_SECONDS.observe(seconds, kind=kind, name=name)
+    if trace := _trace.get():
+        trace.add(kind, name, seconds)
+
+
+@contextmanager
+def span(kind: str, name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, name, time.perf_counter() - start)
+
+
+def traced(kind: str, name: Optional[str] = None) -> Callable:
+    """
+    Decorator que mede cada chamada da funcao (sync ou async) como um
+    span. Sem nome, usa o nome da funcao.
+    """
+    def decorator(function: Callable) -> Callable:
+        label = name or function.__name__
+
+        if asyncio.iscoroutinefunction(function):
+            @wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(kind, label):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(kind, label):
+                return function(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+class LLMMetrics(BaseCallbackHandler):
+    """
+    Callback do LangChain que mede a latencia e os tokens de cada
+    chamada ao modelo.
+    """
+
+    # the handler only does arithmetic, no need to run it in an executor
+    run_inline = True
+
+    def __init__(self, model: str):
+        self.model = model
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def _finish(self, run_id: UUID) -> None:
+        start = self._started.pop(run_id, None)
+        if start is not None:
+            record("llm", self.model, time.perf_counter() - start)
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        self._finish(run_id)
+
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+                else:
+                    # completion models (OllamaLLM) only report the counts
+                    # returned by the server
+                    info = generation.generation_info or {}
+                    input_tokens += info.get("prompt_eval_count") or 0
+                    output_tokens += info.get("eval_count") or 0
+
+        if input_tokens:
+            LLM_TOKENS.inc(input_tokens, model=self.model, type="input")
+        if output_tokens:
+            LLM_TOKENS.inc(output_tokens, model=self.model, type="output")
+        if trace := _trace.get():
+            trace.tokens["input"] += input_tokens
+            trace.tokens["output"] += output_tokens
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+        LLM_ERRORS.inc(model=self.model)
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from src.infrastructure.config import settings, LLM, LLMPool, LLMScheduler
+from src.infrastructure.metrics import LoopMonitor
+from src.infrastructure.database import (
+    MongoDB,
+    ChromaDB,
+    HistoryWriter,
+    HistoryCache,
+    BlockedUsers,
+    ensure_indexes
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class Resources:
+    """
+    Conexoes e workers em background de uma instancia da API.
+
+    E iniciado e finalizado pelo lifespan do FastAPI. No shutdown espera
+    as requisicoes em andamento e as filas write-behind terminarem (com
+    timeout) e so entao fecha os clientes.
+    """
+
+    def __init__(
+        self,
+        database: Optional[MongoDB] = None,
+        vector_store: Optional[ChromaDB] = None,
+        llm=None,
+        models: Optional[dict] = None
+    ):
+        self.database = database or MongoDB(lazy=True)
+        self.vector_store = vector_store or ChromaDB.shared()
+        self.llm = llm or LLM()
+        self._models = models or LLM.for_nodes()
+        self.llm_scheduler = (
+            LLMScheduler() if settings.LLM_SCHEDULER_ENABLED else None
+        )
+        # models used by the graph nodes and by the summarizer, behind
+        # the scheduler when it is enabled
+        self.models = self._scheduled(self._models)
+        self.background_llm = (
+            self.llm_scheduler.wrap(self.llm, LLMScheduler.BACKGROUND)
+            if self.llm_scheduler else self.llm
+        )
+        self.blocked_users = BlockedUsers(self.database)
+        self.history_writer = (
+            HistoryWriter(self.database)
+            if settings.HISTORY_WRITE_BEHIND else None
+        )
+        self.history_cache = (
+            HistoryCache() if settings.HISTORY_CACHE_ENABLED else None
+        )
+        # re-index jobs started by this worker, by alias
+        self.reindex_jobs: dict = {}
+        self.mongo_indexes: Optional[dict] = None
+        self._indexes_task: Optional[asyncio.Task] = None
+        self.loop_monitor = (
+            LoopMonitor(
+                settings.LOOP_MONITOR_INTERVAL,
+                settings.LOOP_MONITOR_THRESHOLD,
+                settings.LOOP_MONITOR_MAX_EVENTS
+            )
+            if settings.LOOP_MONITOR_ENABLED else None
+        )
+
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closers: List[Callable[[], Awaitable]] = []
+
+    def _scheduled(self, models: dict) -> dict:
+        if not self.llm_scheduler:
+            return dict(models)
+        priorities = {
+            "agent": LLMScheduler.CHAT,
+            "grader": LLMScheduler.GRADING,
+            "generator": LLMScheduler.CHAT
+        }
+        return {
+            node: self.llm_scheduler.wrap(
+                model, priorities.get(node, LLMScheduler.CHAT)
+            )
+            for node, model in models.items()
+        }
+
+    def all_models(self) -> list:
+        return [self.llm, *self._models.values()]
+
+    def add_closer(self, closer: Callable[[], Awaitable]) -> None:
+        """
+        Registra uma funcao async chamada no shutdown, antes de fechar
+        as conexoes com os bancos.
+        """
+        self._closers.append(closer)
+
+    def request_started(self) -> None:
+        self.in_flight += 1
+        self._idle.clear()
+
+    def request_finished(self) -> None:
+        self.in_flight -= 1
+        if self.in_flight <= 0:
+            self._idle.set()
+
+    async def start(self) -> None:
+        if self.loop_monitor:
+            self.loop_monitor.start()
+        for model in {id(m): m for m in self.all_models()}.values():
+            if isinstance(model, LLMPool):
+                model.start()
+        if self.history_writer:
+            self.history_writer.start()
+        if self.history_cache and settings.HISTORY_CACHE_INVALIDATION:
+            self.history_cache.watch(self.database)
+        self.blocked_users.start()
+        if settings.MONGO_CREATE_INDEXES:
+            self._indexes_task = asyncio.create_task(self._ensure_indexes())
+
+    async def _ensure_indexes(self) -> None:
+        # in background: building an index on a big collection takes a
+        # while and MongoDB may still be starting
+        try:
+            self.mongo_indexes = await ensure_indexes(self.database)
+        except Exception as e:
+            logger.warning("Could not bootstrap MongoDB indexes: %s", e)
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Espera as requisicoes em andamento terminarem.
+        """
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Shutdown with %s requests still in flight", self.in_flight
+            )
+            return False
+
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        deadline = time.monotonic() + (timeout or settings.SHUTDOWN_TIMEOUT)
+
+        def remaining() -> float:
+            return max(deadline - time.monotonic(), 0.1)
+
+        _ = await self.drain(remaining())
+        if self._indexes_task:
+            self._indexes_task.cancel()
+        for job in self.reindex_jobs.values():
+            await job.stop()
+        await self.blocked_users.stop()
+        if self.history_writer:
+            await self.history_writer.stop(remaining())
+        if self.history_cache:
+            self.history_cache.close()
+
+        closers = [
+            *self._closers,
+            *[
+                lambda model=model: LLM.close(model)
+                for model in {id(m): m for m in self.all_models()}.values()
+            ]
+        ]
+        for close in closers:
+            try:
+                await asyncio.wait_for(close(), remaining())
+            except Exception as e:
+                logger.warning("Error closing resource: %s", e)
+
+        if self.loop_monitor:
+            await self.loop_monitor.stop()
+        await self.vector_store.close()
+        await self.database.close()
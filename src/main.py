@@ -1,25 +1,80 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 
-from src.infrastructure.database import MongoDB, ChromaDB
-from src.infrastructure.config.llm import LLM
+from src.infrastructure.config import settings, LLM
+from src.infrastructure.resources import Resources
 from src.services.llama_guard import LlamaGuard
-from src.services.crag import CRAG
+from src.services.document_reader import Chunker
+from src.services.crag import CRAG, HistorySummarizer
 
-from src.api.routes import files_router, crag_router
+from src.api.controllers import controller_startup
+from src.api.middleware import InFlightMiddleware, RequestContextMiddleware
+from src.api.responses import FastJSONResponse
+from src.api.routes import (
+    files_router,
+    crag_router,
+    health_router,
+    metrics_router,
+    debug_router
+)
 
 
-def create_app():
-    app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # dependencies are probed concurrently and failures don't stop the
+    # app, they are reported by /health/ready instead
+    _ = await controller_startup(app)
+    await app.resources.start()
+    yield
+    await app.resources.shutdown()
+
+
+def create_app(resources: Resources = None):
+    app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
     # defining API variables
-    app.database = MongoDB()
-    app.llm = LLM()
-    # app.llama_guard = LlamaGuard()
-    app.vector_store = ChromaDB()
+    app.resources = resources or Resources()
+    app.database = app.resources.database
+    app.llm = app.resources.llm
+    app.models = app.resources.models
+    app.background_llm = app.resources.background_llm
+    app.llm_scheduler = app.resources.llm_scheduler
+    app.vector_store = app.resources.vector_store
+    app.blocked_users = app.resources.blocked_users
+    app.history_writer = app.resources.history_writer
+    app.history_cache = app.resources.history_cache
+    app.llama_guard = (
+        LlamaGuard() if settings.LLAMA_GUARD_ENABLED else None
+    )
+    if app.llama_guard:
+        app.resources.add_closer(lambda: LLM.close(app.llama_guard.llm))
+    app.resources.add_closer(Chunker.close)
     app.crag = CRAG()  # Corrective RAG
+    app.resources.add_closer(app.crag.close)
+    if app.crag.speculative:
+        app.resources.add_closer(app.crag.speculative.close)
+    app.summarizer = HistorySummarizer()
+
+    if settings.RESPONSE_GZIP_MIN_BYTES:
+        app.add_middleware(
+            GZipMiddleware,
+            minimum_size=settings.RESPONSE_GZIP_MIN_BYTES,
+            compresslevel=settings.RESPONSE_GZIP_LEVEL
+        )
+    app.add_middleware(InFlightMiddleware, resources=app.resources)
+    if settings.METRICS_ENABLED:
+        app.add_middleware(
+            RequestContextMiddleware, log_json=settings.REQUEST_LOG_JSON
+        )
 
     # including routes
     app.include_router(files_router)
     app.include_router(crag_router)
+    app.include_router(health_router)
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics_router)
+    if settings.LOOP_MONITOR_ENABLED:
+        app.include_router(debug_router)
 
     return app
@@ -1,4 +1,5 @@
 from .graph import CRAG
+from .summarizer import HistorySummarizer
 
 
-__all__ = ["CRAG"]
+__all__ = ["CRAG", "HistorySummarizer"]
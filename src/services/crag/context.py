@@ -0,0 +1,160 @@
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.messages import (
+    BaseMessage, HumanMessage, SystemMessage, ToolMessage
+)
+
+from src.infrastructure.config import settings
+from src.services.tokenizer import Tokenizer
+
+
+# Below this many tokens a truncated document is not worth including.
+MIN_DOCUMENT_TOKENS = 64
+
+
+class ContextBuilder:
+    """
+    Monta o contexto enviado ao LLM dentro de um orcamento de tokens:
+    apenas o conteudo e alguns metadados dos documentos, sem chunks
+    duplicados, e o historico mais recente que couber.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        history_tokens: Optional[int] = None,
+        metadata_keys: Optional[List[str]] = None
+    ):
+        self.max_tokens = max_tokens or settings.CONTEXT_MAX_TOKENS
+        self.history_tokens = history_tokens or settings.HISTORY_MAX_TOKENS
+        self.metadata_keys = metadata_keys or [
+            key.strip()
+            for key in settings.CONTEXT_METADATA_KEYS.split(",")
+            if key.strip()
+        ]
+
+    @staticmethod
+    def _content(doc: Any) -> Tuple[str, Dict]:
+        if isinstance(doc, dict):
+            return doc.get("page_content", ""), doc.get("metadata") or {}
+        return doc.page_content, doc.metadata or {}
+
+    @staticmethod
+    def _overlap(previous: str, current: str) -> int:
+        """
+        Tamanho do maior sufixo de previous que tambem e prefixo de
+        current, limitado ao overlap usado no split dos documentos.
+        """
+        window = min(len(previous), len(current), settings.CHUNK_OVERLAP * 2)
+        for size in range(window, 0, -1):
+            if previous.endswith(current[:size]):
+                return size
+        return 0
+
+    def deduplicate(self, docs: List[Any]) -> List[Tuple[str, Dict]]:
+        """
+        Remove chunks repetidos ou contidos em outros e corta o trecho
+        sobreposto entre chunks vizinhos do mesmo arquivo.
+        """
+        kept: List[Tuple[str, Dict]] = []
+        for doc in docs:
+            text, metadata = self._content(doc)
+            text = " ".join(text.split())
+            if not text or any(text in other for other, _ in kept):
+                continue
+
+            source = metadata.get("file_name")
+            for other, other_metadata in kept:
+                if other_metadata.get("file_name") != source:
+                    continue
+                text = text[self._overlap(other, text):].lstrip()
+            if text:
+                kept.append((text, metadata))
+        return kept
+
+    def _format_document(self, text: str, metadata: Dict) -> str:
+        header = ", ".join(
+            f"{key}: {metadata[key]}"
+            for key in self.metadata_keys
+            if metadata.get(key) is not None
+        )
+        return f"[{header}]\n{text}" if header else text
+
+    def format_documents(self, docs: List[Any]) -> Tuple[str, int]:
+        """
+        Empacota os documentos, em ordem de relevancia, ate o limite de
+        max_tokens. Retorna o contexto formatado e quantos tokens usou.
+        """
+        parts, used = [], 0
+        for text, metadata in self.deduplicate(docs or []):
+            part = self._format_document(text, metadata)
+            tokens = Tokenizer.count(part)
+            remaining = self.max_tokens - used
+
+            if tokens > remaining:
+                if remaining < MIN_DOCUMENT_TOKENS:
+                    break
+                part = Tokenizer.truncate(part, remaining)
+                tokens = Tokenizer.count(part)
+
+            parts.append(part)
+            used += tokens
+        return "\n\n".join(parts), used
+
+    @staticmethod
+    def _conversation(messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Mensagens com conteudo, sem as chamadas de ferramenta, sem o
+        resumo e sem a pergunta atual, que ja vai separada no prompt.
+        """
+        conversation = [
+            message for message in messages
+            if message.content
+            and not isinstance(message, (ToolMessage, SystemMessage))
+            and not getattr(message, "tool_calls", None)
+        ]
+        if conversation and isinstance(conversation[-1], HumanMessage):
+            conversation = conversation[:-1]
+        return conversation
+
+    @staticmethod
+    def question(messages: List[BaseMessage]) -> Optional[HumanMessage]:
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                return message
+        return None
+
+    def select_history(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Seleciona as mensagens mais recentes que cabem em history_tokens.
+        """
+        selected, used = [], 0
+        for message in reversed(self._conversation(messages)):
+            used += Tokenizer.count(message.content)
+            if used > self.history_tokens:
+                break
+            selected.append(message)
+        return selected[::-1]
+
+    @staticmethod
+    def summary(messages: List[BaseMessage]) -> Optional[SystemMessage]:
+        """
+        Resumo da conversa anterior, enviado pelo CRAG como mensagem de
+        sistema.
+        """
+        for message in messages:
+            if isinstance(message, SystemMessage) and message.content:
+                return message
+        return None
+
+    def format_history(self, messages: List[BaseMessage]) -> Tuple[str, int]:
+        """
+        Resumo (sempre incluido) seguido das mensagens mais recentes.
+        """
+        summary = self.summary(messages)
+        history = "\n".join(
+            f"{message.type}: {message.content}"
+            for message in (
+                ([summary] if summary else []) + self.select_history(messages)
+            )
+        )
+        return history, Tokenizer.count(history)
@@ -0,0 +1,146 @@
+import time
+import threading
+from typing import Any, Dict, Optional
+
+from langchain_core.prompts import PromptTemplate
+
+from src.infrastructure.config import settings
+from src.infrastructure.database import ChromaDB
+from src.infrastructure.metrics import registry
+from .context import ContextBuilder
+from .nodes import grade_documents, node_model
+from .prompts import rewrite_prompt
+from .templates import AgentState
+
+
+CORRECTIVE = registry.counter(
+    "crag_corrective_iterations_total",
+    "Corrective loop iterations by outcome (enough, rewrite, "
+    "max_iterations, budget, skipped)",
+    ("outcome",)
+)
+
+
+class CorrectiveLoop:
+    """
+    Loop corretivo do grafo: quando menos de min_relevant documentos
+    passam na avaliacao, a query e reescrita e a busca refeita, no
+    maximo max_iterations vezes. Uma nova iteracao so comeca se,
+    estimada pela duracao da anterior, terminar dentro de budget
+    segundos desde o inicio da requisicao.
+    """
+
+    OUTCOMES = ("enough", "rewrite", "max_iterations", "budget", "skipped")
+
+    def __init__(
+        self,
+        min_relevant: Optional[int] = None,
+        max_iterations: Optional[int] = None,
+        budget: Optional[float] = None
+    ):
+        self.min_relevant = (
+            min_relevant if min_relevant is not None
+            else settings.CRAG_MIN_RELEVANT
+        )
+        self.max_iterations = (
+            max_iterations if max_iterations is not None
+            else settings.CRAG_MAX_ITERATIONS
+        )
+        self.budget = (
+            budget if budget is not None else settings.CRAG_LATENCY_BUDGET
+        )
+        self._lock = threading.Lock()
+        self.outcomes = dict.fromkeys(self.OUTCOMES, 0)
+        self.rewritten_answers = 0
+
+    def _outcome(self, state: AgentState, iteration: Dict) -> str:
+        # grading stops at CRAG_RELEVANT_K, so more is never reached
+        needed = min(
+            self.min_relevant, settings.CRAG_RELEVANT_K or self.min_relevant
+        )
+        if iteration["relevant"] >= needed:
+            return "enough"
+        if state.get("tool") != "retriever":
+            # most_recent_files does not depend on the query
+            return "skipped"
+        if iteration["iteration"] >= self.max_iterations:
+            return "max_iterations"
+        seconds = sum(
+            value for key, value in iteration.items()
+            if key.endswith("_seconds")
+        )
+        elapsed = time.perf_counter() - state.get(
+            "started", time.perf_counter()
+        )
+        if elapsed + seconds > self.budget:
+            return "budget"
+        return "rewrite"
+
+    def grade(self, state: AgentState) -> Dict[str, Any]:
+        """
+        No de avaliacao: grade_documents e a decisao da iteracao,
+        registrada nela.
+        """
+        result = grade_documents(state)
+        corrections = result["corrections"]
+        outcome = self._outcome(state, corrections[-1])
+        corrections[-1]["outcome"] = outcome
+
+        CORRECTIVE.inc(outcome=outcome)
+        with self._lock:
+            self.outcomes[outcome] += 1
+            if outcome == "enough" and corrections[-1]["iteration"] > 0:
+                self.rewritten_answers += 1
+        return result
+
+    @staticmethod
+    def route(state: AgentState) -> str:
+        corrections = state.get("corrections") or [{}]
+        if corrections[-1].get("outcome") == "rewrite":
+            return "rewrite"
+        return "generate"
+
+    @staticmethod
+    def rewrite(state: AgentState) -> Dict[str, Any]:
+        """
+        Reescreve a query com o modelo do agente e refaz a busca.
+        """
+        corrections = list(state.get("corrections") or [])
+        question = ContextBuilder.question(state.get("messages", []))
+        chain = (
+            PromptTemplate.from_template(rewrite_prompt)
+            | node_model(state, "agent")
+        )
+
+        start = time.perf_counter()
+        result = chain.invoke({
+            "question": (
+                question.content if question else state["query"]
+            ),
+            "queries": "\n".join(
+                f"- {item['query']}" for item in corrections
+            )
+        })
+        query = str(getattr(result, "content", result)).strip()
+        rewrite_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        docs = ChromaDB.retrieve.invoke({"query": query})
+        corrections.append({
+            "iteration": len(corrections),
+            "query": query,
+            "retrieved": len(docs),
+            "rewrite_seconds": rewrite_seconds,
+            "retrieve_seconds": time.perf_counter() - start
+        })
+        return {"docs": docs, "corrections": corrections}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "min_relevant": self.min_relevant,
+                "max_iterations": self.max_iterations,
+                "budget_seconds": self.budget,
+                "outcomes": dict(self.outcomes),
+                "answered_after_rewrite": self.rewritten_answers
+            }
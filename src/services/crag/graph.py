@@ -1,48 +1,138 @@
-from typing import List, Dict
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Callable, List, Dict
 from langchain_ollama import OllamaLLM
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, START, END
 
-from src.infrastructure.config import settings
+from src.infrastructure.config import settings, AdmissionRejected
 from .templates import AgentState
+from .timing import NodeLatency
+from .speculative import SpeculativeRetriever
+from .corrective import CorrectiveLoop
 from .nodes import (
     agent,
     should_continue,
     generate,
-    grade_documents,
     CustomToolNode
 )
 
 
+logger = logging.getLogger(__name__)
+
+
 class CRAG:
     def __init__(self):
         self.index_name = settings.INDEX_NAME
+        self.latency = NodeLatency()
+        self.speculative = (
+            SpeculativeRetriever() if settings.SPECULATIVE_RETRIEVAL
+            else None
+        )
+        self.corrective = CorrectiveLoop()
+        # the nodes are sync and block on the LLM scheduler; on the
+        # loop's default executor (min(32, cpus + 4) threads) they would
+        # queue before reaching it and starve asyncio.to_thread calls
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.CRAG_NODE_WORKERS or (
+                settings.LLM_MAX_CONCURRENCY * 2 + settings.LLM_MAX_QUEUE
+            ),
+            thread_name_prefix="crag-node"
+        )
         self.build()
 
+    def threaded(self, function: Callable) -> Callable:
+        """
+        No async que roda function no executor do grafo, com o contexto
+        da requisicao (usuario do scheduler).
+        """
+        @wraps(function)
+        async def node(state):
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, context.run, function, state
+            )
+        return node
+
+    async def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
     async def invoke(
         self,
         messages: List[Dict[str, str]],
-        model: ChatOpenAI | OllamaLLM
+        model: ChatOpenAI | OllamaLLM,
+        summary: str = "",
+        models: Dict[str, ChatOpenAI | OllamaLLM] = None
     ):
+        prefetch = None
         try:
-            response = self.graph.invoke(
+            if self.speculative and messages:
+                prefetch = self.speculative.start(messages[-1]["content"])
+
+            messages = messages[-10:]
+            if summary:
+                messages = [{
+                    "role": "system",
+                    "content": f"Resumo da conversa anterior: {summary}"
+                }] + messages
+
+            response = await self.graph.ainvoke(
                 {
-                    "messages": messages[-10:],
+                    "messages": messages,
                     "model": model,
+                    "models": models or {},
+                    "prefetch": prefetch,
+                    "started": time.perf_counter()
                 }
             )
-            return {"messages": response["messages"][-1].content}
+            prompt_tokens = response.get("prompt_tokens", 0)
+            logger.info("CRAG generation prompt tokens: %s", prompt_tokens)
+            corrections = response.get("corrections") or []
+            if len(corrections) > 1:
+                logger.info("CRAG corrective iterations: %s", corrections)
+
+            return {
+                "messages": response["messages"][-1].content,
+                "prompt_tokens": prompt_tokens,
+                "corrections": corrections
+            }
+
+        except AdmissionRejected:
+            # shed by the LLM scheduler, answered with 429/503
+            raise
 
         except Exception as e:
             raise ValueError(f"Error invoking CRAG: {e}")
 
+        finally:
+            if self.speculative:
+                self.speculative.discard(prefetch)
+
     def build(self):
         try:
             builder = StateGraph(AgentState)
-            builder.add_node("agent", lambda state: agent(state))
-            builder.add_node("tools", CustomToolNode())
-            builder.add_node("crag", grade_documents)
-            builder.add_node("generate", generate)
+
+            def node(name, function, role=None):
+                # timed, running in the graph executor
+                return self.threaded(self.latency.timed(name, function, role))
+
+            builder.add_node("agent", node("agent", agent, "agent"))
+            builder.add_node(
+                "tools", node("tools", CustomToolNode(self.speculative))
+            )
+            builder.add_node(
+                "crag", node("crag", self.corrective.grade, "grader")
+            )
+            builder.add_node(
+                "rewrite", node("rewrite", self.corrective.rewrite, "agent")
+            )
+            builder.add_node(
+                "generate", node("generate", generate, "generator")
+            )
 
             builder.add_edge(START, "agent")
             builder.add_conditional_edges(
@@ -54,7 +144,15 @@ class CRAG:
                 }
             )
             builder.add_edge("tools", "crag")
-            builder.add_edge("crag", "generate")
+            builder.add_conditional_edges(
+                "crag",
+                self.corrective.route,
+                {
+                    "rewrite": "rewrite",
+                    "generate": "generate"
+                }
+            )
+            builder.add_edge("rewrite", "crag")
             builder.add_edge("generate", END)
             self.graph = builder.compile()
 
@@ -1,21 +1,34 @@
 
-from langchain_core.messages import ToolMessage, SystemMessage
+import time
+
+from langchain_core.messages import ToolMessage
 from langchain_core.prompts import PromptTemplate
 
 from .templates import AgentState, GradeDocument
+from .context import ContextBuilder
+from src.infrastructure.config import settings
 from src.infrastructure.database import ChromaDB
+from src.infrastructure.metrics import span
 from .prompts import (
     grader_prompt, agent_prompt, no_generation, generate_answer_prompt
 )
+from src.services.tokenizer import Tokenizer
+
+
+def node_model(state: AgentState, role: str):
+    """
+    Modelo configurado para o papel do no, ou o modelo padrao.
+    """
+    return (state.get("models") or {}).get(role) or state["model"]
 
 
 class CustomToolNode:
-    def __init__(self):
-        self.db = ChromaDB()
+    def __init__(self, speculative=None):
         self.tools = {
-            "retriever": ChromaDB().retrieve,
-            "most_recent_files": ChromaDB().get_most_recent
+            "retriever": ChromaDB.retrieve,
+            "most_recent_files": ChromaDB.get_most_recent
         }
+        self.speculative = speculative
 
     def __call__(self, inputs: list):
         if messages := inputs.get("messages", []):
@@ -23,16 +36,28 @@ class CustomToolNode:
         else:
             raise ValueError("No messages found in inputs")
 
+        prefetch = inputs.get("prefetch")
+        start = time.perf_counter()
         for tool_call in message.tool_calls:
-            tool_result = self.tools[tool_call["name"]].invoke(
-                tool_call["args"]
-            )
+            if (
+                tool_call["name"] == "retriever"
+                and self.speculative and prefetch is not None
+            ):
+                with span("chroma", "retrieve"):
+                    tool_result = self.speculative.resolve(
+                        prefetch, tool_call["args"].get("query", "")
+                    )
+            else:
+                tool_result = self.tools[tool_call["name"]].invoke(
+                    tool_call["args"]
+                )
 
         if not isinstance(tool_call["args"], dict):
             raise TypeError("Tool call args must be a dictionary")
 
         query = tool_call["args"].get("query")
         docs = tool_result
+        seconds = time.perf_counter() - start
 
         messages.append(
             ToolMessage(
@@ -44,48 +69,90 @@ class CustomToolNode:
         return {
             "query": query,
             "docs": docs,
-            "messages": messages
+            "messages": messages,
+            "tool": tool_call["name"],
+            "relevant": [],
+            "graded": [],
+            "corrections": [{
+                "iteration": 0,
+                "query": query,
+                "retrieved": len(docs),
+                "retrieve_seconds": seconds
+            }]
         }
 
 
+def page_content(document) -> str:
+    return (
+        document.page_content
+        if not isinstance(document, dict)
+        else document["page_content"]
+    )
+
+
 def grade_documents(state: AgentState):
+    """
+    Avalia os documentos recuperados, somando aos relevantes das
+    iteracoes anteriores do loop corretivo. Para assim que houver
+    CRAG_RELEVANT_K documentos relevantes, sem avaliar o restante.
+    """
     queries = state["query"]
     messages = state.get("messages", [])
     docs_recuperados = state["docs"]
-    LLM = state["model"]
+    LLM = node_model(state, "grader")
+    limit = settings.CRAG_RELEVANT_K
+    start = time.perf_counter()
 
     retrieval_grader_chain = (
         PromptTemplate.from_template(grader_prompt)
         | LLM.with_structured_output(GradeDocument)
     )
 
-    filtered_docs = list()
+    history, _ = ContextBuilder().format_history(messages)
+
+    filtered_docs = list(state.get("relevant") or [])
+    seen = set(state.get("graded") or [])
+    graded = 0
     for d in docs_recuperados:
+        if limit and len(filtered_docs) >= limit:
+            break
+        content = page_content(d)
+        if content in seen:
+            # already graded in a previous iteration
+            continue
+        seen.add(content)
+        graded += 1
         score = retrieval_grader_chain.invoke(
             {
                 "question": queries,
-                "document": (
-                    d.page_content
-                    if not isinstance(d, dict)
-                    else d["page_content"]
-                ),
-                "message": messages}
+                "document": content,
+                "message": history}
         )
         if score and score.binary_score == "yes":
             filtered_docs.append(d)
 
+    corrections = list(state.get("corrections") or [{"iteration": 0}])
+    corrections[-1] = {
+        **corrections[-1],
+        "graded": graded,
+        "relevant": len(filtered_docs),
+        "grade_seconds": time.perf_counter() - start
+    }
     return {
         "docs": filtered_docs,
+        "relevant": filtered_docs,
+        "graded": list(seen),
         "query": queries,
-        "messages": messages
+        "messages": messages,
+        "corrections": corrections
     }
 
 
 def agent(state: AgentState):
-    LLM = state["model"]
+    LLM = node_model(state, "agent")
     agent_msg = PromptTemplate.from_template(agent_prompt)
     chain = agent_msg | LLM.bind_tools(
-        [ChromaDB().retrieve, ChromaDB().get_most_recent]
+        [ChromaDB.retrieve, ChromaDB.get_most_recent]
     )
 
     return {
@@ -100,34 +167,42 @@ def should_continue(state: AgentState):
 
 
 def generate(state: AgentState):
-    LLM = state["model"]
-    docs = state.get("docs", None)
+    LLM = node_model(state, "generator")
+    docs = state.get("docs", None) or []
     messages = state.get("messages", [])
-    query = state.get("query", None) or messages[0].content
+    builder = ContextBuilder()
+    question = builder.question(messages)
+    query = state.get("query", None) or (
+        question.content if question else ""
+    )
+    history, _ = builder.format_history(messages)
 
     if len(docs) >= 1 and isinstance(messages[-1], ToolMessage):
-        answer_chain = (
-            PromptTemplate(
-                input_variables=["query", "context", "message"],
-                template=generate_answer_prompt
-            )
-            | LLM
-        )
-
-        result = answer_chain.invoke(
-            {
-                "query": query,
-                "context": docs,
-                "message": messages
-            }
+        context, _ = builder.format_documents(docs)
+        prompt = PromptTemplate(
+            input_variables=["query", "context", "message"],
+            template=generate_answer_prompt
         )
-
-        return {
-            "messages": result,
+        inputs = {
+            "query": query,
+            "context": context,
+            "message": history
         }
-
     else:
-        messages = [SystemMessage(content=no_generation)] + state["messages"]
-        return {
-            "messages": [LLM.invoke(messages)],
+        # same summary and history as an answer, without documents
+        prompt = PromptTemplate(
+            input_variables=["query", "message"],
+            template=no_generation
+        )
+        inputs = {
+            "query": question.content if question else query,
+            "message": history
         }
+
+    answer_chain = prompt | LLM
+    result = answer_chain.invoke(inputs)
+
+    return {
+        "messages": result,
+        "prompt_tokens": Tokenizer.count(prompt.format(**inputs))
+    }
@@ -24,20 +24,64 @@ grader_prompt = """
 """
 
 
+rewrite_prompt = """
+    Os documentos recuperados para a consulta abaixo nao ajudam a
+    responder a pergunta do usuario. Reescreva a consulta para a vector
+    store com outros termos (sinonimos, termos mais especificos ou mais
+    gerais), diferente das consultas ja feitas.
+
+    Pergunta:
+    {question}
+
+    Consultas ja feitas:
+    {queries}
+
+    Responda apenas com a nova consulta.
+"""
+
+
 no_generation = """
     Informe ao usuario que não foi possivel gerar uma resposta para
-    a sua pergunta.
+    a sua pergunta, pois nenhum arquivo relevante foi encontrado.
+
+    Pergunta:
+    {query}
+
+    Historico da conversa:
+    {message}
+
+    OBS:
+        - A resposta deve ser gerada na mesma lingua da pergunta.
 """
 
 
 generate_answer_prompt = """
     Escreva uma resposta para a pergunta do usuario com base nos
-    arquivos recuperados:
+    arquivos recuperados.
+
+    Pergunta:
     {query}
+
+    Arquivos recuperados:
     {context}
+
+    Historico da conversa:
     {message}
 
     OBS:
-        - A resposta deve ser gerada na mesma lingua da entrada abaixo:
-            {query}
+        - A resposta deve ser gerada na mesma lingua da pergunta.
+"""
+
+
+summary_prompt = """
+    Atualize o resumo da conversa entre o usuario e o assistente,
+    mantendo fatos, pedidos e decisoes importantes de forma concisa.
+
+    Resumo atual:
+    {summary}
+
+    Novas mensagens:
+    {conversation}
+
+    Responda apenas com o resumo atualizado.
 """
@@ -0,0 +1,191 @@
+import re
+import math
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional
+
+from src.infrastructure.config import settings
+from src.infrastructure.database import ChromaDB
+from src.infrastructure.metrics import registry
+
+
+SPECULATIVE = registry.counter(
+    "crag_speculative_retrieval_total",
+    "Speculative retrievals by outcome (exact, similar, miss, unused)",
+    ("outcome",)
+)
+
+_NON_WORDS = re.compile(r"[^\w]+")
+
+
+def normalize(query: str) -> str:
+    return _NON_WORDS.sub(" ", query.casefold()).strip()
+
+
+def cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a) * sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class Prefetch:
+    """
+    Busca especulativa de uma requisicao, iniciada com a mensagem do
+    usuario antes do agente decidir a query. O embedding fica disponivel
+    em embedding assim que calculado, antes do fim da busca.
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self.embedding: Future = Future()
+        self.future: Optional[Future] = None
+        self.used = False
+
+
+class SpeculativeRetriever:
+    """
+    Inicia a busca no ChromaDB com a mensagem do usuario em paralelo com
+    o no do agente. Quando o agente chama o retriever, o resultado
+    antecipado e reaproveitado se a query for igual (normalizada) ou se
+    o embedding dela tiver similaridade >= threshold com o da mensagem;
+    caso contrario e descartado e a busca e feita com a query do agente,
+    reaproveitando o embedding ja calculado.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        workers: Optional[int] = None,
+        k: int = 4,
+        timeout: Optional[float] = None
+    ):
+        self.threshold = (
+            threshold if threshold is not None
+            else settings.SPECULATIVE_SIMILARITY
+        )
+        self.timeout = (
+            timeout if timeout is not None
+            else settings.SPECULATIVE_TIMEOUT
+        )
+        self.k = k
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or settings.SPECULATIVE_WORKERS,
+            thread_name_prefix="speculative"
+        )
+        self._lock = threading.Lock()
+        self.outcomes = {"exact": 0, "similar": 0, "miss": 0, "unused": 0}
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def _embed(query: str) -> List[float]:
+        # the embeddings of the collection the retriever reads from
+        vector_store = ChromaDB.shared().retriever.vectorstore
+        return vector_store.embeddings.embed_query(query)
+
+    def _search_by_vector(self, embedding: List[float]) -> List[Any]:
+        vector_store = ChromaDB.shared().retriever.vectorstore
+        return vector_store.similarity_search_by_vector(embedding, k=self.k)
+
+    def _search(self, prefetch: Prefetch) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            embedding = self._embed(prefetch.query)
+        except Exception as e:
+            prefetch.embedding.set_exception(e)
+            raise
+        prefetch.embedding.set_result(embedding)
+        docs = self._search_by_vector(embedding)
+        return {
+            "embedding": embedding,
+            "docs": docs,
+            "seconds": time.perf_counter() - start
+        }
+
+    def start(self, query: str) -> Prefetch:
+        prefetch = Prefetch(query)
+        prefetch.future = self._executor.submit(self._search, prefetch)
+        return prefetch
+
+    def _wait(self, future: Future) -> Any:
+        """
+        Resultado de future, ou None se falhou ou nao terminou em
+        timeout segundos.
+        """
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            return None
+        except Exception:
+            return None
+
+    def _similar(self, prefetch: Prefetch, embedding: List[float]) -> bool:
+        speculative = self._wait(prefetch.embedding)
+        return (
+            speculative is not None
+            and cosine(embedding, speculative) >= self.threshold
+        )
+
+    def _record(self, outcome: str, saved: float = 0.0) -> None:
+        SPECULATIVE.inc(outcome=outcome)
+        with self._lock:
+            self.outcomes[outcome] += 1
+            self.saved_seconds += max(saved, 0.0)
+
+    def resolve(self, prefetch: Prefetch, query: str) -> List[Any]:
+        """
+        Documentos para a query do agente (chamado no no de tools). A
+        espera pela busca antecipada e limitada a timeout segundos e so
+        acontece quando o resultado pode ser reaproveitado.
+        """
+        prefetch.used = True
+        exact = normalize(query) == normalize(prefetch.query)
+
+        start = time.perf_counter()
+        embedding = None if exact else self._embed(query)
+        result = None
+        # still queued behind other searches: not worth waiting for;
+        # a different query only waits for the embedding, not the search
+        if not prefetch.future.cancel() and (
+            exact or self._similar(prefetch, embedding)
+        ):
+            result = self._wait(prefetch.future)
+        spent = time.perf_counter() - start
+
+        if result is not None:
+            # what the agent would have waited for, minus what it did wait
+            self._record(
+                "exact" if exact else "similar", result["seconds"] - spent
+            )
+            return result["docs"]
+
+        self._record("miss")
+        return self._search_by_vector(embedding or self._embed(query))
+
+    def discard(self, prefetch: Optional[Prefetch]) -> None:
+        """
+        Fim da requisicao: conta as buscas que o agente nao usou.
+        """
+        if prefetch is not None and not prefetch.used:
+            prefetch.future.cancel()
+            self._record("unused")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            used = sum(
+                self.outcomes[key] for key in ("exact", "similar", "miss")
+            )
+            hits = self.outcomes["exact"] + self.outcomes["similar"]
+            return {
+                **self.outcomes,
+                "threshold": self.threshold,
+                "hit_rate": hits / used if used else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "avg_saved_seconds": (
+                    self.saved_seconds / hits if hits else 0.0
+                )
+            }
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,97 @@
+import logging
+from typing import Dict, List, Set
+from langchain_ollama import OllamaLLM
+from langchain_openai import ChatOpenAI
+
+from src.infrastructure.config import settings
+from src.infrastructure.database import (
+    MongoDB,
+    HistoryCache,
+    HistoryWriter,
+    get_conversation,
+    save_history_summary
+)
+from src.services.tokenizer import Tokenizer
+from .prompts import summary_prompt
+
+
+logger = logging.getLogger(__name__)
+
+
+class HistorySummarizer:
+    """
+    Resume incrementalmente as mensagens antigas do historico, para que
+    os nos do grafo recebam apenas o resumo e as ultimas mensagens.
+    Deve ser executado fora do caminho da requisicao (background task).
+    """
+
+    def __init__(self):
+        self.enabled = settings.SUMMARY_ENABLED
+        self.trigger_tokens = settings.SUMMARY_TRIGGER_TOKENS
+        self.keep_messages = settings.SUMMARY_KEEP_MESSAGES
+        self._running: Set[str] = set()
+
+    def pending(self, conversation: Dict) -> List[Dict[str, str]]:
+        """
+        Mensagens que ainda nao estao no resumo, exceto as mais recentes.
+        """
+        history = conversation["history"]
+        start = max(
+            conversation["summarized_until"] - conversation["offset"], 0
+        )
+        return history[start:len(history) - self.keep_messages]
+
+    def needs_refresh(self, conversation: Dict) -> bool:
+        start = max(
+            conversation["summarized_until"] - conversation["offset"], 0
+        )
+        tokens = sum(
+            Tokenizer.count(m["content"])
+            for m in conversation["history"][start:]
+        )
+        return tokens >= self.trigger_tokens and bool(
+            self.pending(conversation)
+        )
+
+    async def refresh(
+        self,
+        user_id: str,
+        database: MongoDB,
+        model: ChatOpenAI | OllamaLLM,
+        writer: HistoryWriter = None,
+        cache: HistoryCache = None
+    ) -> None:
+        if not self.enabled or user_id in self._running:
+            return
+
+        self._running.add(user_id)
+        try:
+            conversation = await get_conversation(
+                user_id, database, writer, cache
+            )
+            if not self.needs_refresh(conversation):
+                return
+
+            turns = self.pending(conversation)
+            response = await model.ainvoke(
+                summary_prompt.format(
+                    summary=conversation["summary"],
+                    conversation="\n".join(
+                        f"{m['role']}: {m['content']}" for m in turns
+                    )
+                )
+            )
+            _ = await save_history_summary(
+                user_id=user_id,
+                summary=getattr(response, "content", response),
+                summarized_until=(
+                    conversation["offset"]
+                    + len(conversation["history"]) - self.keep_messages
+                ),
+                database=database,
+                cache=cache
+            )
+        except Exception as e:
+            logger.warning("Error summarizing history of %s: %s", user_id, e)
+        finally:
+            self._running.discard(user_id)
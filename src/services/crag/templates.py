@@ -1,7 +1,7 @@
 from langchain_core.messages import BaseMessage
 from langgraph.graph import add_messages
 from pydantic import BaseModel, Field
-from typing import Annotated, TypedDict, List, Dict
+from typing import Annotated, Any, TypedDict, List, Dict
 
 from langchain_ollama.llms import OllamaLLM
 from langchain_openai import ChatOpenAI
@@ -14,6 +14,14 @@ class AgentState(TypedDict):
     query: List[str]
     docs: List[Dict]
     model: OllamaLLM | ChatOpenAI
+    models: Dict[str, OllamaLLM | ChatOpenAI]
+    prompt_tokens: int
+    prefetch: Any
+    tool: str
+    relevant: List[Dict]
+    graded: List[str]
+    corrections: List[Dict[str, Any]]
+    started: float
     index_name: str = Field(default=settings.INDEX_NAME)
 
 
@@ -0,0 +1,78 @@
+import time
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.infrastructure.metrics import record
+
+
+def model_label(model: Any) -> str:
+    wrapped = getattr(model, "model", None)
+    if wrapped is not None and not isinstance(wrapped, str):
+        # ScheduledModel
+        return model_label(wrapped)
+    endpoints = getattr(model, "endpoints", None)
+    if endpoints:
+        model = endpoints[0].model
+    return (
+        getattr(model, "model_name", None)
+        or getattr(model, "model", None)
+        or type(model).__name__
+    )
+
+
+class NodeLatency:
+    """
+    Latencia de cada no do grafo, separada pelo modelo usado no no, para
+    comparar os tiers de modelo.
+    """
+
+    def __init__(self):
+        self._stats: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, node: str, model: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault((node, model), [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def timed(
+        self,
+        node: str,
+        function: Callable,
+        role: Optional[str] = None
+    ) -> Callable:
+        @wraps(function)
+        def wrapper(state):
+            model = (
+                (state.get("models") or {}).get(role) or state.get("model")
+                if role else None
+            )
+            start = time.perf_counter()
+            try:
+                return function(state)
+            finally:
+                seconds = time.perf_counter() - start
+                record("node", node, seconds)
+                self.record(
+                    node,
+                    model_label(model) if model is not None else "",
+                    seconds
+                )
+        return wrapper
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "node": node,
+                    "model": model,
+                    "count": count,
+                    "avg_seconds": total / count,
+                    "max_seconds": maximum
+                }
+                for (node, model), (count, total, maximum)
+                in self._stats.items()
+            ]
@@ -1,3 +1,5 @@
 from .reader import DocumentReader
+from .chunker import Chunker
+from .ingestion import BulkIngestion
 
-__all__ = ["DocumentReader"]
+__all__ = ["DocumentReader", "Chunker", "BulkIngestion"]
@@ -0,0 +1,321 @@
+import re
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from src.infrastructure.config import settings
+from src.services.tokenizer import Tokenizer
+
+
+_PARAGRAPHS = re.compile(r"\n[ \t]*\n")
+_SENTENCES = re.compile(r"(?<=[.!?;:])\s+")
+_WORDS = re.compile(r"\S+")
+# markdown headings, numbered titles ("2.1 Escopo", "3. Prazo"; the
+# number is dotted and short, so "2023 Foi um ano" is text) and short
+# upper case lines ("CLAUSULA PRIMEIRA")
+_HEADING = re.compile(
+    r"#{1,6}\s+\S.{0,150}"
+    r"|\d{1,3}\.(\d{1,3}\.?)*\s+[A-ZÀ-Ý][^.!?]{0,100}"
+    r"|(?=[^a-z]*[A-ZÀ-Ý])[A-ZÀ-Ý0-9][A-ZÀ-Ý0-9 ,:()\-]{2,100}"
+)
+
+# (start, end, tokens, is_heading)
+Unit = Tuple[int, int, int, bool]
+
+
+def _spans(pattern: re.Pattern, text: str, start: int, end: int):
+    """
+    Trechos de text[start:end] entre os separadores, sem espacos nas
+    pontas, como (inicio, fim) absolutos.
+    """
+    position = start
+    for match in pattern.finditer(text, start, end):
+        yield position, match.start()
+        position = match.end()
+    yield position, end
+
+
+def _strip(text: str, start: int, end: int) -> Tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _pieces(
+    text: str,
+    start: int,
+    end: int,
+    max_tokens: int
+) -> Iterator[Unit]:
+    """
+    Divide text[start:end] em frases e, quando uma frase nao cabe em
+    max_tokens, em palavras.
+    """
+    for s_start, s_end in _spans(_SENTENCES, text, start, end):
+        s_start, s_end = _strip(text, s_start, s_end)
+        if s_start == s_end:
+            continue
+        tokens = Tokenizer.count(text[s_start:s_end])
+        if tokens <= max_tokens:
+            yield s_start, s_end, tokens, False
+            continue
+        for match in _WORDS.finditer(text, s_start, s_end):
+            word = match.group()
+            tokens = Tokenizer.count(word)
+            if tokens <= max_tokens:
+                yield match.start(), match.end(), tokens, False
+                continue
+            # a single huge "word" (urls, base64...) is cut by size
+            step = max_tokens * 4
+            for offset in range(0, len(word), step):
+                piece = word[offset:offset + step]
+                yield (
+                    match.start() + offset,
+                    match.start() + offset + len(piece),
+                    Tokenizer.count(piece),
+                    False
+                )
+
+
+def _units(text: str, max_tokens: int) -> Iterator[Unit]:
+    """
+    Divide o texto em paragrafos e, quando um paragrafo nao cabe em um
+    chunk, em frases e depois em palavras.
+    """
+    for start, end in _spans(_PARAGRAPHS, text, 0, len(text)):
+        start, end = _strip(text, start, end)
+        if start == end:
+            continue
+        paragraph = text[start:end]
+        tokens = Tokenizer.count(paragraph)
+        heading = (
+            "\n" not in paragraph and bool(_HEADING.fullmatch(paragraph))
+        )
+        if tokens <= max_tokens:
+            yield start, end, tokens, heading
+            continue
+        yield from _pieces(text, start, end, max_tokens)
+
+
+def split_segment(
+    text: str,
+    page: Optional[int],
+    base_offset: int,
+    max_tokens: int,
+    overlap_tokens: int,
+    section: str = ""
+) -> Tuple[List[Dict], str]:
+    """
+    Agrupa as unidades do texto em chunks de ate max_tokens, repetindo
+    ate overlap_tokens do fim de um chunk no inicio do proximo. Titulos
+    sempre iniciam um novo chunk, junto com o texto que os segue; um
+    titulo no fim do segmento nao vira um chunk sozinho (a menos que o
+    segmento so tenha titulos), apenas a secao dos chunks seguintes.
+    Retorna os chunks e a secao no fim do segmento. Funcao de modulo
+    para poder rodar no pool de processos.
+    """
+    chunks: List[Dict] = []
+    current: List[Unit] = []
+    tokens = 0
+    units = _units(text, max_tokens)
+    pending: List[Unit] = []
+
+    def emit() -> None:
+        start, end = current[0][0], current[-1][1]
+        chunks.append({
+            "text": text[start:end],
+            "page": page,
+            "offset": base_offset + start,
+            "tokens": tokens,
+            "section": section
+        })
+
+    while (
+        unit := pending.pop() if pending else next(units, None)
+    ) is not None:
+        headings = bool(current) and all(u[3] for u in current)
+        if unit[3]:
+            if current and not headings:
+                emit()
+                current, tokens = [], 0
+            section = text[unit[0]:unit[1]].lstrip("# ").strip()
+
+        elif current and tokens + unit[2] > max_tokens:
+            if headings and max_tokens > tokens:
+                # the body is split so its start fits with the heading
+                pieces = list(
+                    _pieces(text, unit[0], unit[1], max_tokens - tokens)
+                )
+                if len(pieces) > 1:
+                    pending.extend(reversed(pieces))
+                    continue
+            emit()
+            # overlap: keeps the last units that fit in overlap_tokens
+            kept, kept_tokens = [], 0
+            for previous in reversed(current):
+                if kept_tokens + previous[2] > overlap_tokens:
+                    break
+                kept.insert(0, previous)
+                kept_tokens += previous[2]
+            while kept and kept_tokens + unit[2] > max_tokens:
+                kept_tokens -= kept.pop(0)[2]
+            current, tokens = kept, kept_tokens
+
+        current.append(unit)
+        tokens += unit[2]
+
+    if current and not (chunks and all(u[3] for u in current)):
+        emit()
+    return chunks, section
+
+
+def _split_many(
+    segments: List[Tuple[str, Optional[int], int]],
+    max_tokens: int,
+    overlap_tokens: int
+) -> List[Tuple[List[Dict], str]]:
+    return [
+        split_segment(text, page, offset, max_tokens, overlap_tokens)
+        for text, page, offset in segments
+    ]
+
+
+class Chunker:
+    """
+    Divide documentos em chunks com tamanho medido em tokens (pelo
+    Tokenizer), respeitando paginas, paragrafos e titulos de secao. Cada
+    chunk traz a pagina, o offset (em caracteres, dentro da pagina), a
+    secao e a quantidade de tokens.
+
+    Documentos grandes sao divididos em segmentos (em quebras de
+    paragrafo) processados em paralelo em um pool de processos
+    compartilhado.
+    """
+
+    _pool: Optional[ProcessPoolExecutor] = None
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        processes: Optional[int] = None,
+        parallel_bytes: Optional[int] = None,
+        segment_bytes: Optional[int] = None
+    ):
+        # CHUNK_SIZE/CHUNK_OVERLAP are in characters, ~4 per token
+        self.max_tokens = (
+            max_tokens or settings.CHUNK_TOKENS
+            or max(settings.CHUNK_SIZE // 4, 1)
+        )
+        self.overlap_tokens = (
+            overlap_tokens if overlap_tokens is not None
+            else settings.CHUNK_OVERLAP_TOKENS or settings.CHUNK_OVERLAP // 4
+        )
+        self.processes = (
+            processes or settings.CHUNK_PROCESSES or os.cpu_count() or 1
+        )
+        self.parallel_bytes = parallel_bytes or settings.CHUNK_PARALLEL_BYTES
+        self.segment_bytes = segment_bytes or settings.CHUNK_SEGMENT_BYTES
+
+    @classmethod
+    def pool(cls, processes: int) -> ProcessPoolExecutor:
+        if cls._pool is None:
+            cls._pool = ProcessPoolExecutor(max_workers=processes)
+        return cls._pool
+
+    @classmethod
+    async def close(cls) -> None:
+        if cls._pool is not None:
+            cls._pool.shutdown(wait=False, cancel_futures=True)
+            cls._pool = None
+
+    def segments(
+        self,
+        pages: Union[str, List[str]]
+    ) -> List[Tuple[str, Optional[int], int]]:
+        """
+        Um texto unico (sem paginas) ou a lista de paginas. Paginas
+        grandes sao cortadas em quebras de paragrafo perto de
+        segment_bytes, mantendo o offset original de cada pedaco.
+        """
+        segments = []
+        numbered = not isinstance(pages, str)
+        for number, text in enumerate(
+            pages if numbered else [pages], start=1
+        ):
+            page = number if numbered else None
+            start = 0
+            while len(text) - start > self.segment_bytes:
+                cut = text.find("\n\n", start + self.segment_bytes)
+                if cut == -1:
+                    break
+                segments.append((text[start:cut], page, start))
+                start = cut
+            segments.append((text[start:], page, start))
+        return segments
+
+    def split(self, pages: Union[str, List[str]]) -> List[Dict]:
+        """
+        Divide sem paralelismo, no processo atual.
+        """
+        return self._join(_split_many(
+            self.segments(pages), self.max_tokens, self.overlap_tokens
+        ))
+
+    async def asplit(self, pages: Union[str, List[str]]) -> List[Dict]:
+        """
+        Divide fora do event loop: em uma thread para documentos
+        pequenos, no pool de processos para os grandes.
+        """
+        size = (
+            len(pages) if isinstance(pages, str)
+            else sum(len(page) for page in pages)
+        )
+        if size < self.parallel_bytes or self.processes <= 1:
+            return await asyncio.to_thread(self.split, pages)
+
+        segments = self.segments(pages)
+        batches = [
+            segments[i::self.processes] for i in range(self.processes)
+        ]
+        loop = asyncio.get_running_loop()
+        pool = self.pool(self.processes)
+        results = await asyncio.gather(*[
+            loop.run_in_executor(
+                pool,
+                _split_many,
+                batch,
+                self.max_tokens,
+                self.overlap_tokens
+            )
+            for batch in batches if batch
+        ])
+
+        # batches are strided, so put the segments back in order
+        ordered: List[Tuple[List[Dict], str]] = [None] * len(segments)
+        for i, batch_result in enumerate(results):
+            for j, result in enumerate(batch_result):
+                ordered[i + j * self.processes] = result
+        return self._join(ordered)
+
+    @staticmethod
+    def _join(results: List[Tuple[List[Dict], str]]) -> List[Dict]:
+        """
+        Junta os chunks dos segmentos, em ordem. Os chunks antes do
+        primeiro titulo de um segmento (ou pagina) continuam a secao do
+        segmento anterior.
+        """
+        chunks, section = [], ""
+        for segment_chunks, last_section in results:
+            for chunk in segment_chunks:
+                if chunk["section"]:
+                    section = chunk["section"]
+                else:
+                    chunk["section"] = section
+                chunk["chunk_index"] = len(chunks)
+                chunks.append(chunk)
+            section = last_section or section
+        return chunks
@@ -0,0 +1,245 @@
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from src.infrastructure.config import settings
+from .chunker import Chunker
+from .reader import DocumentReader
+
+
+class BulkIngestion:
+    """
+    Ingestao de muitos arquivos (ou de pacotes zip/tar) em uma requisicao.
+
+    Os arquivos sao lidos um a um dos uploads, lidos e divididos em
+    chunks em paralelo no pool de processos do Chunker (no maximo
+    2 * workers ao mesmo tempo, para limitar a memoria), e os chunks de
+    arquivos diferentes sao agrupados em lotes de embed_batch para o
+    embedding e a insercao no ChromaDB. Se um lote falha, ele e refeito
+    arquivo por arquivo, e os chunks ja inseridos dos arquivos que falham
+    sao removidos, para que nenhum arquivo fique indexado pela metade.
+    """
+
+    def __init__(
+        self,
+        vector_store,
+        collection_name: Optional[str] = None,
+        workers: Optional[int] = None,
+        embed_batch: Optional[int] = None,
+        max_file_bytes: Optional[int] = None
+    ):
+        self.vector_store = vector_store
+        self.collection_name = collection_name or settings.INDEX_NAME
+        self.workers = (
+            workers or settings.CHUNK_PROCESSES or os.cpu_count() or 1
+        )
+        self.embed_batch = embed_batch or settings.BULK_EMBED_BATCH
+        self.max_file_bytes = max_file_bytes or settings.BULK_MAX_FILE_BYTES
+
+        self._documents: List[str] = []
+        self._metadatas: List[dict] = []
+        self._owners: List[dict] = []
+        # ids inserted for each file, by id() of its result
+        self._inserted: Dict[int, List[str]] = {}
+
+    def _parse(self, name: str, content: bytes) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        # one cpu: threads avoid pickling the files to another process
+        pool = Chunker.pool(self.workers) if self.workers > 1 else None
+        return loop.run_in_executor(pool, DocumentReader.parse, name, content)
+
+    async def _add(
+        self,
+        documents: List[str],
+        metadatas: List[dict],
+        owners: List[dict]
+    ) -> None:
+        ids = [str(uuid.uuid4()) for _ in documents]
+        await self.vector_store.add_documents(
+            documents=documents,
+            collection_name=self.collection_name,
+            metadatas=metadatas,
+            ids=ids
+        )
+        for result, chunk_id in zip(owners, ids):
+            self._inserted.setdefault(id(result), []).append(chunk_id)
+
+    async def _fail(self, result: dict, error: str) -> None:
+        """
+        Marca o arquivo como erro e remove os chunks dele ja inseridos
+        e os ainda na fila.
+        """
+        result["status"] = "error"
+        result["error"] = error
+        keep = [
+            i for i, owner in enumerate(self._owners) if owner is not result
+        ]
+        self._documents[:] = [self._documents[i] for i in keep]
+        self._metadatas[:] = [self._metadatas[i] for i in keep]
+        self._owners[:] = [self._owners[i] for i in keep]
+
+        if ids := self._inserted.pop(id(result), None):
+            try:
+                await self.vector_store.delete_documents(
+                    ids=ids, collection_name=self.collection_name
+                )
+            except Exception as e:
+                result["partial"] = True
+                result["indexed_chunks"] = len(ids)
+                result["error"] += f"; error removing indexed chunks: {e}"
+
+    async def _flush(self, size: int) -> None:
+        documents = self._documents[:size]
+        metadatas = self._metadatas[:size]
+        owners = self._owners[:size]
+        del self._documents[:size]
+        del self._metadatas[:size]
+        del self._owners[:size]
+
+        try:
+            await self._add(documents, metadatas, owners)
+        except Exception:
+            await self._retry(documents, metadatas, owners)
+
+    async def _retry(
+        self,
+        documents: List[str],
+        metadatas: List[dict],
+        owners: List[dict]
+    ) -> None:
+        """
+        Refaz um lote que falhou arquivo por arquivo, para que um arquivo
+        com problema nao faca os outros falharem.
+        """
+        files: Dict[int, tuple] = {}
+        for text, chunk, result in zip(documents, metadatas, owners):
+            _, texts, chunks = files.setdefault(id(result), (result, [], []))
+            texts.append(text)
+            chunks.append(chunk)
+        for result, texts, chunks in files.values():
+            try:
+                await self._add(texts, chunks, [result] * len(texts))
+            except Exception as e:
+                await self._fail(result, f"Error indexing chunks: {e}")
+
+    async def _collect(
+        self,
+        task: asyncio.Future,
+        result: dict,
+        metadata: dict
+    ) -> None:
+        try:
+            document = task.result()
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+            return
+
+        metadata = {
+            **metadata,
+            "extension": document["extension"],
+            "file_name": document["name"]
+        }
+        result["status"] = "ok"
+        result["chunks"] = len(document["content"])
+        for text, chunk in zip(document["content"], document["chunks"]):
+            self._documents.append(text)
+            self._metadatas.append({
+                **metadata,
+                **{k: v for k, v in chunk.items() if v is not None}
+            })
+            self._owners.append(result)
+
+        while len(self._documents) >= self.embed_batch:
+            await self._flush(self.embed_batch)
+
+    async def ingest(
+        self,
+        uploads: List[Any],
+        defaults: Optional[Dict[str, Any]] = None,
+        metadata: Optional[Dict[str, Dict[str, Any]]] = None,
+        invalid: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        uploads: objetos com filename e file (como os UploadFile).
+        metadata: metadados por nome de arquivo (para arquivos de um
+        pacote, o caminho dentro dele), sobre os defaults.
+        invalid: erro por nome de arquivo com metadados invalidos; esses
+        arquivos nao sao lidos nem indexados.
+        """
+        defaults = defaults or {}
+        metadata = metadata or {}
+        invalid = invalid or {}
+        start = time.perf_counter()
+
+        results: List[dict] = []
+        in_flight: Dict[asyncio.Future, tuple] = {}
+
+        async def wait(when: str) -> None:
+            done, _ = await asyncio.wait(in_flight, return_when=when)
+            for task in done:
+                await self._collect(task, *in_flight.pop(task))
+
+        for upload in uploads:
+            files = iter(DocumentReader.expand(
+                upload.filename, upload.file, self.max_file_bytes
+            ))
+            while True:
+                try:
+                    # the spooled upload may be on disk
+                    item = await asyncio.to_thread(next, files, None)
+                except Exception as e:
+                    results.append({
+                        "file_name": upload.filename,
+                        "status": "error",
+                        "error": f"Invalid archive: {e}"
+                    })
+                    break
+                if item is None:
+                    break
+
+                name, content = item
+                result = {"file_name": name, "status": "pending"}
+                results.append(result)
+                if isinstance(content, Exception):
+                    result["status"] = "error"
+                    result["error"] = str(content)
+                    continue
+                if name in invalid:
+                    result["status"] = "error"
+                    result["error"] = invalid[name]
+                    continue
+
+                result["bytes"] = len(content)
+                task = self._parse(name, content)
+                in_flight[task] = (
+                    result, {**defaults, **(metadata.get(name) or {})}
+                )
+                if len(in_flight) >= self.workers * 2:
+                    await wait(asyncio.FIRST_COMPLETED)
+
+        if in_flight:
+            await wait(asyncio.ALL_COMPLETED)
+        if self._documents:
+            await self._flush(len(self._documents))
+
+        seconds = time.perf_counter() - start
+        ok = [result for result in results if result["status"] == "ok"]
+        size = sum(result.get("bytes", 0) for result in ok)
+        chunks = sum(result["chunks"] for result in ok)
+        return {
+            "files": results,
+            "summary": {
+                "files": len(results),
+                "ok": len(ok),
+                "failed": len(results) - len(ok),
+                "chunks": chunks,
+                "bytes": size,
+                "seconds": seconds,
+                "files_per_second": len(ok) / seconds if seconds else 0.0,
+                "chunks_per_second": chunks / seconds if seconds else 0.0,
+                "mb_per_second": size / seconds / 1e6 if seconds else 0.0
+            }
+        }
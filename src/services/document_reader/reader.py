@@ -1,38 +1,50 @@
-from typing import Dict
+from typing import Callable, Dict, IO, Iterator, List, Tuple, Union
 import json
+import asyncio
+import tarfile
+import zipfile
 from io import BytesIO
 from PyPDF2 import PdfReader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-from src.infrastructure.config import settings
+from .chunker import Chunker
 
 
 class DocumentReader:
+    _chunker: Chunker = None
+
+    @classmethod
+    def chunker(cls) -> Chunker:
+        """
+        Chunker reutilizado entre uploads (configurado pelas settings).
+        """
+        if cls._chunker is None:
+            cls._chunker = Chunker()
+        return cls._chunker
+
+    @staticmethod
+    async def split(text: Union[str, List[str]]) -> List[Dict]:
+        """
+        Chunks com metadados (page, offset, section, tokens). Aceita o
+        texto inteiro ou a lista de paginas.
+        """
+        return await DocumentReader.chunker().asplit(text)
 
     @staticmethod
-    async def split_text(text: str):
-        return RecursiveCharacterTextSplitter(
-            chunk_size=settings.CHUNK_SIZE,
-            chunk_overlap=settings.CHUNK_OVERLAP,
-            length_function=len,
-            is_separator_regex=False,
-        ).split_text(text)
+    async def split_text(text: Union[str, List[str]]) -> List[str]:
+        return [chunk["text"] for chunk in await DocumentReader.split(text)]
 
     @staticmethod
     async def read_file(file) -> Dict[str, str]:
         try:
-            document = {
-                "name": file.filename,
-                "extension":  file.filename.split('.')[-1]
-            }
+            document = DocumentReader._document(file.filename)
             content = await file.read()
-            document["content"] = await eval(
-                f"DocumentReader._read_{document['extension']}"
-            )(content)
-
-            document["content"] = await DocumentReader.split_text(
-                document["content"]
+            text = await asyncio.to_thread(
+                DocumentReader._reader(document["extension"]), content
             )
+
+            chunks = await DocumentReader.split(text)
+            document["content"] = [chunk.pop("text") for chunk in chunks]
+            document["chunks"] = chunks
             return document
 
         except Exception as e:
@@ -41,17 +53,92 @@ class DocumentReader:
             )
 
     @staticmethod
-    async def _read_json(contents):
-        return json.loads(contents)
+    def parse(name: str, content: bytes) -> Dict:
+        """
+        Versao sincrona de read_file, para os processos do pool da
+        ingestao em lote.
+        """
+        document = DocumentReader._document(name)
+        text = DocumentReader._reader(document["extension"])(content)
+
+        chunks = DocumentReader.chunker().split(text)
+        document["content"] = [chunk.pop("text") for chunk in chunks]
+        document["chunks"] = chunks
+        return document
+
+    @staticmethod
+    def _document(name: str) -> Dict:
+        return {"name": name, "extension": name.split('.')[-1]}
+
+    @staticmethod
+    def _reader(extension: str) -> Callable[[bytes], Union[str, List]]:
+        reader = getattr(DocumentReader, f"_read_{extension}", None)
+        if reader is None:
+            raise ValueError(f"File type not supported: .{extension}")
+        return reader
+
+    @staticmethod
+    def is_archive(name: str) -> bool:
+        return name.lower().endswith(ARCHIVES)
+
+    @staticmethod
+    def expand(
+        name: str,
+        file: IO[bytes],
+        max_bytes: int
+    ) -> Iterator[Tuple[str, Union[bytes, Exception]]]:
+        """
+        Arquivos de um zip/tar (lidos um a um do arquivo temporario do
+        upload, sem carregar o pacote inteiro) ou o proprio arquivo. Os
+        que passam de max_bytes vem com o erro no lugar do conteudo.
+        """
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(file) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    if info.file_size > max_bytes:
+                        yield info.filename, _too_large(max_bytes)
+                    else:
+                        yield info.filename, archive.read(info)
+
+        elif DocumentReader.is_archive(name):
+            # streaming mode: members must be read in order
+            with tarfile.open(fileobj=file, mode="r|*") as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    if member.size > max_bytes:
+                        yield member.name, _too_large(max_bytes)
+                    else:
+                        yield member.name, archive.extractfile(member).read()
+
+        else:
+            content = file.read(max_bytes + 1)
+            if len(content) > max_bytes:
+                yield name, _too_large(max_bytes)
+            else:
+                yield name, content
 
     @staticmethod
-    async def _read_pdf(contents):
+    def _read_json(contents):
+        content = json.loads(contents)
+        if isinstance(content, str):
+            return content
+        return json.dumps(content, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def _read_pdf(contents):
         pdf_document = PdfReader(BytesIO(contents))
-        pdf_text = ""
-        for page in pdf_document.pages:
-            pdf_text += page.extract_text()
-        return pdf_text
+        return [page.extract_text() or "" for page in pdf_document.pages]
 
     @staticmethod
-    async def _read_plain(contents):
+    def _read_plain(contents):
         return contents.decode('utf-8')
+
+
+ARCHIVES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def _too_large(max_bytes: int) -> ValueError:
+    return ValueError(f"File larger than {max_bytes} bytes")
@@ -1,3 +1,3 @@
-from .llama_guard import LlamaGuard
+from .llama_guard import LlamaGuard, Verdict
 
-__all__ = ["LlamaGuard"]
+__all__ = ["LlamaGuard", "Verdict"]
@@ -1,17 +1,134 @@
+import re
+import time
+import asyncio
+import hashlib
+from typing import Dict, List
+from pydantic import BaseModel, Field
 from langchain_ollama.llms import OllamaLLM
+
+from src.infrastructure.cache import LRUCache
 from src.infrastructure.config import settings
+from src.infrastructure.metrics import LLMMetrics
+
+
+CATEGORIES = re.compile(r"\bS\d{1,2}\b")
+
+
+class Verdict(BaseModel):
+    safe: bool
+    categories: List[str] = Field(default_factory=list)
+    raw: str = ""
 
 
 class LlamaGuard:
     def __init__(self) -> None:
+        self.cache = LRUCache(
+            max_size=settings.LLAMA_GUARD_CACHE_SIZE,
+            ttl=settings.LLAMA_GUARD_CACHE_TTL
+        )
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.requests = 0
+        self.model_calls = 0
+        self.coalesced = 0
+        self.latency_seconds = 0.0
+        self.max_latency_seconds = 0.0
         try:
             self.llm = OllamaLLM(
                 model=settings.LLAMA_GUARD_MODEL,
                 base_url=settings.MODEL_URL,
+                callbacks=[LLMMetrics(settings.LLAMA_GUARD_MODEL)]
             )
         except:
             return None
 
+    @staticmethod
+    def parse(response: str) -> Verdict:
+        """
+        Interpreta a saida do Llama Guard ("safe" ou "unsafe" seguido das
+        categorias violadas, ex: "unsafe\\nS1,S10"). Qualquer saida que nao
+        comece com "safe" e considerada insegura.
+        """
+        lines = [line.strip() for line in response.splitlines()]
+        first = next((line.lower() for line in lines if line), "")
+        safe = first.startswith("safe")
+        return Verdict(
+            safe=safe,
+            categories=[] if safe else CATEGORIES.findall(response),
+            raw=response.strip()
+        )
+
+    @staticmethod
+    def _key(message: str) -> str:
+        return hashlib.sha256(message.encode("utf-8")).hexdigest()
+
     def __call__(self, message: str):
-        response = self.llm.invoke(message)
-        return True if response == "safe" else False
+        key = self._key(message)
+        if (verdict := self.cache.get(key)) is None:
+            verdict = self.parse(self.llm.invoke(message))
+            self.model_calls += 1
+            self.cache.set(key, verdict)
+        return verdict.safe
+
+    async def classify(self, message: str) -> Verdict:
+        """
+        Classifica a mensagem usando o cache de veredictos. Chamadas
+        simultaneas com a mesma mensagem compartilham uma unica chamada
+        ao modelo (o Ollama nao classifica varias mensagens em uma
+        requisicao, entao nao ha lote).
+        """
+        self.requests += 1
+        key = self._key(message)
+        if (verdict := self.cache.get(key)) is not None:
+            return verdict
+
+        task = self._inflight.get(key)
+        if task is None:
+            # referenced until done, so it is not garbage collected
+            task = asyncio.create_task(self._classify(key, message))
+            self._inflight[key] = task
+            task.add_done_callback(
+                lambda done: self._done(key, done)
+            )
+        else:
+            self.coalesced += 1
+        # a cancelled caller (guardrail) does not cancel the others
+        return await asyncio.shield(task)
+
+    async def check(self, message: str) -> bool:
+        return (await self.classify(message)).safe
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # retrieved even when every caller was cancelled
+            task.exception()
+
+    async def _classify(self, key: str, message: str) -> Verdict:
+        start = time.perf_counter()
+        try:
+            response = await self.llm.ainvoke(message)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.model_calls += 1
+            self.latency_seconds += elapsed
+            self.max_latency_seconds = max(
+                self.max_latency_seconds, elapsed
+            )
+
+        verdict = self.parse(response)
+        self.cache.set(key, verdict)
+        return verdict
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "model_calls": self.model_calls,
+            "coalesced": self.coalesced,
+            "avg_latency_seconds": (
+                self.latency_seconds / self.model_calls
+                if self.model_calls else 0.0
+            ),
+            "max_latency_seconds": self.max_latency_seconds,
+            "cache": self.cache.stats()
+        }
@@ -0,0 +1,76 @@
+import re
+import logging
+from typing import Any, Optional
+
+from src.infrastructure.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Approximates BPE tokenizers: words are split into ~4 character
+# pieces and every punctuation mark counts as a token.
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+class Tokenizer:
+    """
+    Contagem local e rapida de tokens, usada para orcamentos de prompt e
+    tamanho de chunks. Usa o tiktoken quando TOKENIZER_ENCODING estiver
+    configurado e disponivel localmente, caso contrario uma estimativa
+    baseada em regex.
+    """
+    _encoding: Optional[Any] = None
+    _loaded: bool = False
+
+    @classmethod
+    def _load(cls) -> None:
+        cls._loaded = True
+        if not settings.TOKENIZER_ENCODING:
+            return
+        try:
+            import tiktoken
+
+            cls._encoding = tiktoken.get_encoding(
+                settings.TOKENIZER_ENCODING
+            )
+        except Exception as e:
+            logger.warning(
+                "Tokenizer %s unavailable, using estimate: %s",
+                settings.TOKENIZER_ENCODING, e
+            )
+
+    @staticmethod
+    def _piece_tokens(piece: str) -> int:
+        return (len(piece) + 3) // 4
+
+    @classmethod
+    def count(cls, text: str) -> int:
+        if not text:
+            return 0
+        if not cls._loaded:
+            cls._load()
+        if cls._encoding:
+            return len(cls._encoding.encode_ordinary(text))
+        return sum(
+            cls._piece_tokens(piece) for piece in _PIECES.findall(text)
+        )
+
+    @classmethod
+    def truncate(cls, text: str, max_tokens: int) -> str:
+        """
+        Corta o texto para caber em max_tokens, preservando o inicio.
+        """
+        if max_tokens <= 0:
+            return ""
+        if not cls._loaded:
+            cls._load()
+        if cls._encoding:
+            tokens = cls._encoding.encode_ordinary(text)
+            return cls._encoding.decode(tokens[:max_tokens])
+
+        total = 0
+        for match in _PIECES.finditer(text):
+            total += cls._piece_tokens(match.group())
+            if total > max_tokens:
+                return text[:match.start()].rstrip()
+        return text
@@ -0,0 +1,392 @@
+"""
+Substitutos deterministicos e offline do LLM, do modelo de embeddings,
+do ChromaDB e do MongoDB, usados pelos testes e pelos benchmarks.
+"""
+import asyncio
+import copy
+import hashlib
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import chromadb
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.infrastructure.database import ChromaDB, MongoDB
+from src.services.tokenizer import Tokenizer
+
+
+def fake_embedding(text: str, dimension: int) -> list:
+    seed = int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16)
+    rng = random.Random(seed)
+    return [rng.uniform(-1, 1) for _ in range(dimension)]
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model com latencia fixa. Com tools vinculadas chama a primeira
+    delas (o retriever no agente, o GradeDocument no grader, sempre com
+    "yes"); sem tools responde com um trecho da ultima mensagem.
+    """
+
+    latency: float = 0.0
+    answer_tokens: int = 50
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(
+            tools=[convert_to_openai_tool(tool) for tool in tools],
+            **kwargs
+        )
+
+    @staticmethod
+    def _query(prompt: str) -> str:
+        # the agent prompt embeds the user message as "content='...'";
+        # echoing it back is what a real agent does most of the time
+        match = re.search(r"content='((?:[^'\\]|\\.)*)'", prompt)
+        return match.group(1) if match else prompt[-200:]
+
+    def _respond(
+        self,
+        messages: List[BaseMessage],
+        tools: Optional[List[dict]] = None
+    ) -> ChatResult:
+        text = str(messages[-1].content)
+        usage = {
+            "input_tokens": sum(
+                Tokenizer.count(str(message.content)) for message in messages
+            ),
+            "output_tokens": self.answer_tokens
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+
+        if tools:
+            name = tools[0]["function"]["name"]
+            args = (
+                {"query": self._query(text)} if name == "retriever"
+                else {"binary_score": "yes"}
+            )
+            message = AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": name,
+                    "args": args,
+                    "id": uuid.uuid4().hex,
+                    "type": "tool_call"
+                }],
+                usage_metadata=usage
+            )
+        else:
+            words = (text.split() or ["ok"]) * self.answer_tokens
+            message = AIMessage(
+                content=" ".join(words[:self.answer_tokens]),
+                usage_metadata=usage
+            )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools"))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None,
+                         **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools"))
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Embeddings deterministicos (derivados do hash do texto), com
+    latencia opcional por chamada.
+    """
+
+    def __init__(self, dimension: int = 64, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [fake_embedding(text, self.dimension) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class MemoryChromaDB(ChromaDB):
+    """
+    ChromaDB em processo (EphemeralClient) com embeddings falsos.
+    """
+
+    def __init__(self, embeddings: Optional[Embeddings] = None):
+        super().__init__()
+        self.embedding_function = embeddings or FakeEmbeddings()
+
+    def _connect(self):
+        return chromadb.EphemeralClient(
+            settings=chromadb.config.Settings(anonymized_telemetry=False)
+        )
+
+    def install(self) -> "MemoryChromaDB":
+        """
+        Usa esta instancia tambem nas tools do agente.
+        """
+        ChromaDB._shared = self
+        return self
+
+
+class MemoryCollection:
+    """
+    Colecao em memoria com o subconjunto da API do pymongo usado pela
+    API: filtros por igualdade, $set, $setOnInsert, $inc, $push/$each,
+    updates em pipeline com $set e as expressoes usadas no historico,
+    projecoes com $slice e a lista de indices (que nao sao usados).
+    """
+
+    OPERATORS = {
+        "$ifNull": lambda *values: next(
+            (value for value in values if value is not None), None
+        ),
+        "$size": len,
+        "$add": lambda *values: sum(values),
+        "$concatArrays": lambda *arrays: [
+            item for array in arrays for item in array
+        ]
+    }
+
+    def __init__(self, latency: float = 0.0):
+        self.documents: List[dict] = []
+        self.indexes: Dict[str, dict] = {"_id_": {"key": [("_id", 1)]}}
+        self.latency = latency
+        self._lock = threading.Lock()
+
+    def _wait(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def _matches(document: dict, filter_query: dict) -> bool:
+        return all(
+            document.get(key) == value for key, value in filter_query.items()
+        )
+
+    @staticmethod
+    def _project(document: dict, projection: Optional[dict]) -> dict:
+        # projects first and copies only what a server would send back
+        document = dict(document)
+        for key, value in (projection or {}).items():
+            if isinstance(value, dict) and "$slice" in value:
+                items = document.get(key, [])
+                count = value["$slice"]
+                document[key] = items[count:] if count < 0 else items[:count]
+            elif value == 0:
+                document.pop(key, None)
+        return copy.deepcopy(document)
+
+    @classmethod
+    def _evaluate(cls, expression: Any, document: dict) -> Any:
+        if isinstance(expression, str) and expression.startswith("$"):
+            return copy.deepcopy(document.get(expression[1:]))
+        if isinstance(expression, dict) and len(expression) == 1:
+            (operator, arguments), = expression.items()
+            if operator == "$literal":
+                return copy.deepcopy(arguments)
+            if operator in cls.OPERATORS:
+                if not isinstance(arguments, list):
+                    arguments = [arguments]
+                return cls.OPERATORS[operator](*(
+                    cls._evaluate(argument, document)
+                    for argument in arguments
+                ))
+        return expression
+
+    @classmethod
+    def _apply(cls, document: dict, update: Any, inserted: bool) -> None:
+        if isinstance(update, list):
+            for stage in update:
+                # expressions of a stage read the document before it
+                before = copy.deepcopy(document)
+                for key, value in stage["$set"].items():
+                    document[key] = cls._evaluate(value, before)
+            return
+        for key, value in update.get("$set", {}).items():
+            document[key] = value
+        if inserted:
+            for key, value in update.get("$setOnInsert", {}).items():
+                document[key] = value
+        for key, value in update.get("$inc", {}).items():
+            document[key] = document.get(key, 0) + value
+        for key, value in update.get("$push", {}).items():
+            items = value["$each"] if isinstance(value, dict) else [value]
+            document.setdefault(key, []).extend(copy.deepcopy(items))
+
+    def find(self, filter_query: dict, projection: Optional[dict] = None):
+        self._wait()
+        with self._lock:
+            return [
+                self._project(document, projection)
+                for document in self.documents
+                if self._matches(document, filter_query)
+            ]
+
+    def find_one(self, filter_query: dict, projection: Optional[dict] = None):
+        found = self.find(filter_query, projection)
+        return found[0] if found else None
+
+    def insert_one(self, document: dict) -> None:
+        self._wait()
+        with self._lock:
+            self.documents.append(copy.deepcopy(document))
+
+    def _update_one(self, filter_query: dict, update: dict, upsert: bool):
+        for document in self.documents:
+            if self._matches(document, filter_query):
+                self._apply(document, update, inserted=False)
+                return
+        if upsert:
+            document = copy.deepcopy(filter_query)
+            self._apply(document, update, inserted=True)
+            self.documents.append(document)
+
+    def update_one(
+        self,
+        filter_query: dict,
+        update: dict,
+        upsert: bool = False
+    ) -> None:
+        self._wait()
+        with self._lock:
+            self._update_one(filter_query, update, upsert)
+
+    def bulk_write(self, operations: List[Any], ordered: bool = True):
+        self._wait()
+        with self._lock:
+            for operation in operations:
+                self._update_one(
+                    operation._filter, operation._doc, operation._upsert
+                )
+
+    def create_indexes(self, models: List[Any]) -> List[str]:
+        for model in models:
+            self.indexes[model.document["name"]] = {
+                "key": list(model.document["key"].items())
+            }
+        return [model.document["name"] for model in models]
+
+    def index_information(self) -> Dict[str, dict]:
+        return copy.deepcopy(self.indexes)
+
+    def drop_index(self, name: str) -> None:
+        self.indexes.pop(name, None)
+
+    def delete_one(self, filter_query: dict) -> None:
+        self._wait()
+        with self._lock:
+            for index, document in enumerate(self.documents):
+                if self._matches(document, filter_query):
+                    del self.documents[index]
+                    return
+
+
+class MemoryMongoDB(MongoDB):
+    """
+    MongoDB em memoria. Reaproveita os metodos do conector, trocando
+    apenas as colecoes, para medir tambem o custo do codigo da API.
+    """
+
+    def __init__(self, db_name: str = "benchmark", latency: float = 0.0):
+        self.client = None
+        self.db = None
+        self.db_name = db_name
+        self.uri = "memory://"
+        self.latency = latency
+        self.collections: Dict[str, MemoryCollection] = {}
+
+    def get_collection(self, collection_name: str) -> MemoryCollection:
+        if collection_name not in self.collections:
+            self.collections[collection_name] = MemoryCollection(
+                self.latency
+            )
+        return self.collections[collection_name]
+
+    def explain(self, collection_name: str, filter_query: dict) -> dict:
+        # an index is used when its first field is in the filter
+        indexed = any(
+            index["key"][0][0] in filter_query
+            for index in self.get_collection(collection_name).indexes.values()
+        )
+        plan = (
+            {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}
+            if indexed else {"stage": "COLLSCAN"}
+        )
+        return {"queryPlanner": {"winningPlan": plan}}
+
+    async def ping(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+
+WORDS = (
+    "documento contrato cliente pagamento prazo entrega valor servico "
+    "clausula rescisao multa garantia produto suporte atendimento nota "
+    "fiscal pedido relatorio anual receita despesa projeto equipe"
+).split()
+
+
+def sample_text(words: int, seed: int = 0) -> str:
+    """
+    Texto deterministico com frases e paragrafos, para a ingestao.
+    """
+    text = []
+    for i in range(words):
+        text.append(WORDS[(i * 7 + seed) % len(WORDS)])
+        if i % 12 == 11:
+            text[-1] += "."
+        if i % 120 == 119:
+            text[-1] += "\n\n"
+    return " ".join(text)
+
+
+def fill(store: "MemoryChromaDB", texts: List[str]) -> str:
+    """
+    Cria uma colecao com nome unico (o Chroma em processo e
+    compartilhado) com os textos e devolve o nome dela.
+    """
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    collection = store._create_collection(name)
+    if texts:
+        collection.add(
+            documents=texts,
+            embeddings=store.embedding_function.embed_documents(texts),
+            metadatas=[{"created_at": str(i)} for i in range(len(texts))],
+            ids=[str(i) for i in range(len(texts))]
+        )
+    return name
+
+
+@pytest.fixture
+def vector_store():
+    """
+    MemoryChromaDB usado pelas tools do agente, com dez documentos.
+    """
+    store = MemoryChromaDB().install()
+    store.collection_name = fill(
+        store, [sample_text(50, i) for i in range(10)]
+    )
+    yield store
+    ChromaDB._shared = None
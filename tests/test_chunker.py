@@ -0,0 +1,48 @@
+from src.services.document_reader import Chunker
+
+
+BODY = " ".join(
+    f"Frase numero {i} do contrato entre as partes." for i in range(12)
+)
+
+
+def split(pages):
+    return Chunker(max_tokens=40, overlap_tokens=0, processes=1).split(pages)
+
+
+def test_heading_is_kept_with_the_following_body():
+    chunks = split(["Preambulo.\n\nCLAUSULA PRIMEIRA\n\n" + BODY])
+    assert all(chunk["text"] != "CLAUSULA PRIMEIRA" for chunk in chunks)
+    assert chunks[1]["text"].startswith("CLAUSULA PRIMEIRA\n\nFrase")
+    assert {chunk["section"] for chunk in chunks[1:]} == {
+        "CLAUSULA PRIMEIRA"
+    }
+
+
+def test_section_is_carried_across_pages():
+    chunks = split([
+        "Texto da clausula primeira.\n\nCLAUSULA SEGUNDA",
+        "Texto da clausula segunda na outra pagina.",
+        "Mais texto da clausula segunda."
+    ])
+    assert [chunk["page"] for chunk in chunks] == [1, 2, 3]
+    assert [chunk["section"] for chunk in chunks] == [
+        "", "CLAUSULA SEGUNDA", "CLAUSULA SEGUNDA"
+    ]
+    assert [chunk["chunk_index"] for chunk in chunks] == [0, 1, 2]
+
+
+def test_numbered_titles_need_a_dotted_number():
+    chunks = split([
+        "Texto inicial.\n\n2.1 Escopo\n\nTexto do escopo.",
+        "2023 Foi um ano dificil\n\nTexto que segue o ano."
+    ])
+    assert [chunk["section"] for chunk in chunks] == [
+        "", "2.1 Escopo", "2.1 Escopo"
+    ]
+    assert chunks[2]["text"].startswith("2023 Foi um ano dificil\n\n")
+
+
+def test_page_with_only_a_heading_is_not_dropped():
+    chunks = split(["CLAUSULA TERCEIRA"])
+    assert [chunk["text"] for chunk in chunks] == ["CLAUSULA TERCEIRA"]
@@ -0,0 +1,90 @@
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.infrastructure.config import settings
+from src.services.crag import CRAG
+from tests.conftest import FakeChatModel, fill
+
+
+class Grader(FakeChatModel):
+    """
+    Considera os documentos relevantes so para a consulta "alpha zeta"
+    e reescreve qualquer consulta para ela.
+    """
+
+    @staticmethod
+    def _score(prompt: str) -> str:
+        return "yes" if "alpha zeta" in prompt else "no"
+
+    def _respond(self, messages, tools=None):
+        text = str(messages[-1].content)
+        if tools and tools[0]["function"]["name"] == "GradeDocument":
+            message = AIMessage(content="", tool_calls=[{
+                "name": "GradeDocument",
+                "args": {"binary_score": self._score(text)},
+                "id": "grade",
+                "type": "tool_call"
+            }])
+        elif not tools and "Reescreva" in text:
+            message = AIMessage(content="alpha zeta")
+        else:
+            return super()._respond(messages, tools)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class NeverRelevant(Grader):
+    @staticmethod
+    def _score(prompt: str) -> str:
+        return "no"
+
+
+@pytest.fixture(autouse=True)
+def documents(vector_store, monkeypatch):
+    monkeypatch.setattr(settings, "CRAG_RELEVANT_K", 3)
+    # the fake embeddings only match equal texts: "beta" (the user
+    # query) retrieves the four "beta" documents, the rewritten query
+    # the "alpha zeta" one
+    texts = ["beta"] * 4 + ["alpha zeta"] + [f"doc {i}" for i in range(7)]
+    vector_store.collection_name = fill(vector_store, texts)
+
+
+async def outcomes(query: str, model=None, **loop):
+    crag = CRAG()
+    for name, value in loop.items():
+        setattr(crag.corrective, name, value)
+    try:
+        response = await crag.invoke(
+            [{"role": "user", "content": query}], model=model or Grader()
+        )
+    finally:
+        await crag.close()
+    return [c["outcome"] for c in response["corrections"]], crag.corrective
+
+
+async def test_enough_relevant_documents_answer_directly():
+    result, loop = await outcomes("alpha zeta", min_relevant=1)
+    assert result == ["enough"]
+    assert loop.stats()["answered_after_rewrite"] == 0
+
+
+async def test_query_is_rewritten_until_enough_documents():
+    result, loop = await outcomes("beta", min_relevant=1, max_iterations=2)
+    assert result == ["rewrite", "enough"]
+    assert loop.stats()["answered_after_rewrite"] == 1
+
+
+async def test_rewrites_stop_at_max_iterations():
+    result, loop = await outcomes(
+        "beta", NeverRelevant(), min_relevant=1, max_iterations=2
+    )
+    assert result == ["rewrite", "rewrite", "max_iterations"]
+    assert loop.stats()["outcomes"]["rewrite"] == 2
+
+
+async def test_no_rewrite_past_the_latency_budget():
+    result, loop = await outcomes(
+        "beta", min_relevant=1, max_iterations=2, budget=0.0
+    )
+    assert result == ["budget"]
+    assert loop.stats()["outcomes"]["budget"] == 1
@@ -0,0 +1,117 @@
+import asyncio
+
+from src.infrastructure.config import settings
+from src.infrastructure.database import (
+    HistoryWriter,
+    add_message_to_history,
+    get_conversation
+)
+from src.infrastructure.database.mongodb.utils import _unwritten
+from tests.conftest import MemoryMongoDB
+
+
+def messages(start: int, count: int):
+    return [
+        {"role": "user", "content": f"message {i}", "timestamp": str(i)}
+        for i in range(start, start + count)
+    ]
+
+
+def legacy(
+    database: MemoryMongoDB,
+    count: int,
+    summarized_until: int
+) -> None:
+    # written before "length" was tracked
+    database.get_collection("chat_history").insert_one({
+        "user_id": "user",
+        "history": messages(0, count),
+        "summary": "resumo",
+        "summarized_until": summarized_until
+    })
+
+
+def stored(database: MemoryMongoDB) -> dict:
+    return database.get_collection("chat_history").find_one(
+        {"user_id": "user"}
+    )
+
+
+async def test_length_counts_new_documents():
+    database = MemoryMongoDB()
+    await add_message_to_history(messages(0, 2), "user", database)
+    await add_message_to_history(messages(2, 3), "user", database)
+
+    conversation = await get_conversation("user", database)
+    assert stored(database)["length"] == 5
+    assert conversation["offset"] == 0
+    assert conversation["history"] == messages(0, 5)
+
+
+async def test_legacy_document_is_seeded_from_history_size():
+    database = MemoryMongoDB()
+    legacy(database, 20, summarized_until=10)
+    await add_message_to_history(messages(20, 2), "user", database)
+
+    conversation = await get_conversation("user", database)
+    assert stored(database)["length"] == 22
+    assert conversation["offset"] == 0
+    unsummarized = max(
+        conversation["summarized_until"] - conversation["offset"], 0
+    )
+    assert conversation["history"][unsummarized:] == messages(10, 12)
+
+
+async def test_legacy_document_read_before_any_write():
+    window = settings.HISTORY_CACHE_MESSAGES
+    database = MemoryMongoDB()
+    legacy(database, window + 10, summarized_until=window)
+
+    conversation = await get_conversation("user", database)
+    assert conversation["offset"] == 0
+    assert len(conversation["history"]) == window + 10
+
+
+class SlowFlushMongoDB(MemoryMongoDB):
+    """
+    bulk_write aplicado no banco, mas que so retorna quando liberado.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.written = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def bulk_write(self, collection_name, operations):
+        await super().bulk_write(collection_name, operations)
+        self.written.set()
+        await self.release.wait()
+
+
+async def test_read_during_flush_does_not_duplicate_messages():
+    database = SlowFlushMongoDB()
+    writer = HistoryWriter(database, flush_interval=0.01)
+    await add_message_to_history(messages(0, 2), "user", database)
+    writer.put("user", messages(2, 2))
+
+    flush = asyncio.create_task(writer.flush())
+    await database.written.wait()
+    writer.put("user", messages(4, 1))
+
+    conversation = await get_conversation("user", database, writer)
+    database.release.set()
+    await flush
+
+    assert conversation["history"] == messages(0, 5)
+    assert (await get_conversation("user", database))["history"] == (
+        messages(0, 5)
+    )
+
+
+def test_unwritten_keeps_messages_flushed_during_the_read():
+    first, second = messages(0, 1), messages(1, 1)
+    # the read happened before the flush of "first" was applied
+    assert _unwritten([], first, second) == first + second
+    # ... or after it
+    assert _unwritten(first, first, second) == second
+    assert _unwritten(first, [], second) == second
@@ -0,0 +1,106 @@
+import io
+import json
+from types import SimpleNamespace
+
+from src.api.controllers.files import controller_upload_files
+from src.api.models import FileMetadata
+from src.services.document_reader import BulkIngestion
+from tests.conftest import sample_text
+
+
+class FailingVectorStore:
+    """
+    Vector store em memoria que recusa os chunks de um arquivo.
+    """
+
+    def __init__(self, bad_file: str = ""):
+        self.bad_file = bad_file
+        self.documents = {}
+        self.calls = 0
+
+    async def add_documents(
+        self, documents, collection_name, metadatas, ids
+    ):
+        self.calls += 1
+        if any(m["file_name"] == self.bad_file for m in metadatas):
+            raise ValueError("rejected")
+        self.documents.update(zip(ids, metadatas))
+
+    async def delete_documents(self, ids, collection_name):
+        for chunk_id in ids:
+            del self.documents[chunk_id]
+
+
+def upload(name: str, words: int = 600):
+    content = json.dumps(sample_text(words, len(name))).encode()
+    return SimpleNamespace(filename=name, file=io.BytesIO(content))
+
+
+def by_name(result: dict) -> dict:
+    return {item["file_name"]: item for item in result["files"]}
+
+
+async def test_a_failed_batch_only_fails_its_bad_file():
+    store = FailingVectorStore(bad_file="bad.json")
+    result = await BulkIngestion(store, workers=1, embed_batch=4).ingest(
+        [upload("a.json"), upload("bad.json"), upload("b.json")]
+    )
+
+    files = by_name(result)
+    assert files["a.json"]["status"] == "ok"
+    assert files["b.json"]["status"] == "ok"
+    assert files["bad.json"]["status"] == "error"
+    assert result["summary"]["ok"] == 2
+
+    # nothing of the failed file is left indexed, all of the others is
+    indexed = [m["file_name"] for m in store.documents.values()]
+    assert "bad.json" not in indexed
+    assert indexed.count("a.json") == files["a.json"]["chunks"]
+    assert indexed.count("b.json") == files["b.json"]["chunks"]
+
+
+async def test_file_split_across_batches_is_removed_when_it_fails():
+    store = FailingVectorStore()
+    ingestion = BulkIngestion(store, workers=1, embed_batch=2)
+    first_batch = ingestion._add
+
+    async def add(documents, metadatas, owners):
+        # the batches after the first fail, retried or not
+        if store.calls:
+            raise ValueError("rejected")
+        await first_batch(documents, metadatas, owners)
+
+    ingestion._add = add
+    result = await ingestion.ingest([upload("a.json", 2000)])
+
+    assert result["files"][0]["status"] == "error"
+    assert result["files"][0]["chunks"] > 2
+    assert not store.documents
+
+
+async def test_files_with_invalid_metadata_are_not_indexed():
+    store = FailingVectorStore()
+    result = await controller_upload_files(
+        [upload("a.json"), upload("b.json")],
+        FileMetadata(),
+        store,
+        files_metadata={"a.json": {"tags": ["x"]}, "b.json": {"area": "rh"}}
+    )
+
+    files = by_name(result)
+    assert files["a.json"]["status"] == "error"
+    assert "Invalid metadata" in files["a.json"]["error"]
+    assert files["b.json"]["status"] == "ok"
+    assert {m["file_name"] for m in store.documents.values()} == {"b.json"}
+    assert {m["area"] for m in store.documents.values()} == {"rh"}
+
+
+async def test_null_metadata_is_no_metadata():
+    store = FailingVectorStore()
+    result = await controller_upload_files(
+        [upload("a.json"), upload("b.json")],
+        FileMetadata(),
+        store,
+        files_metadata={"a.json": None}
+    )
+    assert [item["status"] for item in result["files"]] == ["ok", "ok"]
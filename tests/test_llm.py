@@ -0,0 +1,35 @@
+import pytest
+
+from src.infrastructure.config import LLM, LLMPool, settings
+
+
+@pytest.fixture(autouse=True)
+def nodes(monkeypatch):
+    monkeypatch.setattr(LLM, "_clients", {})
+    monkeypatch.setattr(settings, "MODEL", "ollama")
+    monkeypatch.setattr(settings, "MODEL_API_KEY", "key")
+    monkeypatch.setattr(
+        settings, "MODEL_URLS", "http://a:11434,http://b:11434"
+    )
+    monkeypatch.setattr(settings, "GRADER_MODEL", "openai:gpt-4o-mini")
+
+
+def urls(model: LLMPool):
+    return [str(endpoint.model.base_url) for endpoint in model.endpoints]
+
+
+def test_model_urls_only_apply_to_the_default_provider():
+    models = LLM.for_nodes()
+    assert urls(models["agent"]) == ["http://a:11434", "http://b:11434"]
+    assert not isinstance(models["grader"], LLMPool)
+    assert models["grader"].openai_api_base is None
+
+
+def test_node_urls_are_pooled_with_the_node_provider(monkeypatch):
+    monkeypatch.setattr(
+        settings, "GRADER_MODEL_URLS", "http://c/v1, http://d/v1"
+    )
+    grader = LLM.for_nodes()["grader"]
+    assert [
+        endpoint.model.openai_api_base for endpoint in grader.endpoints
+    ] == ["http://c/v1", "http://d/v1"]
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from src.infrastructure.config.llm_pool import Endpoint, LLMPool
+from tests.conftest import FakeChatModel
+
+
+def pool(endpoints: int = 1, latency: float = 0.0, timeout: float = 1.0):
+    return LLMPool(
+        endpoints=[
+            Endpoint(FakeChatModel(latency=latency), max_concurrency=1)
+            for _ in range(endpoints)
+        ],
+        acquire_timeout=timeout
+    )
+
+
+def in_flight(llm_pool: LLMPool) -> int:
+    return sum(endpoint.in_flight for endpoint in llm_pool.endpoints)
+
+
+async def test_release_wakes_a_waiting_caller():
+    llm_pool = pool()
+    endpoint = await llm_pool._aacquire()
+    waiting = asyncio.create_task(llm_pool._aacquire())
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+
+    llm_pool._release(endpoint)
+    assert await asyncio.wait_for(waiting, 1) is endpoint
+    assert in_flight(llm_pool) == 1
+
+
+async def test_cancelled_waiter_does_not_keep_an_endpoint():
+    llm_pool = pool()
+    endpoint = await llm_pool._aacquire()
+    waiting = asyncio.create_task(llm_pool._aacquire())
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    llm_pool._release(endpoint)
+    assert in_flight(llm_pool) == 0
+    assert not llm_pool._waiters
+
+
+async def test_wakeup_of_a_cancelled_waiter_goes_to_the_next():
+    llm_pool = pool()
+    endpoint = await llm_pool._aacquire()
+    first = asyncio.create_task(llm_pool._aacquire())
+    second = asyncio.create_task(llm_pool._aacquire())
+    await asyncio.sleep(0.01)
+
+    # released and cancelled before the first waiter runs again
+    llm_pool._release(endpoint)
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await asyncio.wait_for(second, 1) is endpoint
+    assert first.cancelled()
+    assert in_flight(llm_pool) == 1
+
+
+async def test_acquire_times_out():
+    llm_pool = pool(timeout=0.05)
+    await llm_pool._aacquire()
+    with pytest.raises(TimeoutError):
+        await llm_pool._aacquire()
+    assert not llm_pool._waiters
+
+
+async def test_release_from_a_thread_wakes_the_loop():
+    llm_pool = pool()
+    endpoint = await llm_pool._aacquire()
+    waiting = asyncio.create_task(llm_pool._aacquire())
+    await asyncio.sleep(0.01)
+
+    threading.Timer(0.01, llm_pool._release, (endpoint,)).start()
+    assert await asyncio.wait_for(waiting, 1) is endpoint
+
+
+async def test_cancelled_generation_releases_the_endpoint():
+    llm_pool = pool(latency=1.0)
+    call = asyncio.create_task(llm_pool.ainvoke([HumanMessage("oi")]))
+    await asyncio.sleep(0.05)
+    assert in_flight(llm_pool) == 1
+
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    assert in_flight(llm_pool) == 0
+    assert llm_pool.endpoints[0].errors == 0
+
+
+async def test_calls_are_spread_over_endpoints():
+    llm_pool = pool(endpoints=2, latency=0.05)
+    await asyncio.gather(*[
+        llm_pool.ainvoke([HumanMessage("oi")]) for _ in range(4)
+    ])
+    assert [endpoint.requests for endpoint in llm_pool.endpoints] == [2, 2]
+    assert in_flight(llm_pool) == 0
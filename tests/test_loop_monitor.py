@@ -0,0 +1,52 @@
+import asyncio
+import selectors
+import time
+import traceback
+
+from src.infrastructure.metrics.loop_monitor import (
+    IDLE_SITE,
+    SOURCE_ROOT,
+    LoopMonitor
+)
+
+
+def frame(filename: str, name: str) -> traceback.FrameSummary:
+    return traceback.FrameSummary(filename, 1, name)
+
+
+def test_loop_waiting_in_its_own_code_is_idle():
+    base_events = asyncio.base_events.__file__
+    stack = [
+        frame(base_events, "_run_once"),
+        frame(asyncio.selector_events.__file__, "_read_from_self")
+    ]
+    assert LoopMonitor.site(stack) == IDLE_SITE
+    stack[-1] = frame(selectors.__file__, "select")
+    assert LoopMonitor.site(stack) == IDLE_SITE
+
+
+def test_application_frame_is_the_site():
+    stack = [
+        frame(asyncio.base_events.__file__, "_run_once"),
+        frame(f"{SOURCE_ROOT}/services/crag/nodes.py", "generate"),
+        frame(selectors.__file__, "select")
+    ]
+    assert LoopMonitor.site(stack) == "src/services/crag/nodes.py:1 generate"
+
+
+async def test_blocking_call_is_recorded_with_its_site():
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    time.sleep(0.3)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    stats = monitor.stats()
+    assert IDLE_SITE not in stats["sites"]
+    assert [event["site"] for event in stats["events"]] == [
+        next(iter(stats["sites"]))
+    ]
+    assert "test_blocking_call_is_recorded_with_its_site" in (
+        stats["events"][0]["site"]
+    )
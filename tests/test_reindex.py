@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from src.infrastructure.config import settings
+from src.infrastructure.database import ReindexJob
+from tests.conftest import (
+    FakeEmbeddings,
+    MemoryChromaDB,
+    fill,
+    sample_text
+)
+
+
+@pytest.fixture(autouse=True)
+def fast_claims(monkeypatch):
+    monkeypatch.setattr(ReindexJob, "CLAIM_DELAY", 0.01)
+
+
+@pytest.fixture
+def alias():
+    return fill(MemoryChromaDB(), [sample_text(30, i) for i in range(25)])
+
+
+def job(store: MemoryChromaDB, alias: str) -> ReindexJob:
+    return ReindexJob(
+        store, "new-model", alias=alias, embeddings=FakeEmbeddings(),
+        page_size=10, batch_size=5
+    )
+
+
+async def test_reindex_copies_and_switches_the_alias(alias):
+    store = MemoryChromaDB()
+    progress = await job(store, alias).run()
+
+    assert progress["status"] == "done"
+    assert progress["copied"] == 25
+    assert store.resolve(alias) == progress["target"]
+    assert store.client.get_collection(progress["target"]).count() == 25
+
+
+async def test_job_is_not_started_twice_across_workers(alias):
+    first, second = MemoryChromaDB(), MemoryChromaDB()
+    assert await job(first, alias).claim()
+    assert not await job(second, alias).claim()
+
+
+async def test_expired_lease_is_taken_over(alias, monkeypatch):
+    first = job(MemoryChromaDB(), alias)
+    assert await first.claim()
+
+    monkeypatch.setattr(settings, "REINDEX_LEASE_SECONDS", 0.05)
+    await asyncio.sleep(0.1)
+    second = job(MemoryChromaDB(), alias)
+    assert await second.claim()
+
+    # the old owner stops at its next save
+    monkeypatch.setattr(settings, "REINDEX_LEASE_SECONDS", 60.0)
+    with pytest.raises(RuntimeError):
+        await first._save(offset=10)
+
+
+async def test_stopped_job_releases_the_lease(alias):
+    first = job(MemoryChromaDB(), alias)
+    assert await first.claim()
+    first.task = asyncio.create_task(asyncio.sleep(10))
+    await first.stop()
+
+    assert await job(MemoryChromaDB(), alias).claim()
+
+
+def test_resolve_keeps_the_last_target_when_the_catalog_fails(
+    alias, monkeypatch
+):
+    store = MemoryChromaDB()
+    store.set_alias(alias, "blue")
+    monkeypatch.setattr(settings, "CHROMA_ALIAS_TTL", 0.0)
+    assert store.resolve(alias) == "blue"
+
+    def unavailable(key):
+        raise ConnectionError("catalog unavailable")
+
+    monkeypatch.setattr(store, "get_record", unavailable)
+    assert store.resolve(alias) == "blue"
+    assert store.resolve("never-resolved") == "never-resolved"
+    assert "never-resolved" not in store._aliases
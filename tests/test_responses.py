@@ -0,0 +1,19 @@
+import pytest
+from pydantic import BaseModel
+
+from src.api.responses import dumps
+
+
+class Item(BaseModel):
+    name: str
+
+
+def test_known_types_are_serialized():
+    assert dumps({"item": Item(name="a"), "tags": {"x"}}) == (
+        b'{"item":{"name":"a"},"tags":["x"]}'
+    )
+
+
+def test_unknown_types_are_an_error():
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from src.infrastructure.config import (
+    AdmissionRejected,
+    LLMScheduler,
+    current_user,
+    settings
+)
+from src.services.crag import CRAG
+from tests.conftest import FakeChatModel
+
+
+def scheduler(max_concurrency: int, max_queue: int, timeout: float = 1.0):
+    return LLMScheduler(
+        max_concurrency=max_concurrency,
+        max_queue=max_queue,
+        max_queue_per_user=max_queue,
+        timeouts=dict.fromkeys(LLMScheduler.NAMES, timeout)
+    )
+
+
+async def call(llm_scheduler: LLMScheduler, user: str, priority: int,
+               order: list, hold: float = 0.01):
+    current_user.set(user)
+    await llm_scheduler.aacquire(priority)
+    order.append(user)
+    await asyncio.sleep(hold)
+    llm_scheduler.release()
+
+
+async def queue_behind_a_busy_slot(llm_scheduler, calls):
+    await llm_scheduler.aacquire(LLMScheduler.CHAT)
+    order = []
+    tasks = []
+    for user, priority in calls:
+        tasks.append(asyncio.create_task(
+            call(llm_scheduler, user, priority, order)
+        ))
+        # queued in this order
+        await asyncio.sleep(0.01)
+    llm_scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+async def test_users_are_served_round_robin():
+    order = await queue_behind_a_busy_slot(scheduler(1, 16), [
+        ("a", LLMScheduler.CHAT),
+        ("a", LLMScheduler.CHAT),
+        ("a", LLMScheduler.CHAT),
+        ("b", LLMScheduler.CHAT),
+        ("c", LLMScheduler.CHAT)
+    ])
+    assert order == ["a", "b", "c", "a", "a"]
+
+
+async def test_chat_calls_go_before_grading_and_background():
+    order = await queue_behind_a_busy_slot(scheduler(1, 16), [
+        ("background", LLMScheduler.BACKGROUND),
+        ("grading", LLMScheduler.GRADING),
+        ("chat", LLMScheduler.CHAT)
+    ])
+    assert order == ["chat", "grading", "background"]
+
+
+async def test_full_queue_is_rejected_with_429():
+    llm_scheduler = scheduler(1, 1)
+    await llm_scheduler.aacquire(LLMScheduler.CHAT)
+    waiting = asyncio.create_task(llm_scheduler.aacquire(LLMScheduler.CHAT))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await llm_scheduler.aacquire(LLMScheduler.CHAT)
+    assert rejected.value.status_code == 429
+
+    llm_scheduler.release()
+    await waiting
+
+
+
+async def test_graph_calls_are_shed_with_503_under_load(
+    vector_store, monkeypatch
+):
+    monkeypatch.setattr(settings, "LLM_MAX_CONCURRENCY", 8)
+    monkeypatch.setattr(settings, "LLM_MAX_QUEUE", 64)
+    llm_scheduler = scheduler(8, 64, timeout=0.5)
+    model = FakeChatModel(latency=0.5)
+    models = {
+        "agent": llm_scheduler.wrap(model, LLMScheduler.CHAT),
+        "grader": llm_scheduler.wrap(model, LLMScheduler.GRADING),
+        "generator": llm_scheduler.wrap(model, LLMScheduler.CHAT)
+    }
+    crag = CRAG()
+    peak = 0
+
+    async def request(i: int):
+        current_user.set(f"user-{i}")
+        return await crag.invoke(
+            [{"role": "user", "content": f"Qual o prazo do pedido {i}?"}],
+            model=models["agent"],
+            models=models
+        )
+
+    async def watch():
+        nonlocal peak
+        while True:
+            peak = max(peak, llm_scheduler.active)
+            await asyncio.sleep(0.005)
+
+    watcher = asyncio.create_task(watch())
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                *[request(i) for i in range(40)], return_exceptions=True
+            ),
+            30
+        )
+    finally:
+        watcher.cancel()
+        await crag.close()
+
+    statuses = [
+        result.status_code for result in results
+        if isinstance(result, AdmissionRejected)
+    ]
+    assert 503 in statuses
+    assert len(statuses) + sum(
+        isinstance(result, dict) for result in results
+    ) == 40
+    assert peak == 8
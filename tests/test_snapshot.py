@@ -0,0 +1,83 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from src.infrastructure.config import settings
+from src.infrastructure.database import ChromaDB, Snapshot
+from tests.conftest import MemoryChromaDB, fill, sample_text
+
+
+def collection(store: MemoryChromaDB, count: int) -> str:
+    return fill(store, [sample_text(30, i) for i in range(count)])
+
+
+def records(store: MemoryChromaDB, name: str) -> dict:
+    page = store.client.get_collection(name).get(
+        include=["documents", "metadatas", "embeddings"]
+    )
+    return {
+        id_: (document, metadata, np.asarray(embedding))
+        for id_, document, metadata, embedding in zip(
+            page["ids"], page["documents"], page["metadatas"],
+            page["embeddings"]
+        )
+    }
+
+
+async def test_float16_round_trip_with_uneven_pages(tmp_path):
+    store = MemoryChromaDB()
+    source = collection(store, 25)
+    snapshot = Snapshot(str(tmp_path))
+
+    exported = await snapshot.export(
+        store, source, dtype="float16", page_size=7
+    )
+    assert exported["count"] == 25
+    restored = await snapshot.restore(
+        store, collection_name=f"{source}-copy", batch_size=7
+    )
+    assert restored["count"] == 25
+
+    before, after = records(store, source), records(store, f"{source}-copy")
+    assert before.keys() == after.keys()
+    for id_, (document, metadata, embedding) in before.items():
+        assert after[id_][:2] == (document, metadata)
+        assert np.allclose(after[id_][2], embedding, atol=1e-3)
+
+
+async def test_empty_collection_round_trip(tmp_path):
+    store = MemoryChromaDB()
+    source = collection(store, 0)
+    snapshot = Snapshot(str(tmp_path))
+
+    assert (await snapshot.export(store, source))["count"] == 0
+    restored = await snapshot.restore(store, collection_name=f"{source}-2")
+    assert restored["count"] == 0
+
+
+async def test_restore_to_an_alias_writes_its_target(tmp_path):
+    store = MemoryChromaDB()
+    source = collection(store, 5)
+    snapshot = Snapshot(str(tmp_path))
+    await snapshot.export(store, source)
+
+    alias = f"alias-{uuid.uuid4().hex[:8]}"
+    store.set_alias(alias, f"{source}-green")
+    restored = await snapshot.restore(store, collection_name=alias)
+    assert restored["collection"] == f"{source}-green"
+    assert store.client.get_collection(f"{source}-green").count() == 5
+
+
+def test_persistent_path_is_used_by_one_process_only(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(settings, "CHROMA_MODE", "persistent")
+    monkeypatch.setattr(settings, "CHROMA_PATH", str(tmp_path))
+    first, second = ChromaDB(), ChromaDB()
+    first._lock_path()
+    try:
+        with pytest.raises(RuntimeError, match="in use"):
+            second._lock_path()
+    finally:
+        first._path_lock.close()